@@ -0,0 +1,193 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+
+METRICS = ('uniques', 'lowest', 'combined', 'pif', 'suda2')
+
+# Columns of the CSV output; the tables of the lowest, combined and suda2
+# metrics are only written to JSON
+SUMMARY_COLUMNS = ['file', 'rows', 'columns', 'selected_columns', 'num_unique_rows', 'k_anonymity', 'pif',
+                   'suda2_mean_dis_score', 'suda2_max_dis_score', 'error']
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='metaprivBIDS-cli',
+        description="Assess the privacy risk of CSV/TSV files without the GUI.")
+    parser.add_argument('files', nargs='+', help="Files or glob patterns, e.g. 'data/**/participants.tsv'.")
+    parser.add_argument('-c', '--columns', type=_split, default=[],
+                        help="Comma-separated quasi-identifier columns (default: every column but the sensitive ones).")
+    parser.add_argument('-s', '--sensitive', type=_split, default=[],
+                        help="Comma-separated sensitive attributes, l-diversity is reported for each.")
+    parser.add_argument('-m', '--metrics', type=_split, default=['uniques'],
+                        help=f"Comma-separated metrics among {', '.join(METRICS)} (default: uniques).")
+    parser.add_argument('--min-size', type=int, default=3, help="Smallest combination size (combined).")
+    parser.add_argument('--max-size', type=int, default=7, help="Largest combination size (combined).")
+    parser.add_argument('--top-k', type=int, default=None, help="Only report the best combinations (combined).")
+    parser.add_argument('--min-score', type=float, default=None, help="Only report combinations above this score.")
+    parser.add_argument('--percentile', type=int, default=95, help="RIG percentile reported as PIF (pif).")
+    parser.add_argument('--mask-value', default=None, help="Cells with a CIG of 0, a number or 'nan' (pif).")
+    parser.add_argument('--sample-fraction', type=float, default=0.2, help="SUDA2 sampling fraction (suda2).")
+    parser.add_argument('--missing-value', type=float, default=None, help="Value SUDA2 treats as missing (suda2).")
+    parser.add_argument('--engine', choices=('c', 'pyarrow', 'auto'), default='auto',
+                        help="CSV parser; pyarrow is multithreaded, auto uses it when installed (default: auto).")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Worker processes, -1 for one per core. Files are assessed in parallel; "
+                             "a single file uses them for the combination search.")
+    parser.add_argument('-o', '--output', default=None, help="Output file, .json, .csv or .tsv (default: JSON on stdout).")
+    parser.add_argument('--format', choices=('json', 'csv'), default=None, help="Output format, from -o if not given.")
+    return parser
+
+
+def expand_files(patterns):
+    """Files matching the patterns, in order and without duplicates."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or ([pattern] if os.path.exists(pattern) else [])
+        files.extend(path for path in matches if os.path.isfile(path) and path not in files)
+    return files
+
+
+def _native(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (tuple, set)):
+        return list(value)
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient='records'))
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def assess_file(path, options):
+    """
+    Run the selected metrics of metaprivBIDS_core_logic on one file.
+
+    Parameters:
+        path (str): Path of the .csv or .tsv file.
+        options (dict): Parsed command line arguments, see build_parser.
+
+    Returns:
+        dict: The metrics of the file; error holds the message if one of them
+        failed.
+    """
+    from metaprivBIDS.corelogic.metapriv_corelogic import metaprivBIDS_core_logic
+
+    result = {'file': path}
+    try:
+        core = metaprivBIDS_core_logic()
+        sensitive = options['sensitive']
+        # With explicit columns only those and the sensitive attributes are parsed
+        usecols = options['columns'] + [attr for attr in sensitive if attr not in options['columns']] \
+            if options['columns'] else None
+        data = core.load_data(path, usecols=usecols, engine=options.get('engine'))['data']
+        columns = options['columns'] or [column for column in data.columns if column not in sensitive]
+        missing = [column for column in columns + sensitive if column not in data.columns]
+        if missing:
+            raise ValueError(f"Columns not found: {', '.join(missing)}")
+        result.update(rows=len(data), columns=len(data.columns), selected_columns=columns)
+        metrics = options['metrics']
+
+        if 'uniques' in metrics:
+            summary = core.calculate_unique_rows(data, columns)
+            result.update(num_unique_rows=summary['num_unique_rows'], k_anonymity=summary['k_anonymity'],
+                          k_histogram={int(size): int(count) for size, count in summary['k_histogram'].items()})
+            # All sensitive attributes against one grouping of the rows
+            variants = core.calculate_l_diversity_batch(data, columns, sensitive, n_jobs=options['n_jobs'])
+            result['l_diversity'] = variants['distinct_l'].to_dict() if sensitive else {}
+            result['l_diversity_variants'] = variants.to_dict(orient='index')
+        if 'lowest' in metrics:
+            result['lowest_unique_columns'] = core.find_lowest_unique_columns(data, columns)
+        if 'combined' in metrics:
+            result['combined_column_contribution'] = core.compute_combined_column_contribution(
+                data, columns, options['min_size'], options['max_size'], n_jobs=options['n_jobs'],
+                top_k=options['top_k'], min_score=options['min_score'])
+        if 'pif' in metrics:
+            result['pif'], _ = core.compute_cig(data, columns, mask_value=options['mask_value'],
+                                                percentile=options['percentile'])
+        if 'suda2' in metrics:
+            suda2 = core.compute_suda2(data, columns, sample_fraction=options['sample_fraction'],
+                                       missing_value=options['missing_value'])
+            scores = suda2['data_with_scores']['dis-score']
+            result.update(suda2_mean_dis_score=float(scores.mean()), suda2_max_dis_score=float(scores.max()),
+                          suda2_attribute_contributions=suda2['attribute_contributions'])
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run(files, options, jobs=1):
+    """Assess the files, in parallel when jobs > 1, and return the results in file order."""
+    from metaprivBIDS.corelogic.lattice import resolve_n_jobs
+
+    jobs = resolve_n_jobs(jobs)
+    if len(files) == 1 or jobs == 1:
+        options = dict(options, n_jobs=jobs if len(files) == 1 else None)
+        return [assess_file(path, options) for path in files]
+    options = dict(options, n_jobs=None)
+    results = [None] * len(files)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as executor:
+        futures = {executor.submit(assess_file, path, options): i for i, path in enumerate(files)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+
+def write_results(results, output=None, output_format=None):
+    """Write results as JSON, or as one CSV/TSV row per file, to output or stdout."""
+    if output_format is None:
+        output_format = 'csv' if output and output.lower().endswith(('.csv', '.tsv')) else 'json'
+    if output_format == 'json':
+        text = json.dumps(results, indent=2, default=_native) + '\n'
+    else:
+        rows = []
+        for result in results:
+            row = {column: result.get(column) for column in SUMMARY_COLUMNS}
+            row['selected_columns'] = ';'.join(result.get('selected_columns', []))
+            row.update({f'l_diversity[{attr}]': value for attr, value in result.get('l_diversity', {}).items()})
+            rows.append(row)
+        frame = pd.DataFrame(rows).dropna(axis=1, how='all')
+        text = frame.to_csv(sep='\t' if output and output.lower().endswith('.tsv') else ',', index=False)
+    if output is None:
+        sys.stdout.write(text)
+    else:
+        with open(output, 'w') as f:
+            f.write(text)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [metric for metric in args.metrics if metric not in METRICS]
+    if unknown:
+        parser.error(f"unknown metrics: {', '.join(unknown)}")
+    files = expand_files(args.files)
+    if not files:
+        parser.error("no files match the given patterns")
+
+    options = {
+        'columns': args.columns, 'sensitive': args.sensitive, 'metrics': args.metrics,
+        'min_size': args.min_size, 'max_size': args.max_size, 'top_k': args.top_k, 'min_score': args.min_score,
+        'percentile': args.percentile, 'mask_value': args.mask_value, 'engine': args.engine,
+        'sample_fraction': args.sample_fraction, 'missing_value': args.missing_value,
+    }
+    results = run(files, options, jobs=args.jobs)
+    write_results(results, args.output, args.format)
+    for result in results:
+        if 'error' in result:
+            print(f"{result['file']}: {result['error']}", file=sys.stderr)
+    return 1 if any('error' in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import threading
+
+import pandas as pd
+
+
+class BackendUnavailable(ImportError):
+    """Raised when a backend cannot be loaded on this host."""
+
+
+_loaders = {}
+_backends = {}
+_lock = threading.Lock()
+
+
+def register_backend(name, loader):
+    """
+    Register a backend under a name.
+
+    Parameters:
+        name (str): Backend name, e.g. 'sdcMicro'.
+        loader (callable): Called without arguments on first use; returns the
+            backend object. Heavy imports belong in the loader, not at module
+            level, so that registering a backend costs nothing.
+    """
+    with _lock:
+        _loaders[name] = loader
+        _backends.pop(name, None)
+
+
+def available_backends():
+    """Names of the registered backends, loaded or not."""
+    return sorted(_loaders)
+
+
+def backend_loaded(name):
+    return name in _backends
+
+
+def get_backend(name='sdcMicro'):
+    """
+    Return a backend, loading it on first use.
+
+    Raises:
+        ValueError: If no backend is registered under name.
+        BackendUnavailable: If the backend cannot be loaded, e.g. because R
+            or one of its packages is not installed.
+    """
+    with _lock:
+        if name in _backends:
+            return _backends[name]
+        if name not in _loaders:
+            raise ValueError(f"Unknown backend '{name}'. Available backends: {', '.join(sorted(_loaders))}.")
+        try:
+            backend = _loaders[name]()
+        except Exception as e:
+            raise BackendUnavailable(f"The {name} backend is not available: {e}") from e
+        _backends[name] = backend
+        return backend
+
+
+class SdcMicroBackend:
+    """
+    SUDA2 through the sdcMicro R package.
+
+    Creating the backend starts the embedded R interpreter and loads
+    sdcMicro, which is why it only happens on the first SUDA2 run.
+    """
+
+    def __init__(self):
+        from rpy2 import robjects
+        from rpy2.robjects import pandas2ri
+        from rpy2.robjects.packages import importr
+
+        # Activate pandas <-> R DataFrame conversion
+        pandas2ri.activate()
+        self.robjects = robjects
+        self.sdcMicro = importr('sdcMicro')
+
+    def suda2(self, df, missing=None, dis_fraction=0.01):
+        """
+        Run sdcMicro::suda2 on numeric columns.
+
+        Parameters:
+            df (pd.DataFrame): Key variables, already encoded as numbers.
+            missing: Value sdcMicro treats as missing.
+            dis_fraction (float): Sampling fraction (DisFraction).
+
+        Returns:
+            dict: disScore, score and contributionPercent (lists, one value
+            per row), attribute_contributions (variable, contribution) and
+            attribute_level_contributions (variable, attribute, contribution)
+            as DataFrames.
+        """
+        robjects = self.robjects
+        r_df = robjects.DataFrame({
+            name: robjects.FloatVector(df[name].astype(float)) for name in df.columns
+        })
+        result = self.sdcMicro.suda2(r_df, missing=missing, DisFraction=dis_fraction)
+        attribute_contributions = result.rx2('attribute_contributions')
+        attribute_level_contributions = result.rx2('attribute_level_contributions')
+        return {
+            'disScore': list(result.rx2('disScore')),
+            'score': list(result.rx2('score')),
+            'contributionPercent': list(result.rx2('contributionPercent')),
+            'attribute_contributions': pd.DataFrame({
+                'variable': list(attribute_contributions.rx2('variable')),
+                'contribution': list(attribute_contributions.rx2('contribution')),
+            }),
+            'attribute_level_contributions': pd.DataFrame({
+                'variable': list(attribute_level_contributions.rx2('variable')),
+                'attribute': list(attribute_level_contributions.rx2('attribute')),
+                'contribution': list(attribute_level_contributions.rx2('contribution')),
+            }),
+        }
+
+
+register_backend('sdcMicro', SdcMicroBackend)
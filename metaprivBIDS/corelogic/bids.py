@@ -0,0 +1,245 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .lattice import resolve_n_jobs
+from .loading import compression, load_table, read_header, table_suffix
+
+
+# Identifier columns of BIDS tables, unique per row by design and never
+# treated as quasi-identifiers
+IDENTIFIER_COLUMNS = ('participant_id', 'session_id')
+
+# Top-level folders that hold no raw tabular metadata
+SKIPPED_FOLDERS = ('derivatives', 'sourcedata', 'code')
+
+DEFAULT_PERCENTILE = 95
+
+
+def _stem(name):
+    # Name without the .tsv suffix and any compression suffix
+    if compression(name):
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[0]
+
+
+def _is_table(name):
+    return table_suffix(name) == '.tsv' and not name.startswith('.')
+
+
+def _sidecar(path, root):
+    # Sidecar with the same name, or for sessions files, the dataset-wide
+    # sessions.json (BIDS inheritance)
+    candidate = _stem(path) + '.json'
+    if os.path.exists(candidate):
+        return candidate
+    if _stem(path).endswith('_sessions'):
+        inherited = os.path.join(root, 'sessions.json')
+        if os.path.exists(inherited):
+            return inherited
+    return None
+
+
+def find_tables(root):
+    """
+    Discover the tabular files of a BIDS dataset.
+
+    Tables may be compressed (participants.tsv.gz, phenotype/moca.tsv.zst,
+    ...), see loading.open_table.
+
+    Parameters:
+        root (str): Root folder of the dataset.
+
+    Returns:
+        list: One dict per table with path, kind ('participants',
+        'phenotype' or 'sessions') and sidecar (path of its JSON sidecar, or
+        None), in a stable order.
+    """
+    root = os.path.abspath(root)
+    tables = []
+    tables.extend((os.path.join(root, name), 'participants')
+                  for name in sorted(os.listdir(root)) if _is_table(name) and _stem(name) == 'participants')
+    phenotype = os.path.join(root, 'phenotype')
+    if os.path.isdir(phenotype):
+        tables.extend((os.path.join(phenotype, name), 'phenotype')
+                      for name in sorted(os.listdir(phenotype)) if _is_table(name))
+    for folder, subfolders, files in os.walk(root):
+        subfolders[:] = sorted(name for name in subfolders
+                               if not name.startswith('.') and not (folder == root and name in SKIPPED_FOLDERS))
+        tables.extend((os.path.join(folder, name), 'sessions') for name in sorted(files)
+                      if _is_table(name) and (_stem(name) == 'sessions' or _stem(name).endswith('_sessions')))
+    return [{'path': path, 'kind': kind, 'sidecar': _sidecar(path, root)} for path, kind in tables]
+
+
+def _pif(data, columns, percentile):
+    import piflib.pif_calculator as pif
+
+    # As in the GUI, missing values are a category of their own
+    df = data[columns].astype(object).where(pd.notnull(data[columns]), 'NaN')
+    rig = pd.DataFrame(pif.compute_cigs(df), index=df.index).sum(axis=1)
+    return float(np.percentile(rig, percentile))
+
+
+def _suda2(encoded, columns, sample_fraction):
+    from .backends import get_backend
+
+    df = pd.DataFrame({column: encoded.codes(column) for column in columns})
+    result = get_backend('sdcMicro').suda2(df, missing=-1, dis_fraction=sample_fraction)
+    contributions = result['attribute_contributions'].sort_values('contribution', ascending=False)
+    return {
+        'suda2_mean_dis_score': float(np.mean(result['disScore'])),
+        'suda2_max_dis_score': float(np.max(result['disScore'])),
+        'suda2_top_attribute': contributions['variable'].iloc[0] if len(contributions) else None,
+    }
+
+
+def assess_table(path, quasi_identifiers=None, sensitive_attr=None, pif=True, suda2=False,
+                 percentile=DEFAULT_PERCENTILE, sample_fraction=0.2, sidecar=None, engine='auto'):
+    """
+    Compute the privacy metrics of one table.
+
+    Failures are recorded in the result instead of raised, so that one
+    unreadable file or missing optional dependency does not stop an audit.
+
+    Parameters:
+        path (str): Path of the .tsv (or .csv) file.
+        quasi_identifiers (list): Columns assessed together; every column
+            but the identifiers and the sensitive attribute if None. Columns
+            missing from the table are ignored.
+        sensitive_attr (str): Sensitive attribute for l-diversity, skipped
+            when the table does not have it.
+        pif (bool): Compute the PIF (needs piflib).
+        suda2 (bool): Run SUDA2 (needs R and sdcMicro).
+        percentile (int): Percentile of the row information gains reported
+            as PIF.
+        sample_fraction (float): Sampling fraction of SUDA2.
+        sidecar (str): JSON sidecar describing the columns.
+        engine (str): CSV parser, see loading.reader_engine.
+
+    Returns:
+        dict: rows, columns, quasi_identifiers, num_unique_rows,
+        unique_share, k_anonymity, l_diversity, pif, the SUDA2 scores,
+        undocumented_columns and error.
+    """
+    result = {'path': path, 'sidecar': sidecar}
+    errors = []
+    try:
+        header = read_header(path)
+        if sensitive_attr not in header:
+            sensitive_attr = None
+        if quasi_identifiers is None:
+            columns = [column for column in header if column not in IDENTIFIER_COLUMNS and column != sensitive_attr]
+        else:
+            columns = [column for column in quasi_identifiers if column in header]
+        # Only the assessed columns are parsed
+        usecols = columns + [sensitive_attr] if sensitive_attr and sensitive_attr not in columns else columns
+        loaded = load_table(path, usecols=usecols or None, engine=engine)
+    except Exception as e:
+        result['error'] = f"load: {e}"
+        return result
+    data, encoded = loaded['data'], loaded['encoded']
+
+    if sidecar is not None:
+        try:
+            with open(sidecar) as f:
+                described = json.load(f)
+            result['undocumented_columns'] = ';'.join(
+                column for column in header if column not in described and column not in IDENTIFIER_COLUMNS)
+        except (OSError, ValueError) as e:
+            errors.append(f"sidecar: {e}")
+
+    result.update(rows=encoded.n_rows, columns=len(header), quasi_identifiers=';'.join(columns))
+
+    if columns:
+        try:
+            summary = encoded.summary(columns, sensitive_attr)
+            # k-anonymity is NaN for a table without rows
+            result.update(num_unique_rows=int(summary['num_unique_rows']),
+                          unique_share=summary['num_unique_rows'] / max(encoded.n_rows, 1),
+                          k_anonymity=None if pd.isna(summary['k_anonymity']) else int(summary['k_anonymity']),
+                          l_diversity=summary['l_diversity'])
+        except Exception as e:
+            errors.append(f"metrics: {e}")
+        if pif:
+            try:
+                result['pif'] = _pif(data, columns, percentile)
+            except Exception as e:
+                errors.append(f"pif: {e}")
+        if suda2:
+            try:
+                result.update(_suda2(encoded, columns, sample_fraction))
+            except Exception as e:
+                errors.append(f"suda2: {e}")
+    if errors:
+        result['error'] = '; '.join(errors)
+    return result
+
+
+def crawl(roots, quasi_identifiers=None, sensitive_attr=None, pif=True, suda2=False,
+          percentile=DEFAULT_PERCENTILE, sample_fraction=0.2, engine='auto', n_jobs=None, report=None,
+          progress=None):
+    """
+    Assess every tabular file of one or more BIDS datasets.
+
+    Each table is assessed by assess_table; with n_jobs > 1 the tables are
+    shared out over a pool of worker processes.
+
+    Parameters:
+        roots (str or list): Root folder(s) of the datasets.
+        quasi_identifiers, sensitive_attr, pif, suda2, percentile,
+        sample_fraction, engine: See assess_table.
+        n_jobs (int): Number of worker processes, -1 for one per core.
+        report (str): Also write the report to this .csv, .tsv or .json file.
+        progress (callable): Called as progress(done, total) after each table.
+
+    Returns:
+        pd.DataFrame: One row per table, with dataset and kind columns
+        followed by the metrics, in discovery order.
+    """
+    if isinstance(roots, (str, os.PathLike)):
+        roots = [roots]
+    tables = []
+    for root in roots:
+        tables.extend(dict(table, dataset=os.path.basename(os.path.abspath(root))) for table in find_tables(root))
+    options = dict(quasi_identifiers=quasi_identifiers, sensitive_attr=sensitive_attr, pif=pif, suda2=suda2,
+                   percentile=percentile, sample_fraction=sample_fraction, engine=engine)
+
+    results = [None] * len(tables)
+    n_jobs = min(resolve_n_jobs(n_jobs), max(len(tables), 1))
+    if n_jobs == 1:
+        for i, table in enumerate(tables):
+            results[i] = assess_table(table['path'], sidecar=table['sidecar'], **options)
+            if progress is not None:
+                progress(i + 1, len(tables))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {executor.submit(assess_table, table['path'], sidecar=table['sidecar'], **options): i
+                       for i, table in enumerate(tables)}
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done, len(tables))
+
+    rows = [dict(result, dataset=table['dataset'], kind=table['kind']) for table, result in zip(tables, results)]
+    columns = ['dataset', 'kind', 'path', 'rows', 'columns', 'quasi_identifiers', 'num_unique_rows', 'unique_share',
+               'k_anonymity', 'l_diversity']
+    if pif:
+        columns.append('pif')
+    if suda2:
+        columns.extend(['suda2_mean_dis_score', 'suda2_max_dis_score', 'suda2_top_attribute'])
+    frame = pd.DataFrame(rows, columns=columns + ['sidecar', 'undocumented_columns', 'error'])
+    if report is not None:
+        write_report(frame, report)
+    return frame
+
+
+def write_report(frame, path):
+    """Write a crawl report as JSON records, TSV or CSV, by file extension."""
+    if path.lower().endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(json.loads(frame.to_json(orient='records')), f, indent=2)
+    else:
+        frame.to_csv(path, sep='\t' if path.lower().endswith('.tsv') else ',', index=False)
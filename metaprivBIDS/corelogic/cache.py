@@ -0,0 +1,127 @@
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Default memory budget of a UniquenessCache, in bytes
+DEFAULT_MAX_BYTES = 64 * 2 ** 20
+
+
+def _nbytes(value):
+    """Approximate memory footprint of a cached result."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(k) + _nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class UniquenessCache:
+    """
+    Least recently used cache of uniqueness results.
+
+    Entries are keyed by the kind of result, the frozenset of quasi-identifier
+    columns, extra parameters and the data version of every column the result
+    depends on (see EncodedFrame.version), so a result is never served after
+    one of its columns changed. Entries are evicted, least recently used
+    first, once their estimated size exceeds max_bytes.
+
+    Parameters:
+        max_bytes (int): Memory budget of the cached results.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, encoded, kind, columns, params, depends):
+        return kind, frozenset(columns), params, encoded.version(set(columns) | set(depends))
+
+    def get(self, encoded, kind, columns, params=(), depends=()):
+        """Cached result, or None when missing."""
+        key = self._key(encoded, kind, columns, params, depends)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, encoded, kind, columns, value, params=(), depends=()):
+        """Store a result, evicting the least recently used ones if needed."""
+        key = self._key(encoded, kind, columns, params, depends)
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._entries.popitem(last=False)[1][1]
+
+    def lookup(self, encoded, kind, columns, compute, params=(), depends=()):
+        """Cached result, computed with compute() and stored on a miss."""
+        value = self.get(encoded, kind, columns, params, depends)
+        if value is None:
+            value = compute()
+            self.put(encoded, kind, columns, value, params, depends)
+        return value
+
+    def invalidate(self, columns=None):
+        """
+        Drop the results that depend on any of the given columns (all
+        results if None). Stale entries would never be served anyway; this
+        frees their memory right away.
+        """
+        if columns is None:
+            self.clear()
+            return
+        columns = set(columns)
+        for key in list(self._entries):
+            if any(column in columns for column, _ in key[3][1]):
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def summary(self, encoded, columns, sensitive_attr=None):
+        """Cached EncodedFrame.summary; the unique row count is shared with count_unique."""
+        depends = [sensitive_attr] if sensitive_attr else []
+        summary = self.lookup(encoded, 'summary', columns, lambda: encoded.summary(columns, sensitive_attr),
+                              params=(sensitive_attr,), depends=depends)
+        self.put(encoded, 'unique', columns, summary['num_unique_rows'])
+        return summary
+
+    def count_unique(self, encoded, columns):
+        """Cached EncodedFrame.count_unique (missing values kept as a value)."""
+        return self.lookup(encoded, 'unique', columns, lambda: encoded.count_unique(columns))
+
+    def leave_one_out(self, encoded, columns):
+        """
+        Cached EncodedFrame.leave_one_out. Every count is stored per column
+        set, so overlapping selections reuse each other's results.
+        """
+        columns = list(columns)
+        subsets = [columns] + [columns[:j] + columns[j + 1:] for j in range(len(columns))]
+        counts = [self.get(encoded, 'unique', subset) for subset in subsets]
+        if any(count is None for count in counts):
+            all_unique_count, counts_after_removal = encoded.leave_one_out(columns)
+            counts = [all_unique_count] + counts_after_removal
+            for subset, count in zip(subsets, counts):
+                self.put(encoded, 'unique', subset, count)
+        return counts[0], counts[1:]
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+from .diversity import Contingency
+
+
+# Distances of t-closeness: variational distance between the value
+# distributions, or Earth Mover's Distance over the ordered values with
+# equal (ordered) or value proportional (numeric) ground distances
+KINDS = ('categorical', 'ordered', 'numeric')
+
+
+def _ordered_categories(uniques):
+    dtype = getattr(uniques, 'dtype', None)
+    return isinstance(dtype, pd.CategoricalDtype) and dtype.ordered
+
+
+def attribute_kind(uniques):
+    """Default t-closeness distance of an attribute from its distinct values."""
+    if _ordered_categories(uniques):
+        return 'ordered'
+    if pd.api.types.is_numeric_dtype(uniques) and not pd.api.types.is_bool_dtype(uniques):
+        return 'numeric'
+    return 'categorical'
+
+
+def value_ranks(uniques, kind, order=None):
+    """
+    Position of every distinct value in the order of the attribute, and the
+    ground distance between consecutive positions.
+
+    Parameters:
+        uniques (array-like): Distinct values, indexed by code.
+        kind (str): 'ordered' or 'numeric'.
+        order (list): Values from lowest to highest for 'ordered'; the sort
+            order of the values (or of the categories of an ordered
+            categorical) if None.
+
+    Returns:
+        tuple: (ranks, gaps) where ranks[code] is the position of the value
+        and gaps[i] the normalized distance between positions i and i + 1,
+        summing to 1.
+    """
+    m = len(uniques)
+    if order is not None:
+        position = {value: i for i, value in enumerate(order)}
+        missing = [value for value in uniques if value not in position]
+        if missing:
+            raise ValueError(f"Values missing from the order: {missing[:5]}")
+        ranks = np.argsort(np.argsort([position[value] for value in uniques], kind='stable'), kind='stable')
+    elif _ordered_categories(uniques):
+        ranks = np.argsort(np.argsort(np.asarray(uniques.codes), kind='stable'), kind='stable')
+    else:
+        ranks = np.argsort(np.argsort(np.asarray(uniques), kind='stable'), kind='stable')
+    if m < 2:
+        return ranks, np.zeros(0)
+    if kind == 'numeric':
+        values = np.empty(m)
+        values[ranks] = np.asarray(uniques, dtype=float)
+        gaps = np.diff(values)
+        return ranks, gaps / gaps.sum() if gaps.sum() > 0 else np.full(m - 1, 1 / (m - 1))
+    return ranks, np.full(m - 1, 1 / (m - 1))
+
+
+def variational_distances(table):
+    """
+    Variational distance between the sensitive value distribution of every
+    class and that of the whole table: half the sum over values of
+    |p_class - p_table|, computed from the stored pairs only since a value
+    absent from a class contributes p_table.
+
+    Returns:
+        np.ndarray: Distance per class, NaN for classes without counted rows.
+    """
+    totals = table.class_totals()
+    overall = np.bincount(table.values, weights=table.counts, minlength=table.n_values)
+    overall = overall / max(overall.sum(), 1)
+    p = table.counts / totals[table.classes]
+    q = overall[table.values]
+    distances = 0.5 * (1 + np.bincount(table.classes, weights=np.abs(p - q) - q, minlength=table.n_classes))
+    return np.where(totals > 0, distances, np.nan)
+
+
+def earth_movers_distances(table, ranks, gaps):
+    """
+    Earth Mover's Distance between the sensitive value distribution of every
+    class and that of the whole table, over ordered values.
+
+    In one dimension the EMD is the sum over positions i of
+    gaps[i] * |P_class(i) - P_table(i)|, with P the cumulative distributions.
+    P_class only changes at the values present in the class, so the sum is
+    split into the intervals between them; on an interval P_class is a
+    constant a and P_table is increasing, so the sum over the interval comes
+    from prefix sums of gaps and gaps * P_table on both sides of the
+    position where P_table reaches a. Every class is handled at once, with
+    work proportional to the stored pairs.
+
+    Parameters:
+        table (Contingency): Counts of the sensitive values in every class.
+        ranks (np.ndarray): Position of every value code, see value_ranks.
+        gaps (np.ndarray): Ground distance between consecutive positions.
+
+    Returns:
+        np.ndarray: Distance per class, NaN for classes without counted rows.
+    """
+    m = table.n_values
+    totals = table.class_totals()
+    if m < 2:
+        return np.where(totals > 0, 0.0, np.nan)
+    overall = np.bincount(ranks[table.values], weights=table.counts, minlength=m)
+    cumulative = np.cumsum(overall / max(overall.sum(), 1))[:-1]
+    # Prefix sums over positions [0, k) of gaps and of gaps * P_table
+    weight = np.concatenate([[0.0], np.cumsum(gaps)])
+    weighted = np.concatenate([[0.0], np.cumsum(gaps * cumulative)])
+
+    rank = ranks[table.values]
+    order = np.lexsort((rank, table.classes))
+    classes, rank = table.classes[order], rank[order]
+    share = table.counts[order] / totals[classes]
+    first = np.ones(len(classes), dtype=bool)
+    first[1:] = classes[1:] != classes[:-1]
+    last = np.ones(len(classes), dtype=bool)
+    last[:-1] = first[1:]
+    # Cumulative share of the class up to and including each value
+    level = np.cumsum(share)
+    offset = np.zeros(table.n_classes)
+    offset[classes[first]] = (level - share)[first]
+    level -= offset[classes]
+
+    # Interval [rank, next rank of the class) at level, the last one up to m - 1
+    end = np.where(last, m - 1, np.roll(rank, -1))
+    split = np.clip(np.searchsorted(cumulative, level), rank, end)
+    inside = (level * (weight[split] - weight[rank]) - (weighted[split] - weighted[rank])
+              + (weighted[end] - weighted[split]) - level * (weight[end] - weight[split]))
+    distances = np.bincount(classes, weights=inside, minlength=table.n_classes)
+    # Before its lowest value the class is at level 0
+    distances += np.bincount(classes[first], weights=weighted[rank[first]], minlength=table.n_classes)
+    return np.where(totals > 0, distances, np.nan)
+
+
+def t_closeness(partition, codes, uniques, kind=None, order=None):
+    """
+    t-closeness of a sensitive attribute: the largest distance between the
+    value distribution of an equivalence class and that of the whole table.
+
+    Parameters:
+        partition (Partition): Equivalence classes of the quasi-identifiers.
+        codes (np.ndarray): Codes of the sensitive attribute, -1 for missing.
+        uniques (array-like): Distinct values of the attribute.
+        kind (str): 'categorical' (variational distance), 'ordered' (EMD
+            with equal steps between consecutive values) or 'numeric' (EMD
+            with steps proportional to the value differences); from the
+            values if None, see attribute_kind.
+        order (list): Order of the values for 'ordered', see value_ranks.
+
+    Returns:
+        dict: t_closeness, kind and class_distances (distance of every class,
+        NaN for classes whose sensitive values are all missing).
+    """
+    kind = kind or attribute_kind(uniques)
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind {kind!r}, expected one of {', '.join(KINDS)}.")
+    table = Contingency.from_partition(partition, codes, len(uniques))
+    if kind == 'categorical':
+        distances = variational_distances(table)
+    else:
+        distances = earth_movers_distances(table, *value_ranks(uniques, kind, order))
+    counted = distances[~np.isnan(distances)]
+    return {
+        "t_closeness": float(counted.max()) if len(counted) else np.nan,
+        "kind": kind,
+        "class_distances": distances,
+    }
@@ -0,0 +1,222 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .encoding import Partition, direct_address_limit
+from .lattice import _shared_array, resolve_n_jobs
+
+
+# Below this many rows the sensitive attributes of a batch are assessed in
+# the calling process, a worker pool costs more than it saves
+PARALLEL_MIN_ROWS = 200_000
+
+
+class Contingency:
+    """
+    Sparse table of the number of rows of every (equivalence class,
+    sensitive value) pair.
+
+    Only the pairs that occur are stored, sorted by class and then value, so
+    the table takes O(min(rows, classes x values)) memory however many
+    classes and values there are. Rows whose sensitive value is missing, or
+    that belong to no class, are not counted.
+
+    Attributes:
+        classes (np.ndarray): Class id of every stored pair.
+        values (np.ndarray): Sensitive value code of every stored pair.
+        counts (np.ndarray): Number of rows of every stored pair.
+        n_classes (int): Number of equivalence classes.
+        n_values (int): Number of distinct sensitive values.
+    """
+
+    __slots__ = ("classes", "values", "counts", "n_classes", "n_values")
+
+    def __init__(self, classes, values, counts, n_classes, n_values):
+        self.classes = classes
+        self.values = values
+        self.counts = counts
+        self.n_classes = n_classes
+        self.n_values = n_values
+
+    @classmethod
+    def from_partition(cls, partition, codes, cardinality):
+        """
+        Count the sensitive values of every class of a partition.
+
+        Parameters:
+            partition (Partition): The equivalence classes.
+            codes (np.ndarray): Codes of the sensitive attribute, -1 for
+                missing values.
+            cardinality (int): Number of distinct sensitive values.
+
+        Returns:
+            Contingency: The table.
+        """
+        ids = partition.ids.astype(np.int64, copy=False)
+        codes = codes.astype(np.int64, copy=False)
+        valid = (ids >= 0) & (codes >= 0)
+        if not valid.all():
+            ids, codes = ids[valid], codes[valid]
+        radix = max(cardinality, 1)
+        key = ids * radix + codes
+        space = partition.n_groups * radix
+        if space <= direct_address_limit(len(key)):
+            counts = np.bincount(key, minlength=space)
+            key = np.flatnonzero(counts)
+            counts = counts[key]
+        else:
+            key, counts = np.unique(key, return_counts=True)
+        return cls(key // radix, key % radix, counts.astype(np.int64, copy=False), partition.n_groups, cardinality)
+
+    def class_totals(self):
+        """Number of counted rows in every class."""
+        return np.bincount(self.classes, weights=self.counts, minlength=self.n_classes).astype(np.int64)
+
+    def distinct(self):
+        """Number of distinct sensitive values in every class."""
+        return np.bincount(self.classes, minlength=self.n_classes)
+
+    def entropy(self):
+        """
+        Entropy (natural log) of the sensitive values in every class, 0 for
+        classes without counted rows.
+        """
+        totals = self.class_totals()
+        weighted = np.bincount(self.classes, weights=self.counts * np.log(self.counts), minlength=self.n_classes)
+        entropy = np.zeros(self.n_classes)
+        present = totals > 0
+        entropy[present] = np.log(totals[present]) - weighted[present] / totals[present]
+        return np.maximum(entropy, 0.0)
+
+    def ranked_counts(self):
+        """
+        Counts sorted in decreasing order within every class.
+
+        Returns:
+            tuple: (classes, counts, rank) of the stored pairs, ordered by class
+            and decreasing count, rank being 0 for the most frequent value of
+            each class.
+        """
+        order = np.lexsort((-self.counts, self.classes))
+        classes, counts = self.classes[order], self.counts[order]
+        starts = np.concatenate([[0], np.cumsum(self.distinct())[:-1]])
+        return classes, counts, np.arange(len(classes)) - starts[classes]
+
+    def recursive(self, c, l):
+        """
+        Whether every class satisfies recursive (c, l)-diversity: with the
+        value counts r_1 >= r_2 >= ... >= r_m of the class,
+        r_1 < c * (r_l + r_(l+1) + ... + r_m).
+
+        Returns:
+            np.ndarray: Boolean per class.
+        """
+        classes, counts, rank = self.ranked_counts()
+        first = np.zeros(self.n_classes, dtype=np.int64)
+        first[classes[rank == 0]] = counts[rank == 0]
+        tail = np.bincount(classes[rank >= l - 1], weights=counts[rank >= l - 1], minlength=self.n_classes)
+        return (self.distinct() >= l) & (first < c * tail)
+
+
+def _lowest(values):
+    return values.min() if len(values) else np.nan
+
+
+def l_diversity(partition, codes, cardinality, c=2, l=2):
+    """
+    Distinct, entropy and recursive (c, l)-diversity of a sensitive attribute
+    from one contingency table.
+
+    Parameters:
+        partition (Partition): Equivalence classes of the quasi-identifiers.
+        codes (np.ndarray): Codes of the sensitive attribute, -1 for missing.
+        cardinality (int): Number of distinct sensitive values.
+        c (float): Constant of recursive (c, l)-diversity.
+        l (int): l of recursive (c, l)-diversity.
+
+    Returns:
+        dict: distinct_l (fewest distinct values in a class), entropy_l
+        (lowest exp(entropy) of a class), recursive_cl (whether every class
+        satisfies recursive (c, l)-diversity) and recursive_violations
+        (number of classes that do not).
+    """
+    table = Contingency.from_partition(partition, codes, cardinality)
+    recursive = table.recursive(c, l)
+    return {
+        "distinct_l": _lowest(table.distinct()),
+        "entropy_l": _lowest(np.exp(table.entropy()) * (table.class_totals() > 0)),
+        "recursive_cl": bool(recursive.all()),
+        "recursive_violations": int(np.count_nonzero(~recursive)),
+    }
+
+
+# Set in each worker process by _attach_worker
+_worker_partition = None
+_worker_codes = None
+_worker_memory = []
+
+
+def _attach_worker(ids_spec, codes_spec, counts):
+    global _worker_partition, _worker_codes
+    ids_memory = shared_memory.SharedMemory(name=ids_spec[0])
+    codes_memory = shared_memory.SharedMemory(name=codes_spec[0])
+    _worker_memory.extend([ids_memory, codes_memory])
+    ids = np.ndarray(ids_spec[1], dtype=ids_spec[2], buffer=ids_memory.buf)
+    _worker_codes = np.ndarray(codes_spec[1], dtype=codes_spec[2], buffer=codes_memory.buf, order='F')
+    _worker_partition = Partition(ids, counts)
+
+
+def _attribute_diversity(j, cardinality, c, l):
+    return l_diversity(_worker_partition, _worker_codes[:, j], cardinality, c, l)
+
+
+def batch_l_diversity(encoded, columns, sensitive_attrs, c=2, l=2, n_jobs=None):
+    """
+    l-diversity of many sensitive attributes against one partition.
+
+    The rows are grouped by the quasi-identifiers once; each sensitive
+    attribute then only costs its contingency table. With n_jobs > 1 (and
+    at least PARALLEL_MIN_ROWS rows) the tables are built in a pool of
+    worker processes that attach to the class ids and sensitive codes in
+    shared memory, as in lattice.iter_subset_unique_counts.
+
+    Parameters:
+        encoded (EncodedFrame): The encoded dataset.
+        columns (list): Quasi-identifier columns.
+        sensitive_attrs (list): Sensitive attributes.
+        c (float): Constant of recursive (c, l)-diversity.
+        l (int): l of recursive (c, l)-diversity.
+        n_jobs (int): Number of worker processes, -1 for one per core.
+
+    Returns:
+        dict: Sensitive attribute to its l_diversity result, in the order of
+        sensitive_attrs.
+    """
+    sensitive_attrs = list(dict.fromkeys(sensitive_attrs))
+    partition = encoded.partition(columns).compact()
+    cardinalities = [encoded.cardinality(attr) for attr in sensitive_attrs]
+    n_jobs = min(resolve_n_jobs(n_jobs), len(sensitive_attrs))
+    if n_jobs <= 1 or encoded.n_rows < PARALLEL_MIN_ROWS:
+        return {attr: l_diversity(partition, encoded.codes(attr), cardinality, c, l)
+                for attr, cardinality in zip(sensitive_attrs, cardinalities)}
+
+    codes = np.empty((encoded.n_rows, len(sensitive_attrs)), dtype=np.int32, order='F')
+    for j, attr in enumerate(sensitive_attrs):
+        codes[:, j] = encoded.codes(attr)
+    memories = []
+    try:
+        ids_memory, ids_spec = _shared_array(partition.ids)
+        memories.append(ids_memory)
+        codes_memory, codes_spec = _shared_array(codes)
+        memories.append(codes_memory)
+        del codes
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_worker,
+                                 initargs=(ids_spec, codes_spec, partition.counts)) as executor:
+            futures = [executor.submit(_attribute_diversity, j, cardinality, c, l)
+                       for j, cardinality in enumerate(cardinalities)]
+            return {attr: future.result() for attr, future in zip(sensitive_attrs, futures)}
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
@@ -0,0 +1,748 @@
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+import pandas as pd
+
+
+# Largest key space a mixed-radix int64 key may span before it is rehashed
+_KEY_LIMIT = np.iinfo(np.int64).max
+
+# Identifies the data an encoded frame was built from, see EncodedFrame.version
+_frame_tokens = count()
+
+# Class size below which records are reported as at risk
+DEFAULT_K = 5
+
+# Column sets whose partition an encoded frame keeps up to date, see
+# EncodedFrame.track
+MAX_TRACKED = 4
+
+# Share of changed rows above which a tracked partition is rebuilt rather
+# than re-keyed, see EncodedFrame.refresh
+REKEY_MAX_SHARE = 0.25
+
+
+def direct_address_limit(n_rows):
+    """Largest key space that is counted with np.bincount instead of hashing."""
+    return 8 * n_rows + 4096
+
+
+def _smallest_code_dtype(cardinality):
+    for dtype in (np.int8, np.int16, np.int32):
+        if cardinality < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def compact_codes(codes, cardinality):
+    """Cast codes of a column with cardinality distinct values to the smallest signed dtype."""
+    return codes.astype(_smallest_code_dtype(cardinality), copy=False)
+
+
+def column_fingerprint(values):
+    """
+    Fingerprint of the values of a column, to notice columns modified in
+    place since they were encoded.
+
+    Fixed-width columns (numbers, booleans, dates and the codes of a
+    categorical) and Arrow-backed columns such as pandas strings are hashed
+    as raw bytes, which costs far less than factorizing them; an edit
+    replaces the immutable Arrow buffers. Other columns are hashed value by
+    value with pd.util.hash_array, and get no fingerprint (None) if their
+    values cannot be hashed.
+    """
+    dtype = getattr(values, 'dtype', None)
+    if isinstance(dtype, pd.CategoricalDtype):
+        values = pd.Categorical(values)
+        return hash((tuple(values.categories), values.ordered, values.codes.tobytes()))
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return hash((dtype.str, np.ascontiguousarray(values).tobytes()))
+    array = getattr(values, 'array', values)
+    if hasattr(array, '__arrow_array__'):
+        arrow = array.__arrow_array__()
+        chunks = getattr(arrow, 'chunks', [arrow])
+        return hash((str(dtype), tuple((chunk.offset, len(chunk), tuple(
+            None if buffer is None else buffer.to_pybytes() for buffer in chunk.buffers())) for chunk in chunks)))
+    try:
+        return hash((str(dtype), pd.util.hash_array(np.asarray(values, dtype=object)).tobytes()))
+    except TypeError:
+        return None
+
+
+def encode_column(values):
+    """
+    Factorize one column to integer codes.
+
+    Parameters:
+        values (array-like): The column values.
+
+    Returns:
+        tuple: (codes, uniques) where codes is a compact signed integer array
+        with -1 marking missing values and uniques holds the distinct values
+        in order of first appearance.
+    """
+    codes, uniques = pd.factorize(values)
+    return compact_codes(codes, len(uniques)), uniques
+
+
+def densify(key, space, valid=None):
+    """
+    Map an int64 group key to dense group ids and count the rows per group.
+
+    Parameters:
+        key (np.ndarray): Non-negative int64 keys, one per row.
+        space (int): Upper bound (exclusive) of the key values.
+        valid (np.ndarray or None): Boolean mask of rows to keep. Rows outside
+            the mask get group id -1 and are not counted.
+
+    Returns:
+        tuple: (ids, counts) where ids are int64 group ids in [0, len(counts))
+        and counts[g] is the number of rows in group g.
+    """
+    if valid is not None:
+        ids = np.full(len(key), -1, dtype=np.int64)
+        ids[valid], counts = densify(key[valid], space)
+        return ids, counts
+
+    if space <= direct_address_limit(len(key)):
+        counts = np.bincount(key, minlength=space)
+        present = np.nonzero(counts > 0)[0]
+        lookup = np.empty(space, dtype=np.int64)
+        lookup[present] = np.arange(len(present), dtype=np.int64)
+        return lookup[key], counts[present]
+
+    ids, uniques = pd.factorize(key)
+    ids = ids.astype(np.int64, copy=False)
+    return ids, np.bincount(ids, minlength=len(uniques))
+
+
+def count_singletons(key, space, valid=None):
+    """Number of keys (among the valid rows) that occur exactly once."""
+    if valid is not None:
+        key = key[valid]
+    if space <= direct_address_limit(len(key)):
+        counts = np.bincount(key, minlength=space)
+    else:
+        counts = np.bincount(pd.factorize(key)[0])
+    return int(np.count_nonzero(counts == 1))
+
+
+def fold(key, space, codes, radix):
+    """
+    Append one column of codes to a mixed-radix group key.
+
+    The key is first rehashed to dense ids if the new key space would not
+    fit in an int64.
+
+    Returns:
+        tuple: (key, space) of the extended key.
+    """
+    if space > _KEY_LIMIT // radix:
+        key, counts = densify(key, space)
+        space = len(counts)
+    return key * radix + codes, space * radix
+
+
+def and_masks(left, right):
+    # Combine two row masks where None stands for "all rows"
+    return right if left is None else (left if right is None else left & right)
+
+
+def records_below(k_histogram, k):
+    """Number of rows in classes of fewer than k rows, from a class size histogram."""
+    return sum(size * classes for size, classes in k_histogram.items() if size < k)
+
+
+class Partition:
+    """
+    Equivalence classes of the rows of a dataset over a set of columns.
+
+    Attributes:
+        ids (np.ndarray): Group id of every row, -1 for rows left out because
+            of missing values.
+        counts (np.ndarray): Number of rows in each group.
+    """
+
+    __slots__ = ("ids", "counts")
+
+    def __init__(self, ids, counts):
+        self.ids = ids
+        self.counts = counts
+
+    @property
+    def n_groups(self):
+        return len(self.counts)
+
+    def num_unique(self):
+        return int(np.count_nonzero(self.counts == 1))
+
+    def k_anonymity(self):
+        return self.counts.min() if len(self.counts) else np.nan
+
+    def class_size_histogram(self):
+        """Number of equivalence classes of each size, as {size: classes}."""
+        histogram = np.bincount(self.counts)
+        sizes = np.flatnonzero(histogram)
+        return dict(zip(sizes.tolist(), histogram[sizes].tolist()))
+
+    def record_class_sizes(self):
+        """Size of the class of every row, 0 for rows left out."""
+        sizes = self.counts[np.maximum(self.ids, 0)]
+        if len(sizes) and self.ids.min() < 0:
+            sizes[self.ids < 0] = 0
+        return sizes
+
+    def records_below(self, k):
+        """Number of rows in classes of fewer than k rows."""
+        return int(self.counts[self.counts < k].sum())
+
+    def refine(self, codes, radix):
+        """
+        Split every group by one more column of codes.
+
+        Parameters:
+            codes (np.ndarray): Codes of the added column, -1 where the row must
+                be left out.
+            radix (int): Upper bound (exclusive) of the codes.
+
+        Returns:
+            Partition: The refined partition.
+        """
+        parent_ids = self.ids.astype(np.int64, copy=False)
+        codes = codes.astype(np.int64, copy=False)
+        valid = (parent_ids >= 0) & (codes >= 0)
+        key = parent_ids * radix + codes
+        ids, counts = densify(key, self.n_groups * radix, None if valid.all() else valid)
+        return Partition(ids, counts)
+
+    def combine(self, other):
+        """Intersect two partitions of the same rows."""
+        return self.refine(other.ids, max(other.n_groups, 1))
+
+    def compact(self):
+        """Return the partition with ids stored in the smallest integer type."""
+        return Partition(self.ids.astype(_smallest_code_dtype(self.n_groups), copy=False), self.counts)
+
+    def distinct_values(self, codes, cardinality):
+        """
+        Number of distinct non-missing values of a column within each group.
+
+        Parameters:
+            codes (np.ndarray): Codes of the column, -1 for missing values.
+            cardinality (int): Number of distinct values of the column.
+
+        Returns:
+            np.ndarray: Distinct value count of every group.
+        """
+        ids = self.ids.astype(np.int64, copy=False)
+        codes = codes.astype(np.int64, copy=False)
+        valid = (ids >= 0) & (codes >= 0)
+        pairs = pd.unique(ids[valid] * max(cardinality, 1) + codes[valid])
+        return np.bincount(pairs // max(cardinality, 1), minlength=self.n_groups)
+
+
+class MaintainedPartition:
+    """
+    Partition of the rows over a column set that is kept up to date when
+    the values of one of its columns change, see EncodedFrame.refresh.
+
+    Besides the class id of every row and the class sizes, the codes of
+    every class (its key) are kept. When a column is recoded, the class keys
+    are translated to the new codes and only the rows whose value changed
+    are re-keyed: they leave their class and are looked up among the keys,
+    joining an existing class or forming a new one. New classes reuse the
+    ids of the classes left empty; those still empty are dropped when the
+    partition is next handed out.
+
+    Missing values are grouped like any other value (partition with
+    dropna=False).
+    """
+
+    def __init__(self, encoded, columns):
+        self.columns = list(columns)
+        partition = encoded._partition(self.columns, dropna=False)
+        self.ids = partition.ids.astype(np.int64, copy=False)
+        self.counts = partition.counts.astype(np.int64, copy=False)
+        # First row of every class gives its key
+        first = np.empty(len(self.counts), dtype=np.int64)
+        first[self.ids[::-1]] = np.arange(len(self.ids) - 1, -1, -1)
+        self.keys = np.column_stack([encoded.codes(column)[first].astype(np.int64) for column in self.columns]) \
+            if len(self.columns) else np.zeros((len(self.counts), 0), dtype=np.int64)
+        self._shared = False
+
+    def partition(self):
+        """The current Partition, without empty classes."""
+        empty = self.counts == 0
+        if empty.any():
+            kept = ~empty
+            self.ids = (np.cumsum(kept) - 1)[self.ids]
+            self.counts, self.keys = self.counts[kept], self.keys[kept]
+        self._shared = True
+        return Partition(self.ids, self.counts)
+
+    def _lookup(self, class_keys, row_keys, radices):
+        # Position of every row key among the class keys (-1 when absent),
+        # and a group id of every row key
+        if np.prod(radices, dtype=float) < 2 ** 62:
+            fold_classes = np.zeros(len(class_keys), dtype=np.int64)
+            fold_rows = np.zeros(len(row_keys), dtype=np.int64)
+            for j, radix in enumerate(radices):
+                fold_classes = fold_classes * radix + class_keys[:, j] + 1
+                fold_rows = fold_rows * radix + row_keys[:, j] + 1
+            # One hash pass over both: the class keys are distinct, so they
+            # take the first codes and a row code below their number is a class
+            groups = pd.factorize(np.concatenate([fold_classes, fold_rows]))[0][len(fold_classes):]
+            return np.where(groups < len(fold_classes), groups, -1), groups
+        found = pd.MultiIndex.from_arrays(class_keys.T).get_indexer(pd.MultiIndex.from_arrays(row_keys.T))
+        return found, np.unique(row_keys, axis=0, return_inverse=True)[1].reshape(-1)
+
+    def update(self, encoded, remaps, changed):
+        """
+        Follow the recoding of some of the columns.
+
+        Parameters:
+            encoded (EncodedFrame): The frame, holding the new codes.
+            remaps (dict): Recoded column to the new code of every old code,
+                -2 for values that no longer occur.
+            changed (np.ndarray): Rows whose value changed in any of them.
+        """
+        for column, remap in remaps.items():
+            j = self.columns.index(column)
+            self.keys[:, j] = np.append(remap, -1)[self.keys[:, j]]
+        if not len(changed):
+            return
+        if self._shared:
+            self.ids = self.ids.copy()
+            self._shared = False
+        self.counts = self.counts - np.bincount(self.ids[changed], minlength=len(self.counts))
+
+        row_keys = np.column_stack([encoded.codes(c)[changed].astype(np.int64) for c in self.columns])
+        radices = [encoded.cardinality(c) + 2 for c in self.columns]
+        # Only classes that still have rows and hold one of the new values of
+        # a recoded column can be joined; the keys of empty classes may repeat
+        j = self.columns.index(next(iter(remaps)))
+        candidates = np.flatnonzero((self.counts > 0) & np.isin(self.keys[:, j], pd.unique(row_keys[:, j])))
+        found, groups = self._lookup(self.keys[candidates], row_keys, radices)
+        ids = np.full(len(changed), -1, dtype=np.int64)
+        ids[found >= 0] = candidates[found[found >= 0]]
+
+        new = np.flatnonzero(ids < 0)
+        if len(new):
+            inverse = pd.factorize(groups[new])[0]
+            first = np.empty(inverse.max() + 1, dtype=np.int64)
+            first[inverse[::-1]] = new[::-1]
+            # New classes take the places of the emptied ones first, so the
+            # ids rarely need compacting
+            free = np.flatnonzero(self.counts == 0)[:len(first)]
+            slots = np.concatenate([free, len(self.counts) + np.arange(len(first) - len(free))])
+            grow = len(first) - len(free)
+            self.keys = np.concatenate([self.keys, np.zeros((grow, len(self.columns)), dtype=np.int64)])
+            self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+            self.keys[slots] = row_keys[first]
+            ids[new] = slots[inverse]
+        self.ids[changed] = ids
+        self.counts += np.bincount(ids, minlength=len(self.counts))
+
+
+class EncodedFrame:
+    """
+    Integer-encoded view of a DataFrame shared by all uniqueness metrics.
+
+    Columns are factorized lazily, once, the first time a metric needs them.
+    Any column subset can then be grouped with integer arithmetic only: the
+    codes are folded into a single mixed-radix int64 key, which is rehashed
+    to dense ids whenever the next column would overflow it, and group sizes
+    come from np.bincount.
+    """
+
+    def __init__(self, data=None, n_rows=None):
+        self._data = data
+        self.n_rows = len(data) if data is not None else n_rows
+        self._codes = {}
+        self._uniques = {}
+        self._has_missing = {}
+        self.token = next(_frame_tokens)
+        self._versions = {}
+        self._tracked = OrderedDict()
+        self._fingerprints = {}
+
+    @classmethod
+    def from_codes(cls, codes, uniques, data=None, fingerprints=None):
+        """
+        Build an encoded frame from already factorized columns.
+
+        Parameters:
+            codes (dict): Column name to integer code array (-1 for missing).
+            uniques (dict): Column name to the distinct values of the column.
+            data (pd.DataFrame): Optional DataFrame the codes were taken from;
+                its other columns are factorized on first use.
+            fingerprints (dict): column_fingerprint of the columns when the
+                codes were taken; computed from data if None.
+
+        Returns:
+            EncodedFrame: The encoded frame.
+        """
+        n_rows = len(next(iter(codes.values()))) if codes else 0
+        encoded = cls(data, n_rows=n_rows)
+        for column, column_codes in codes.items():
+            encoded._store(column, column_codes, uniques[column])
+        if fingerprints is None and data is not None:
+            fingerprints = {column: column_fingerprint(data[column]) for column in codes if column in data.columns}
+        encoded._fingerprints.update(fingerprints or {})
+        return encoded
+
+    @property
+    def columns(self):
+        if self._data is not None:
+            return list(self._data.columns)
+        return list(self._codes)
+
+    def _store(self, column, codes, uniques):
+        self._codes[column] = codes
+        self._uniques[column] = uniques
+        self._has_missing[column] = bool((codes < 0).any())
+
+    def codes(self, column):
+        if column not in self._codes:
+            if self._data is None or column not in self._data.columns:
+                raise KeyError(column)
+            self._store(column, *encode_column(self._data[column]))
+            self._fingerprints[column] = column_fingerprint(self._data[column])
+        return self._codes[column]
+
+    def uniques(self, column):
+        self.codes(column)
+        return self._uniques[column]
+
+    def cardinality(self, column):
+        """Number of distinct non-missing values in a column."""
+        self.codes(column)
+        return len(self._uniques[column])
+
+    def has_missing(self, column):
+        self.codes(column)
+        return self._has_missing[column]
+
+    def invalidate(self, columns=None):
+        """
+        Forget the codes of the given columns (all columns if None) so they
+        are factorized again from the data on next use.
+        """
+        if columns is None:
+            columns = list(self._codes)
+            self.token = next(_frame_tokens)
+            self._tracked = OrderedDict((key, None) for key in self._tracked)
+        for column in columns:
+            self._codes.pop(column, None)
+            self._uniques.pop(column, None)
+            self._has_missing.pop(column, None)
+            self._fingerprints.pop(column, None)
+            self._versions[column] = self._versions.get(column, 0) + 1
+            for key in self._tracked:
+                if column in key:
+                    self._tracked[key] = None
+
+    def refresh(self, columns):
+        """
+        Encode columns again after their values were modified in the data,
+        e.g. rounded or combined, and update the tracked partitions by
+        re-keying only the rows whose value changed.
+
+        Columns that were not encoded yet, or whose data is missing or no
+        longer has n_rows rows, are simply invalidated. Columns in which no
+        row changed keep their codes and version. When more than
+        REKEY_MAX_SHARE of the rows changed, or when the key space of a
+        tracked set no longer needs hashing, the tracked partition is
+        rebuilt on next use instead.
+
+        Returns:
+            dict: Column to the indices of its changed rows, for the columns
+            that were recoded.
+        """
+        changed_rows, remaps = {}, {}
+        for column in columns:
+            if column not in self._codes or self._data is None or column not in self._data.columns \
+                    or len(self._data) != self.n_rows:
+                self.invalidate([column])
+                continue
+            old_codes, old_uniques = self._codes[column], self._uniques[column]
+            codes, uniques = encode_column(self._data[column])
+            self._fingerprints[column] = column_fingerprint(self._data[column])
+            # The new values in the old codes, -2 for values that did not occur
+            as_old = pd.Index(old_uniques).get_indexer(uniques)
+            as_old = np.append(np.where(as_old < 0, -2, as_old), -1)[codes]
+            changed = np.flatnonzero(as_old != old_codes)
+            if not len(changed) and uniques.dtype == old_uniques.dtype:
+                continue
+            changed_rows[column] = changed
+            remaps[column] = pd.Index(uniques).get_indexer(old_uniques)
+            remaps[column][remaps[column] < 0] = -2
+            self._store(column, codes, uniques)
+            self._versions[column] = self._versions.get(column, 0) + 1
+
+        for key, tracked in self._tracked.items():
+            recoded = [column for column in remaps if column in key]
+            if tracked is None or not recoded:
+                continue
+            if len(recoded) == 1:
+                changed = changed_rows[recoded[0]]
+            else:
+                mask = np.zeros(self.n_rows, dtype=bool)
+                for column in recoded:
+                    mask[changed_rows[column]] = True
+                changed = np.flatnonzero(mask)
+            if len(changed) > REKEY_MAX_SHARE * self.n_rows or not self._hashed(key):
+                self._tracked[key] = None
+            else:
+                tracked.update(self, {column: remaps[column] for column in recoded}, changed)
+        return changed_rows
+
+    def modified_columns(self, columns=None):
+        """
+        Encoded columns (of columns, all if None) that may have been modified
+        in the data since they were encoded: those dropped from it, those
+        whose fingerprint changed and those without a fingerprint (see
+        column_fingerprint). Passing them to refresh recodes the ones that
+        did change.
+        """
+        if self._data is None:
+            return []
+        columns = self._codes if columns is None else [column for column in dict.fromkeys(columns)
+                                                         if column in self._codes]
+        return [column for column in columns
+                if column not in self._data.columns or self._fingerprints.get(column) is None
+                or column_fingerprint(self._data[column]) != self._fingerprints[column]]
+
+    def snapshot(self, columns):
+        """
+        Encoded frame of the given columns as they are now, e.g. for a worker
+        thread. It shares the code arrays, which refresh replaces rather than
+        modifies, so later refresh calls on this frame do not affect it.
+
+        Parameters:
+            columns (list): Columns to include; encoded first if needed.
+
+        Returns:
+            EncodedFrame: Frame without data, partitions or cached state.
+        """
+        columns = list(dict.fromkeys(columns))
+        return EncodedFrame.from_codes({column: self.codes(column) for column in columns},
+                                       {column: self.uniques(column) for column in columns})
+
+    def track(self, columns):
+        """
+        Keep the partition over columns up to date across refresh calls,
+        for the MAX_TRACKED most recently tracked column sets. Sets whose
+        key space is small enough for np.bincount are simply regrouped.
+        """
+        key = frozenset(columns)
+        if key in self._tracked:
+            self._tracked.move_to_end(key)
+        else:
+            self._tracked[key] = None
+            while len(self._tracked) > MAX_TRACKED:
+                self._tracked.popitem(last=False)
+
+    def version(self, columns):
+        """
+        Data version of a set of columns.
+
+        The version changes whenever one of the columns is invalidated or the
+        whole frame is, so results computed from the columns can be cached
+        under it.
+        """
+        return self.token, frozenset((column, self._versions.get(column, 0)) for column in columns)
+
+    def rebind(self, data, columns=None):
+        """
+        Point the encoding at a copy of its DataFrame, keeping the codes.
+
+        Columns that differ between the two frames must be invalidated.
+        Columns whose values are the same but stored differently, e.g. by
+        compact_dtypes, are given in columns so that they are fingerprinted
+        again rather than reported by modified_columns.
+        """
+        self._data = data
+        for column in columns or []:
+            if column in self._codes:
+                self._fingerprints[column] = column_fingerprint(data[column])
+
+    def normalized_codes(self, column, dropna=False):
+        """
+        Codes of a column ready for key folding.
+
+        Parameters:
+            column (str): Column name.
+            dropna (bool): If False, missing values become a category of their
+                own; if True they keep the code -1 so the row is left out.
+
+        Returns:
+            tuple: (codes, radix) with codes in [0, radix) (or -1).
+        """
+        codes = self.codes(column)
+        cardinality = self.cardinality(column)
+        if dropna or not self.has_missing(column):
+            return codes, max(cardinality, 1)
+        return np.where(codes < 0, cardinality, codes), cardinality + 1
+
+    def partition(self, columns, dropna=False):
+        """
+        Group the rows by the values of the given columns.
+
+        Parameters:
+            columns (list): Columns defining the equivalence classes.
+            dropna (bool): If True, rows with a missing value in any of the
+                columns belong to no group (as DataFrame.groupby does);
+                otherwise missing values are grouped like any other value
+                (as value_counts(dropna=False) does).
+
+        Returns:
+            Partition: The equivalence classes.
+        """
+        key = frozenset(columns)
+        if not dropna and len(columns) and key in self._tracked and self._hashed(columns):
+            if self._tracked[key] is None:
+                self._tracked[key] = MaintainedPartition(self, columns)
+            self._tracked.move_to_end(key)
+            return self._tracked[key].partition()
+        return self._partition(columns, dropna)
+
+    def _hashed(self, columns):
+        # Whether grouping the columns needs hashing. Re-keying the changed
+        # rows only pays off then: a key space that is counted with
+        # np.bincount is regrouped faster from scratch
+        space = np.prod([self.cardinality(column) + self.has_missing(column) or 1 for column in columns], dtype=float)
+        return space > direct_address_limit(self.n_rows)
+
+    def _partition(self, columns, dropna):
+        if not len(columns):
+            ids = np.zeros(self.n_rows, dtype=np.int64)
+            return Partition(ids, np.array([self.n_rows] if self.n_rows else [], dtype=np.int64))
+
+        key, space, valid = self._fold_columns(columns, dropna)
+        ids, counts = densify(key, space, valid)
+        return Partition(ids, counts)
+
+    def key_codes(self, column, dropna=False):
+        """
+        Non-negative int64 codes of a column for key folding.
+
+        Returns:
+            tuple: (codes, radix, valid) where valid is the mask of rows to
+            keep, or None when no row is left out.
+        """
+        codes, radix = self.normalized_codes(column, dropna)
+        valid = None
+        if dropna and self.has_missing(column):
+            valid = codes >= 0
+            codes = np.where(valid, codes, 0)
+        return codes.astype(np.int64), radix, valid
+
+    def _fold_columns(self, columns, dropna):
+        key, space, valid = np.zeros(self.n_rows, dtype=np.int64), 1, None
+        for column in columns:
+            codes, radix, column_valid = self.key_codes(column, dropna)
+            key, space = fold(key, space, codes, radix)
+            valid = and_masks(valid, column_valid)
+        return key, space, valid
+
+    def count_unique(self, columns, dropna=False):
+        """Number of rows whose combination of values in columns is unique."""
+        return count_singletons(*self._fold_columns(columns, dropna))
+
+    def leave_one_out(self, columns, dropna=False):
+        """
+        Unique row counts of every subset obtained by dropping one column.
+
+        The group keys of every prefix columns[:j] are built once, then the
+        suffix keys columns[j+1:] are built from the right and each "drop
+        column j" key is the concatenation of prefix j and suffix j + 1, so
+        every column is folded twice and each subset is hashed only once.
+
+        Parameters:
+            columns (list): The selected columns.
+            dropna (bool): Missing value handling, see partition.
+
+        Returns:
+            tuple: (unique count over all columns, list of unique counts with
+            column j left out, in the order of columns).
+        """
+        columns = list(columns)
+        entries = [self.key_codes(column, dropna) for column in columns]
+        prefixes = [(np.zeros(self.n_rows, dtype=np.int64), 1, None)]
+        for codes, radix, valid in entries:
+            key, space, prefix_valid = prefixes[-1]
+            prefixes.append(fold(key, space, codes, radix) + (and_masks(prefix_valid, valid),))
+
+        all_unique_count = count_singletons(*prefixes.pop())
+        counts_after_removal = [0] * len(columns)
+        suffix_key, suffix_space, suffix_valid = np.zeros(self.n_rows, dtype=np.int64), 1, None
+        for j in range(len(columns) - 1, -1, -1):
+            key, space, valid = prefixes.pop()
+            if space > _KEY_LIMIT // suffix_space:
+                key, counts = densify(key, space)
+                suffix_key, suffix_counts = densify(suffix_key, suffix_space)
+                space, suffix_space = len(counts), len(suffix_counts)
+            key, space = fold(key, space, suffix_key, suffix_space)
+            counts_after_removal[j] = count_singletons(key, space, and_masks(valid, suffix_valid))
+
+            codes, radix, column_valid = entries[j]
+            suffix_key, suffix_space = fold(suffix_key, suffix_space, codes, radix)
+            suffix_valid = and_masks(suffix_valid, column_valid)
+        return all_unique_count, counts_after_removal
+
+    def k_distribution(self, columns, k=DEFAULT_K, dropna=False):
+        """
+        Distribution of the equivalence class sizes, from a single grouping.
+
+        Parameters:
+            columns (list): Quasi-identifier columns.
+            k (int): Records in classes of fewer than k rows are counted as
+                at risk.
+            dropna (bool): Missing value handling, see partition; rows left
+                out get a class size of 0.
+
+        Returns:
+            dict: record_class_sizes (class size of every row), k_anonymity,
+            k_histogram ({class size: number of classes}), records_below_k and
+            share_below_k (of all rows).
+        """
+        partition = self.partition(columns, dropna)
+        below = partition.records_below(k)
+        return {
+            "record_class_sizes": partition.record_class_sizes(),
+            "k_anonymity": partition.k_anonymity(),
+            "k_histogram": partition.class_size_histogram(),
+            "records_below_k": below,
+            "share_below_k": below / self.n_rows if self.n_rows else 0.0,
+        }
+
+    def summary(self, columns, sensitive_attr=None):
+        """
+        Uniqueness, k-anonymity and l-diversity from a single grouping.
+
+        Missing values in the quasi-identifiers are treated as a value of their
+        own, so every row belongs to exactly one equivalence class. Missing
+        values of the sensitive attribute are not counted as a distinct value.
+
+        Parameters:
+            columns (list): Quasi-identifier columns.
+            sensitive_attr (str or None): Sensitive attribute for l-diversity.
+
+        Returns:
+            dict: num_unique_rows, k_anonymity, k_histogram ({class size:
+            number of classes}) and l_diversity (None without a sensitive
+            attribute).
+        """
+        partition = self.partition(columns)
+        l_diversity = None
+        if sensitive_attr:
+            distinct = partition.distinct_values(self.codes(sensitive_attr), self.cardinality(sensitive_attr))
+            l_diversity = distinct.min() if len(distinct) else np.nan
+        return {
+            "num_unique_rows": partition.num_unique(),
+            "k_anonymity": partition.k_anonymity(),
+            "k_histogram": partition.class_size_histogram(),
+            "l_diversity": l_diversity,
+        }
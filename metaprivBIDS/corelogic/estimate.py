@@ -0,0 +1,192 @@
+import time
+from math import comb
+
+import numpy as np
+
+from .encoding import densify, direct_address_limit
+from .lattice import resolve_n_jobs
+
+
+# Seconds of one grouping step per path and calibrated row count
+_calibration = {}
+
+# Largest synthetic row count timed by calibrate; larger datasets are
+# extrapolated linearly from it
+_MAX_CALIBRATION_ROWS = 2 ** 18
+
+# Python-side bookkeeping per grouping step and memory per reported subset
+# and per result row
+_SECONDS_PER_STEP = 2e-5
+_BYTES_PER_SUBSET = 120
+_BYTES_PER_RESULT_ROW = 200
+
+
+def _time_step(key, space, repeats):
+    best = np.inf
+    for _ in range(repeats):
+        started = time.perf_counter()
+        densify(key, space)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate(n_rows, repeats=5, refresh=False):
+    """
+    Time the grouping step the subset lattice is made of.
+
+    One step folds a column of codes into the group ids of its parent subset
+    and rehashes the key, either by direct addressing or, when the key space
+    is too large for that, by hashing. Both are timed on synthetic codes of
+    about n_rows rows (rounded to a power of two) once per process.
+
+    Parameters:
+        n_rows (int): Number of rows of the workload.
+        repeats (int): Number of timed steps per path, the fastest is kept.
+        refresh (bool): Measure again even if already calibrated.
+
+    Returns:
+        dict: Seconds per 'direct' and per 'hashed' grouping step of n_rows.
+    """
+    size = min(1 << max(int(n_rows) - 1, 1).bit_length(), _MAX_CALIBRATION_ROWS)
+    if size not in _calibration or refresh:
+        rng = np.random.default_rng(0)
+        ids = rng.integers(0, max(size // 4, 1), size).astype(np.int64)
+        codes = rng.integers(0, 4, size).astype(np.int64)
+        wide = rng.integers(0, 2 ** 40, size).astype(np.int64)
+        _calibration[size] = {
+            'direct': _time_step(ids * 4 + codes, size, repeats),
+            'hashed': _time_step(wide, 2 ** 40, repeats),
+        }
+    scale = n_rows / size
+    return {path: seconds * scale for path, seconds in _calibration[size].items()}
+
+
+class CostEstimate:
+    """
+    Predicted cost of a workload.
+
+    Attributes:
+        subsets (int): Number of results (column combinations or subsets).
+        steps (int): Number of grouping steps over all rows.
+        peak_memory (int): Expected peak memory in bytes.
+        seconds (float): Expected wall time in seconds.
+    """
+
+    def __init__(self, subsets, steps, peak_memory, seconds):
+        self.subsets = subsets
+        self.steps = steps
+        self.peak_memory = peak_memory
+        self.seconds = seconds
+
+    def __repr__(self):
+        return (f"CostEstimate(subsets={self.subsets}, steps={self.steps}, "
+                f"peak_memory={self.peak_memory}, seconds={self.seconds:.3g})")
+
+    def __str__(self):
+        return f"{self.subsets:,} subsets, ~{format_bytes(self.peak_memory)} memory, ~{format_seconds(self.seconds)}"
+
+
+def format_bytes(n_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n_bytes < 1024:
+            return f"{n_bytes:.0f} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:.1f} TB"
+
+
+def format_seconds(seconds):
+    for unit, length in (('days', 86400), ('h', 3600), ('min', 60)):
+        if seconds >= length:
+            return f"{seconds / length:.1f} {unit}"
+    return f"{seconds:.1f} s"
+
+
+def _lattice_steps(n_columns, sizes):
+    # Number of subsets of each size visited by LatticeWalker: a subset of
+    # size s whose last column is j (there are comb(j, s - 1) of them) is
+    # visited when a requested size is still reachable from it
+    sizes = sorted(size for size in sizes if 0 < size <= n_columns)
+    steps = {}
+    if not sizes:
+        return steps
+    for size in range(1, sizes[-1] + 1):
+        target = min(s for s in sizes if s >= size)
+        steps[size] = sum(comb(j, size - 1) for j in range(n_columns) if target <= size + n_columns - j - 1)
+    return steps
+
+
+def _step_seconds(n_rows, cardinalities, steps):
+    # A step of size s is direct addressed while the groups of its parent
+    # times the cardinality of the added column fit the direct address limit;
+    # the group count is extrapolated from the typical column cardinality
+    calibration = calibrate(n_rows)
+    typical = float(np.exp(np.mean(np.log(np.maximum(cardinalities, 1))))) if len(cardinalities) else 1.0
+    limit = direct_address_limit(n_rows)
+    seconds = 0.0
+    for size, count in steps.items():
+        groups = min(float(n_rows), typical ** (size - 1))
+        seconds += count * (calibration['direct' if groups * typical <= limit else 'hashed'] + _SECONDS_PER_STEP)
+    return seconds
+
+
+def estimate_combined_column_contribution(n_rows, cardinalities, min_size=3, max_size=7, n_jobs=None):
+    """
+    Predict the cost of combined_column_contribution.
+
+    The walk counts every combination of min_size to max_size columns and
+    every complement of one, so the number of grouping steps follows from
+    the number of columns alone; their cost comes from calibrate.
+
+    Parameters:
+        n_rows (int): Number of rows.
+        cardinalities (list): Number of distinct values of each selected
+            column, e.g. from load_data's column_unique_counts.
+        min_size (int): Smallest combination size.
+        max_size (int): Largest combination size.
+        n_jobs (int): Number of worker processes, -1 for one per core.
+
+    Returns:
+        CostEstimate: subsets is the number of scored combinations.
+    """
+    n_columns = len(cardinalities)
+    sizes = {size for size in range(min_size, max_size + 1) if 0 < size <= n_columns}
+    requested = sizes | {n_columns - size for size in sizes if 0 < n_columns - size}
+    steps = _lattice_steps(n_columns, requested)
+    combinations = sum(comb(n_columns, size) for size in sizes)
+    reported = sum(comb(n_columns, size) for size in requested)
+    n_jobs = resolve_n_jobs(n_jobs)
+
+    # Codes and ids of every subset on the walk stack, per worker, plus the
+    # shared code matrix, the counts of every subset and the result rows
+    depth = max(steps) if steps else 0
+    peak_memory = (n_rows * n_columns * 4 + n_jobs * depth * n_rows * 9
+                   + reported * _BYTES_PER_SUBSET + combinations * _BYTES_PER_RESULT_ROW)
+    seconds = _step_seconds(n_rows, cardinalities, steps) / n_jobs
+    return CostEstimate(combinations, sum(steps.values()), peak_memory, seconds)
+
+
+def estimate_suda2(n_rows, cardinalities, max_size=None):
+    """
+    Predict the cost of compute_suda2.
+
+    SUDA2 searches the minimal sample uniques of every row among the
+    subsets of up to max_size key variables. The search prunes supersets of
+    uniques, so the estimate, which counts every subset once, is an upper
+    bound.
+
+    Parameters:
+        n_rows (int): Number of rows.
+        cardinalities (list): Number of distinct values of each key variable.
+        max_size (int): Largest subset searched, all variables if None.
+
+    Returns:
+        CostEstimate: subsets is the number of searched variable subsets.
+    """
+    n_columns = len(cardinalities)
+    max_size = n_columns if max_size is None else min(max_size, n_columns)
+    steps = {size: comb(n_columns, size) for size in range(1, max_size + 1)}
+    subsets = sum(steps.values())
+    # The data frame handed to R, the per-row scores and the search stack
+    peak_memory = n_rows * n_columns * 8 * 2 + n_rows * 16 + max_size * n_rows * 8 + subsets * _BYTES_PER_SUBSET
+    seconds = _step_seconds(n_rows, cardinalities, steps)
+    return CostEstimate(subsets, subsets, peak_memory, seconds)
@@ -0,0 +1,300 @@
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .loading import DEFAULT_CHUNKSIZE, ColumnEncoder, compression, separator
+
+
+# Bumped whenever the layout of the state files changes
+STATE_FORMAT = 1
+
+
+def prefix_hashes(file_path, n_bytes, block_size=2 ** 20):
+    """
+    BLAKE2b digests of the first n_bytes of a file and of the whole file,
+    from a single read.
+
+    Returns:
+        tuple: (prefix digest or None if the file is shorter, full digest,
+        size in bytes read).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    prefix = None
+    size = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            if prefix is None and size == n_bytes:
+                prefix = digest.hexdigest()
+            block = f.read(block_size if prefix is not None else min(block_size, n_bytes - size))
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+    return prefix, digest.hexdigest(), size
+
+
+def _find(sorted_values, values):
+    # Insertion positions of values in sorted_values and whether they are in it
+    positions = np.searchsorted(sorted_values, values)
+    found = positions < len(sorted_values)
+    found[found] = sorted_values[positions[found]] == values[found]
+    return positions, found
+
+
+def _grow(histogram, size):
+    if size >= len(histogram):
+        histogram = np.concatenate([histogram, np.zeros(max(size + 1 - len(histogram), len(histogram)), np.int64)])
+    return histogram
+
+
+class IncrementalAssessment:
+    """
+    Uniqueness, k-anonymity and l-diversity of a table that grows by
+    appended rows.
+
+    Only the equivalence classes of the quasi-identifiers are kept: the key
+    (codes of the quasi-identifiers) and size of every class, the distinct
+    sensitive values of every class and histograms of the class sizes and
+    distinct value counts. update checks whether the file only grew by
+    appending rows, by hashing the part already read and checking that it
+    ended with a line break, and if so parses and encodes the new rows alone
+    and moves the classes they fall in between histogram bins; otherwise the
+    table is read again from the start.
+
+    Values are compared as text, so that a value encodes the same whether
+    it was read with the first rows or appended later. Missing
+    quasi-identifier values form a value of their own and missing sensitive
+    values are not counted, as in EncodedFrame.summary. Compressed tables
+    cannot be appended to and are always read in full.
+
+    Parameters:
+        file_path (str): Path of the .csv or .tsv file.
+        columns (list): Quasi-identifier columns.
+        sensitive_attr (str): Sensitive attribute for l-diversity.
+        chunksize (int): Rows parsed per chunk.
+        state_path (str): File the state is kept in between runs, e.g.
+            between nightly checks; it is read on creation when it matches
+            the file and columns, and written after each update.
+    """
+
+    def __init__(self, file_path, columns, sensitive_attr=None, chunksize=DEFAULT_CHUNKSIZE, state_path=None):
+        if not columns:
+            raise ValueError("No columns selected.")
+        self.file_path = file_path
+        self.columns = list(columns)
+        self.sensitive_attr = sensitive_attr
+        self.chunksize = chunksize
+        self.state_path = state_path
+        self._reset()
+        if state_path is not None and os.path.exists(state_path):
+            self._read_state()
+
+    def _reset(self):
+        self.header = None
+        self.n_bytes = 0
+        self.digest = None
+        self.n_rows = 0
+        self.encoders = {column: ColumnEncoder() for column in self._parsed_columns}
+        self.keys = np.zeros((0, len(self.columns)), dtype=np.int32)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.distinct = np.zeros(0, dtype=np.int64)
+        # Sorted (class id << 32 | sensitive code) of the classes' values
+        self.pairs = np.zeros(0, dtype=np.int64)
+        self._index()
+        self.size_histogram = np.zeros(2, dtype=np.int64)
+        self.distinct_histogram = np.zeros(2, dtype=np.int64)
+
+    @property
+    def _parsed_columns(self):
+        if self.sensitive_attr and self.sensitive_attr not in self.columns:
+            return self.columns + [self.sensitive_attr]
+        return self.columns
+
+    def update(self):
+        """
+        Bring the assessment up to date with the file.
+
+        Returns:
+            dict: mode ('full', 'append' or 'unchanged'), new_rows, and the
+            metrics (see metrics).
+        """
+        prefix, digest, size = prefix_hashes(self.file_path, self.n_bytes)
+        appendable = self.digest is not None and compression(self.file_path) is None and prefix == self.digest
+        if appendable and size > self.n_bytes and not self._line_ended():
+            # Appended bytes continue the last line rather than add rows
+            appendable = False
+        if appendable and size == self.n_bytes:
+            mode, new_rows = 'unchanged', 0
+        elif appendable:
+            mode, new_rows = 'append', self._read(self.n_bytes, size)
+        else:
+            self._reset()
+            mode, new_rows = 'full', self._read(0, size)
+        if mode != 'unchanged':
+            self.n_bytes, self.digest = size, digest
+            if self.state_path is not None:
+                self._write_state()
+        return dict(self.metrics(), mode=mode, new_rows=new_rows)
+
+    def _line_ended(self):
+        if not self.n_bytes:
+            return False
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.n_bytes - 1)
+            return f.read(1) == b'\n'
+
+    def _bits(self):
+        # Bits of every quasi-identifier code plus one (-1 for missing); they
+        # grow by one when a column's distinct values double
+        return [(len(self.encoders[column]) + 1).bit_length() for column in self.columns]
+
+    def _fold(self, keys):
+        # One sortable value per row of quasi-identifier codes: an int64 when
+        # the codes fit, the raw bytes of the row otherwise
+        if sum(self._key_bits) <= 62:
+            folded = np.zeros(len(keys), dtype=np.int64)
+            for j, bits in enumerate(self._key_bits):
+                folded = (folded << bits) | (keys[:, j].astype(np.int64) + 1)
+            return folded
+        return np.ascontiguousarray(keys, dtype=np.int32).view(np.dtype((np.void, 4 * keys.shape[1]))).ravel()
+
+    def _index(self):
+        # Sorted folded keys of the classes and their class ids
+        self._key_bits = self._bits()
+        folded = self._fold(self.keys)
+        self._class_ids = np.argsort(folded, kind='stable')
+        self._sorted_keys = folded[self._class_ids]
+
+    def _read(self, offset, size):
+        # Parse and add the rows between offset and size, the header being
+        # read once
+        sep = separator(self.file_path)
+        if offset == 0:
+            header = pd.read_csv(self.file_path, sep=sep, nrows=0, dtype=str).columns
+            self.header = list(header)
+            kwargs = {}
+        else:
+            kwargs = {'header': None, 'names': self.header}
+        stripped = {name.strip(): name for name in self.header}
+        missing = [column for column in self._parsed_columns if column not in stripped]
+        if missing:
+            raise ValueError(f"Columns not found in {self.file_path}: {', '.join(missing)}")
+        usecols = [stripped[column] for column in self._parsed_columns]
+        if offset == 0:
+            source = self.file_path
+        else:
+            # Only the hashed bytes, in case the file grows meanwhile
+            with open(self.file_path, 'rb') as f:
+                f.seek(offset)
+                source = io.BytesIO(f.read(size - offset))
+        new_rows = 0
+        for chunk in pd.read_csv(source, sep=sep, usecols=usecols, dtype=str, chunksize=self.chunksize, **kwargs):
+            self._add(chunk.rename(columns=lambda name: name.strip()))
+            new_rows += len(chunk)
+        return new_rows
+
+    def _add(self, chunk):
+        n = len(chunk)
+        if not n:
+            return
+        codes = {column: self.encoders[column].encode(chunk[column].to_numpy()) for column in self._parsed_columns}
+        if self._bits() != self._key_bits:
+            self._index()
+        keys = np.column_stack([codes[column] for column in self.columns]).astype(np.int32)
+        folded, first, inverse, chunk_counts = np.unique(self._fold(keys), return_index=True, return_inverse=True,
+                                                         return_counts=True)
+        inverse = inverse.reshape(-1)
+
+        # Class ids of the keys in the chunk, new classes appended
+        positions, found = _find(self._sorted_keys, folded)
+        ids = np.empty(len(folded), dtype=np.int64)
+        ids[found] = self._class_ids[positions[found]]
+        new = np.flatnonzero(~found)
+        if len(new):
+            ids[new] = np.arange(len(self.counts), len(self.counts) + len(new))
+            self._sorted_keys = np.insert(self._sorted_keys, positions[new], folded[new])
+            self._class_ids = np.insert(self._class_ids, positions[new], ids[new])
+            self.keys = np.concatenate([self.keys, keys[first[new]]])
+            self.counts = np.concatenate([self.counts, np.zeros(len(new), dtype=np.int64)])
+            self.distinct = np.concatenate([self.distinct, np.zeros(len(new), dtype=np.int64)])
+            self.distinct_histogram[0] += len(new)
+
+        # Move the touched classes to their new size
+        old_sizes = self.counts[ids]
+        np.subtract.at(self.size_histogram, old_sizes[old_sizes > 0], 1)
+        self.counts[ids] += chunk_counts
+        self.size_histogram = _grow(self.size_histogram, int(self.counts[ids].max()))
+        np.add.at(self.size_histogram, self.counts[ids], 1)
+
+        if self.sensitive_attr:
+            sensitive = codes[self.sensitive_attr]
+            present = sensitive >= 0
+            pairs = np.unique(ids[inverse][present] << 32 | sensitive[present])
+            positions, found = _find(self.pairs, pairs)
+            new_pairs = pairs[~found]
+            if len(new_pairs):
+                self.pairs = np.insert(self.pairs, positions[~found], new_pairs)
+                touched, added = np.unique(new_pairs >> 32, return_counts=True)
+                np.subtract.at(self.distinct_histogram, self.distinct[touched], 1)
+                self.distinct[touched] += added
+                self.distinct_histogram = _grow(self.distinct_histogram, int(self.distinct[touched].max()))
+                np.add.at(self.distinct_histogram, self.distinct[touched], 1)
+        self.n_rows += n
+
+    def metrics(self):
+        """
+        Returns:
+            dict: total_rows, num_unique_rows, k_anonymity, k_histogram
+            ({class size: number of classes}) and l_diversity (None without
+            a sensitive attribute).
+        """
+        sizes = np.flatnonzero(self.size_histogram)
+        sizes = sizes[sizes > 0]
+        l_diversity = None
+        if self.sensitive_attr:
+            distinct = np.flatnonzero(self.distinct_histogram)
+            l_diversity = int(distinct[0]) if len(self.counts) else np.nan
+        return {
+            "total_rows": self.n_rows,
+            "num_unique_rows": int(self.size_histogram[1]) if len(self.size_histogram) > 1 else 0,
+            "k_anonymity": int(sizes[0]) if len(sizes) else np.nan,
+            "k_histogram": dict(zip(sizes.tolist(), self.size_histogram[sizes].tolist())),
+            "l_diversity": l_diversity,
+        }
+
+    def _write_state(self):
+        meta = {
+            'format': STATE_FORMAT, 'file_path': os.path.abspath(self.file_path), 'columns': self.columns,
+            'sensitive_attr': self.sensitive_attr, 'header': self.header, 'n_bytes': self.n_bytes,
+            'digest': self.digest, 'n_rows': self.n_rows,
+        }
+        arrays = {f'uniques_{i}': self.encoders[column].uniques.to_numpy().astype(str)
+                  for i, column in enumerate(self._parsed_columns)}
+        pairs = np.column_stack([self.pairs >> 32, self.pairs & 0xFFFFFFFF])
+        temporary = f'{self.state_path}.{os.getpid()}.tmp.npz'
+        np.savez_compressed(temporary, meta=np.array(json.dumps(meta)), keys=self.keys, counts=self.counts,
+                            pairs=pairs, **arrays)
+        os.replace(temporary, self.state_path)
+
+    def _read_state(self):
+        with np.load(self.state_path, allow_pickle=False) as state:
+            meta = json.loads(str(state['meta']))
+            if (meta.get('format') != STATE_FORMAT or meta['file_path'] != os.path.abspath(self.file_path)
+                    or meta['columns'] != self.columns or meta['sensitive_attr'] != self.sensitive_attr):
+                return
+            self.header, self.n_bytes, self.digest, self.n_rows = \
+                meta['header'], meta['n_bytes'], meta['digest'], meta['n_rows']
+            self.encoders = {column: ColumnEncoder(state[f'uniques_{i}'].astype(object))
+                             for i, column in enumerate(self._parsed_columns)}
+            self.keys, self.counts = state['keys'], state['counts']
+            pairs = state['pairs']
+        self._index()
+        self.pairs = np.sort(pairs[:, 0] << 32 | pairs[:, 1])
+        self.distinct = np.bincount(pairs[:, 0], minlength=len(self.counts)).astype(np.int64)
+        self.size_histogram = np.bincount(self.counts, minlength=2).astype(np.int64)
+        self.size_histogram[0] = 0
+        self.distinct_histogram = np.bincount(self.distinct, minlength=2).astype(np.int64)
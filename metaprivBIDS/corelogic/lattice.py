@@ -0,0 +1,569 @@
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .encoding import and_masks, count_singletons, densify
+
+
+class LatticeWalker:
+    """
+    Depth-first walk over the subsets of a fixed list of encoded columns.
+
+    The group key of a subset is refined from the group ids of its parent
+    (the subset without its last column) by folding in one column of codes,
+    so no subset is ever grouped from scratch. Once every row is unique the
+    rest of the branch is filled in without touching the rows again, and
+    branches that cannot reach any of the requested sizes are not expanded.
+
+    Parameters:
+        entries (list): (codes, radix, valid) per column, see
+            EncodedFrame.key_codes.
+        n_rows (int): Number of rows.
+        sizes (iterable): Subset sizes to report.
+    """
+
+    def __init__(self, entries, n_rows, sizes):
+        self.entries = entries
+        self.n_rows = n_rows
+        self.n_columns = len(entries)
+        self.sizes = sorted({size for size in sizes if 0 < size <= self.n_columns})
+        max_size = self.sizes[-1] if self.sizes else 0
+        # next_size[s] is the smallest requested size >= s (unreachable if none)
+        self.next_size = np.full(max_size + 2, self.n_columns + 1)
+        for size in self.sizes:
+            self.next_size[:size + 1] = np.minimum(self.next_size[:size + 1], size)
+
+    def can_reach(self, size, last):
+        """Whether a subset of this size ending at column last can grow to a requested size."""
+        return size < len(self.next_size) and self.next_size[size] <= size + self.n_columns - last - 1
+
+    def walk(self, prefix=()):
+        """
+        Count the unique rows of a subset and of all its descendants.
+
+        Parameters:
+            prefix (tuple): Increasing column indices of the starting subset.
+
+        Returns:
+            dict: Bitmask of the subset to its number of unique rows, for every
+            visited subset of a requested size.
+        """
+        results = {}
+        if not self.sizes:
+            return results
+        key, space, valid, mask = np.zeros(self.n_rows, dtype=np.int64), 1, None, 0
+        for j in prefix:
+            codes, radix, column_valid = self.entries[j]
+            valid = and_masks(valid, column_valid)
+            key, counts = densify(key * radix + codes, space * radix, valid)
+            space, mask = len(counts), mask | (1 << j)
+        singletons = None
+        if prefix:
+            count = int(np.count_nonzero(counts == 1))
+            if self.next_size[len(prefix)] == len(prefix):
+                results[mask] = count
+            singletons = count if count == len(counts) else None
+        start = prefix[-1] + 1 if prefix else 0
+        self._visit(results, key, space, valid, mask, len(prefix), start, singletons)
+        return results
+
+    def _visit(self, results, key, space, valid, mask, size, start, singletons=None):
+        # singletons is set when every kept row already is a group of its own;
+        # adding columns cannot merge groups, so keys need no refining then.
+        next_size = self.next_size
+        child_size = size + 1
+        for j in range(start, self.n_columns):
+            columns_left = self.n_columns - j - 1
+            if next_size[child_size] > child_size + columns_left:
+                break
+            codes, radix, column_valid = self.entries[j]
+            child_valid = and_masks(valid, column_valid)
+            child_mask = mask | (1 << j)
+            expand = next_size[child_size + 1] <= child_size + columns_left
+
+            if singletons is not None:
+                child_singletons = singletons if column_valid is None else int(np.count_nonzero(child_valid))
+                if next_size[child_size] == child_size:
+                    results[child_mask] = child_singletons
+                if expand:
+                    self._visit(results, key, space, child_valid, child_mask, child_size, j + 1, child_singletons)
+                continue
+
+            child_key = key * radix + codes
+            child_space = space * radix
+            if not expand:
+                results[child_mask] = count_singletons(child_key, child_space, child_valid)
+                continue
+            child_key, counts = densify(child_key, child_space, child_valid)
+            count = int(np.count_nonzero(counts == 1))
+            if next_size[child_size] == child_size:
+                results[child_mask] = count
+            self._visit(results, child_key, len(counts), child_valid, child_mask, child_size, j + 1,
+                        count if count == len(counts) else None)
+
+
+def _branch_prefixes(walker, depth):
+    # Subsets of the given size that still lead to a requested size, largest
+    # branches first so that the pool stays busy until the end
+    prefixes = [prefix for prefix in combinations(range(walker.n_columns), depth)
+                if walker.can_reach(depth, prefix[-1])]
+    return sorted(prefixes, key=lambda prefix: prefix[-1])
+
+
+# Set in each worker process by _attach_worker
+_worker_walker = None
+_worker_memory = []
+
+
+def _attach_worker(codes_spec, valid_spec, radices, has_valid, n_rows, sizes):
+    global _worker_walker
+    codes_memory = shared_memory.SharedMemory(name=codes_spec[0])
+    codes = np.ndarray(codes_spec[1], dtype=codes_spec[2], buffer=codes_memory.buf, order='F')
+    _worker_memory.append(codes_memory)
+    valid = None
+    if valid_spec is not None:
+        valid_memory = shared_memory.SharedMemory(name=valid_spec[0])
+        valid = np.ndarray(valid_spec[1], dtype=bool, buffer=valid_memory.buf, order='F')
+        _worker_memory.append(valid_memory)
+    entries = [(codes[:, j], radix, valid[:, j] if has_valid[j] else None)
+               for j, radix in enumerate(radices)]
+    _worker_walker = LatticeWalker(entries, n_rows, sizes)
+
+
+def _walk_branch(prefix):
+    return _worker_walker.walk(prefix)
+
+
+def _shared_array(array):
+    memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf, order='F')
+    shared[...] = array
+    return memory, (memory.name, array.shape, array.dtype.str)
+
+
+def resolve_n_jobs(n_jobs):
+    """Number of worker processes for n_jobs (None or 1: serial, -1: all cores)."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    return max(n_jobs, 1)
+
+
+def iter_subset_unique_counts(encoded, columns, sizes, dropna=True, n_jobs=None, cancel=None):
+    """
+    Count the unique rows of every column subset of the requested sizes,
+    one branch of the subset lattice at a time.
+
+    With n_jobs > 1 the branches are shared out over a pool of worker
+    processes. The encoded columns are placed once in shared memory and
+    every worker attaches to them, so no data is pickled per task. Branches
+    are yielded as they finish.
+
+    Parameters:
+        encoded (EncodedFrame): The encoded dataset.
+        columns (list): The columns spanning the lattice.
+        sizes (iterable): Subset sizes to report.
+        dropna (bool): Missing value handling, see EncodedFrame.partition.
+        n_jobs (int): Number of worker processes, -1 for one per core.
+        cancel (object): Optional token with an is_set() method (such as a
+            threading.Event); no further branch is started once it is set.
+
+    Yields:
+        tuple: (branches done, total branches, dict of bitmask of the subset,
+        bit i set when columns[i] is included, to its number of unique rows).
+    """
+    entries = [encoded.key_codes(column, dropna) for column in columns]
+    walker = LatticeWalker(entries, encoded.n_rows, sizes)
+    n_jobs = resolve_n_jobs(n_jobs)
+    depth = 2 if walker.n_columns > 8 else 1
+    if not walker.sizes or walker.sizes[-1] <= depth:
+        yield 1, 1, walker.walk()
+        return
+
+    prefixes = _branch_prefixes(walker, depth)
+    total = len(prefixes) + 1
+    # Subsets smaller than the branch depth are counted here
+    yield 1, total, LatticeWalker(entries, encoded.n_rows, [s for s in walker.sizes if s < depth]).walk()
+    if n_jobs == 1:
+        for done, prefix in enumerate(prefixes, 2):
+            if cancel is not None and cancel.is_set():
+                return
+            yield done, total, walker.walk(prefix)
+        return
+
+    codes = np.empty((encoded.n_rows, len(entries)), dtype=np.int32, order='F')
+    valid = np.ones((encoded.n_rows, len(entries)), dtype=bool, order='F')
+    for j, (column_codes, radix, column_valid) in enumerate(entries):
+        codes[:, j] = column_codes
+        if column_valid is not None:
+            valid[:, j] = column_valid
+    has_valid = [column_valid is not None for _, _, column_valid in entries]
+    radices = [radix for _, radix, _ in entries]
+
+    memories = []
+    try:
+        codes_memory, codes_spec = _shared_array(codes)
+        memories.append(codes_memory)
+        valid_spec = None
+        if any(has_valid):
+            valid_memory, valid_spec = _shared_array(valid)
+            memories.append(valid_memory)
+        del codes, valid
+        initargs = (codes_spec, valid_spec, radices, has_valid, encoded.n_rows, walker.sizes)
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_worker, initargs=initargs)
+        futures = [executor.submit(_walk_branch, prefix) for prefix in prefixes]
+        finished = False
+        try:
+            for done, future in enumerate(as_completed(futures), 2):
+                if cancel is not None and cancel.is_set():
+                    return
+                yield done, total, future.result()
+            finished = True
+        finally:
+            for future in futures:
+                future.cancel()
+            # A cancelled run returns without waiting for the running branches
+            executor.shutdown(wait=finished)
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def subset_unique_counts(encoded, columns, sizes, dropna=True, n_jobs=None):
+    """
+    Count the unique rows of every column subset of the requested sizes.
+
+    Parameters:
+        encoded (EncodedFrame): The encoded dataset.
+        columns (list): The columns spanning the lattice.
+        sizes (iterable): Subset sizes to report.
+        dropna (bool): Missing value handling, see EncodedFrame.partition.
+        n_jobs (int): Number of worker processes, -1 for one per core, see
+            iter_subset_unique_counts.
+
+    Returns:
+        dict: Bitmask of the subset (bit i set when columns[i] is included) to
+        its number of unique rows.
+    """
+    results = {}
+    for _, _, branch in iter_subset_unique_counts(encoded, columns, sizes, dropna, n_jobs):
+        results.update(branch)
+    return results
+
+
+class ContributionBuffer:
+    """
+    Columnar buffers of combined column contribution results.
+
+    Results are appended as plain column lists; the combination names, the
+    Score and the DataFrame are only built by to_frame.
+
+    Parameters:
+        selected_columns (list): Quasi-identifier columns.
+        total_unique_rows (int): Unique rows over all selected columns.
+    """
+
+    def __init__(self, selected_columns, total_unique_rows):
+        self.selected_columns = list(selected_columns)
+        self.total_unique_rows = total_unique_rows
+        self.combinations = []
+        self.unique_rows = []
+        self.excluded_unique_rows = []
+
+    def __len__(self):
+        return len(self.combinations)
+
+    def append(self, combination, unique_rows, excluded_unique_rows):
+        self.combinations.append(combination)
+        self.unique_rows.append(unique_rows)
+        self.excluded_unique_rows.append(excluded_unique_rows)
+
+    def extend(self, other):
+        self.combinations.extend(other.combinations)
+        self.unique_rows.extend(other.unique_rows)
+        self.excluded_unique_rows.extend(other.excluded_unique_rows)
+
+    def to_frame(self, ordered=True):
+        """
+        Results as a DataFrame with the columns Combination, Unique Rows,
+        Unique Rows Excluding Columns and Score; ordered by size and then in
+        selection order unless ordered is False.
+        """
+        order = range(len(self))
+        if ordered:
+            order = sorted(order, key=lambda i: (len(self.combinations[i]), self.combinations[i]))
+        unique_rows = np.array([self.unique_rows[i] for i in order], dtype=np.int64)
+        excluded = np.array([self.excluded_unique_rows[i] for i in order], dtype=np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = (self.total_unique_rows - excluded) / unique_rows
+        return pd.DataFrame({
+            'Combination': [', '.join(self.selected_columns[j] for j in self.combinations[i]) for i in order],
+            'Unique Rows': unique_rows,
+            'Unique Rows Excluding Columns': excluded,
+            'Score': score,
+        })
+
+
+def _mask_indices(mask):
+    indices = []
+    j = 0
+    while mask:
+        if mask & 1:
+            indices.append(j)
+        mask >>= 1
+        j += 1
+    return tuple(indices)
+
+
+def iter_combined_column_contribution(encoded, selected_columns, min_size=3, max_size=7, n_jobs=None,
+                                      progress=None, cancel=None):
+    """
+    Score the combinations of the selected columns batch by batch.
+
+    A combination is yielded as soon as the unique rows of the combination
+    and of its complement are both counted, so early results can be
+    inspected while the lattice is still being walked, and the walk can be
+    cancelled in between branches.
+
+    Parameters:
+        encoded (EncodedFrame): The encoded dataset.
+        selected_columns (list): Quasi-identifier columns.
+        min_size (int): Smallest combination size.
+        max_size (int): Largest combination size.
+        n_jobs (int): Number of worker processes, -1 for one per core.
+        progress (callable): Called as progress(done, total, eta) after every
+            branch of the lattice, eta being the estimated seconds left.
+        cancel (object): Optional token with an is_set() method (such as a
+            threading.Event); the generator stops once it is set.
+
+    Yields:
+        ContributionBuffer: The combinations completed by one branch.
+    """
+    selected_columns = list(selected_columns)
+    n_columns = len(selected_columns)
+    full_mask = (1 << n_columns) - 1
+    sizes = {size for size in range(min_size, max_size + 1) if 0 < size <= n_columns}
+    complement_sizes = {n_columns - size for size in sizes if 0 < n_columns - size}
+    total_unique_rows = encoded.count_unique(selected_columns, dropna=True) if n_columns else 0
+
+    counts = {0: 0}
+    pending = set()
+    started = time.perf_counter()
+    for done, total, branch in iter_subset_unique_counts(encoded, selected_columns, sizes | complement_sizes,
+                                                         n_jobs=n_jobs, cancel=cancel):
+        counts.update(branch)
+        batch = ContributionBuffer(selected_columns, total_unique_rows)
+        for mask in branch:
+            size = bin(mask).count('1')
+            complement = full_mask & ~mask
+            if size in sizes:
+                if complement in counts:
+                    batch.append(_mask_indices(mask), counts[mask], counts[complement])
+                else:
+                    pending.add(mask)
+            if complement in pending:
+                pending.discard(complement)
+                batch.append(_mask_indices(complement), counts[complement], counts[mask])
+        if progress is not None:
+            elapsed = time.perf_counter() - started
+            progress(done, total, elapsed / done * (total - done))
+        if cancel is not None and cancel.is_set():
+            return
+        if len(batch):
+            yield batch
+
+
+def combined_column_contribution(encoded, selected_columns, min_size=3, max_size=7, n_jobs=None,
+                                 progress=None, cancel=None):
+    """
+    Score every combination of the selected columns by its contribution to
+    the number of unique rows.
+
+    Parameters:
+        encoded (EncodedFrame): The encoded dataset.
+        selected_columns (list): Quasi-identifier columns.
+        min_size (int): Smallest combination size.
+        max_size (int): Largest combination size.
+        n_jobs (int): Number of worker processes, -1 for one per core.
+        progress (callable): See iter_combined_column_contribution.
+        cancel (object): See iter_combined_column_contribution; the results
+            completed before cancellation are returned.
+
+    Returns:
+        pd.DataFrame: One row per combination with the columns Combination,
+        Unique Rows, Unique Rows Excluding Columns and Score.
+    """
+    selected_columns = list(selected_columns)
+    total_unique_rows = encoded.count_unique(selected_columns, dropna=True) if selected_columns else 0
+    results = ContributionBuffer(selected_columns, total_unique_rows)
+    for batch in iter_combined_column_contribution(encoded, selected_columns, min_size, max_size, n_jobs,
+                                                   progress, cancel):
+        results.extend(batch)
+    return results.to_frame()
+
+
+class PrefixCounter:
+    """
+    Unique row counts of column sets queried one after the other.
+
+    The dense group ids of every prefix of the last queried column set are
+    kept on a stack, so a query only folds in the columns after the prefix
+    it shares with the previous one. Once a prefix makes every row unique,
+    the remaining columns are not folded at all.
+
+    Parameters:
+        entries (list): (codes, radix, valid) per column, see
+            EncodedFrame.key_codes.
+        n_rows (int): Number of rows.
+    """
+
+    def __init__(self, entries, n_rows):
+        self.entries = entries
+        self.columns = []
+        # (ids, groups, valid, unique rows, every kept row unique) per prefix
+        self.stack = [(np.zeros(n_rows, dtype=np.int64), 1, None, int(n_rows == 1), n_rows <= 1)]
+
+    def count(self, columns):
+        """Number of unique rows over the given increasing column indices."""
+        common = 0
+        while common < min(len(columns), len(self.columns)) and columns[common] == self.columns[common]:
+            common += 1
+        del self.columns[common:]
+        del self.stack[common + 1:]
+        for j in columns[common:]:
+            ids, groups, valid, unique_rows, all_unique = self.stack[-1]
+            codes, radix, column_valid = self.entries[j]
+            child_valid = and_masks(valid, column_valid)
+            if all_unique:
+                if column_valid is not None:
+                    unique_rows = int(np.count_nonzero(child_valid))
+                self.stack.append((ids, groups, child_valid, unique_rows, True))
+            else:
+                child_ids, counts = densify(ids * radix + codes, groups * radix, child_valid)
+                unique_rows = int(np.count_nonzero(counts == 1))
+                self.stack.append((child_ids, len(counts), child_valid, unique_rows, unique_rows == len(counts)))
+            self.columns.append(j)
+        return self.stack[-1][3]
+
+
+def top_combined_column_contribution(encoded, selected_columns, min_size=3, max_size=7, top_k=None, min_score=None):
+    """
+    Highest scoring column combinations, without enumerating the whole lattice.
+
+    A row that is unique on a set of columns stays unique on every superset,
+    so the unique row count of a combination can only grow along a branch of
+    the lattice while the Score numerator never exceeds the unique row count
+    of all selected columns. A branch is skipped as soon as that bound
+    falls below the current top_k-th Score (or min_score), and the
+    complement of a combination is only grouped when the combination can
+    still make the cut; consecutive complements share most of their columns
+    and are refined from each other's groupings. Without missing values the
+    complement is bounded from below as well: it contains every column
+    outside the span from the first to the last column of the combination. Combinations with no unique
+    rows have no finite Score and are left out.
+
+    Parameters:
+        encoded (EncodedFrame): The encoded dataset.
+        selected_columns (list): Quasi-identifier columns.
+        min_size (int): Smallest combination size.
+        max_size (int): Largest combination size.
+        top_k (int): Number of combinations to return, all if None.
+        min_score (float): Only return combinations scoring at least this.
+
+    Returns:
+        pd.DataFrame: Same columns as combined_column_contribution, best
+        Score first (ties: fewer columns, then selection order).
+    """
+    selected_columns = list(selected_columns)
+    n_columns = len(selected_columns)
+    full_mask = (1 << n_columns) - 1
+    entries = [encoded.key_codes(column, dropna=True) for column in selected_columns]
+    total_unique_rows = encoded.count_unique(selected_columns, dropna=True)
+
+    # Rows kept by every column after j; only those can stay unique when
+    # the branch is extended with later columns
+    later_valid = [None] * n_columns
+    for j in range(n_columns - 1, 0, -1):
+        later_valid[j - 1] = and_masks(later_valid[j], entries[j][2])
+
+    # Unique rows are only monotone in the columns when no row is dropped
+    monotone = all(column_valid is None for _, _, column_valid in entries)
+    outside_counts = {}
+
+    def outside_unique_rows(first, last):
+        # Unique rows over the columns before first and after last
+        if not monotone:
+            return 0
+        if (first, last) not in outside_counts:
+            outside = [j for j in range(n_columns) if j < first or j > last]
+            outside_counts[first, last] = outside_counter.count(outside) if outside else 0
+        return outside_counts[first, last]
+
+    best = []
+
+    def threshold():
+        cut = -np.inf if min_score is None else min_score
+        if top_k is not None and len(best) >= top_k:
+            cut = max(cut, best[0][0])
+        return cut
+
+    complement_counter = PrefixCounter(entries, encoded.n_rows)
+    outside_counter = PrefixCounter(entries, encoded.n_rows)
+
+    def consider(indices, mask, unique_rows):
+        if unique_rows == 0:
+            return
+        if (total_unique_rows - outside_unique_rows(indices[0], indices[-1])) / unique_rows < threshold():
+            return
+        complement = full_mask & ~mask
+        excluded = complement_counter.count([j for j in range(n_columns) if complement >> j & 1]) if complement else 0
+        score = (total_unique_rows - excluded) / unique_rows
+        if score < threshold():
+            return
+        entry = (score, -len(indices), tuple(-i for i in indices), unique_rows, excluded)
+        if top_k is None or len(best) < top_k:
+            heapq.heappush(best, entry)
+        elif entry > best[0]:
+            heapq.heapreplace(best, entry)
+
+    def visit(key, space, valid, indices, mask):
+        size = len(indices) + 1
+        for j in range(indices[-1] + 1 if indices else 0, n_columns):
+            codes, radix, column_valid = entries[j]
+            child_valid = and_masks(valid, column_valid)
+            ids, counts = densify(key * radix + codes, space * radix, child_valid)
+            unique_rows = int(np.count_nonzero(counts == 1))
+            child_indices, child_mask = indices + (j,), mask | (1 << j)
+            if size >= min_size:
+                consider(child_indices, child_mask, unique_rows)
+            if size >= max_size or j + 1 >= n_columns:
+                continue
+            lower_bound = unique_rows
+            if later_valid[j] is not None:
+                row_unique = np.zeros(len(ids), dtype=bool)
+                kept = ids >= 0
+                row_unique[kept] = counts[ids[kept]] == 1
+                lower_bound = int(np.count_nonzero(row_unique & later_valid[j]))
+            # Every extension keeps the columns before the first one excluded
+            bound = total_unique_rows - outside_unique_rows(child_indices[0], n_columns - 1)
+            if lower_bound == 0 or bound / lower_bound >= threshold():
+                visit(ids, len(counts), child_valid, child_indices, child_mask)
+
+    if top_k != 0:
+        visit(np.zeros(encoded.n_rows, dtype=np.int64), 1, None, (), 0)
+
+    best.sort(reverse=True)
+    return pd.DataFrame({
+        'Combination': [', '.join(selected_columns[-i] for i in entry[2]) for entry in best],
+        'Unique Rows': [entry[3] for entry in best],
+        'Unique Rows Excluding Columns': [entry[4] for entry in best],
+        'Score': [entry[0] for entry in best],
+    })
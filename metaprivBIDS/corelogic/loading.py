@@ -0,0 +1,576 @@
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .encoding import EncodedFrame, compact_codes
+from .sketch import DistinctCounter
+
+
+# Columns with more distinct values than this are treated as continuous
+CONTINUOUS_THRESHOLD = 45
+
+# Bumped whenever the layout of the cache files changes
+CACHE_FORMAT = 1
+
+CACHE_SUFFIX = '.metapriv.npz'
+
+# Environment variable enabling the cache in the GUI: "1" caches next to the
+# tables, any other non-empty value but "0" is used as the cache directory
+CACHE_ENV = 'METAPRIVBIDS_CACHE'
+
+# Rows per chunk of the streaming loader
+DEFAULT_CHUNKSIZE = 100_000
+
+
+# Compression codecs of compressed tables, by suffix
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+
+
+def compression(file_path):
+    """Compression codec of a table from its suffix, None if uncompressed."""
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(file_path)[1].lower())
+
+
+def table_suffix(file_path):
+    """Suffix of the table inside any compression, e.g. '.tsv' for 'x.tsv.gz'."""
+    root, suffix = os.path.splitext(file_path)
+    if suffix.lower() in COMPRESSION_SUFFIXES:
+        suffix = os.path.splitext(root)[1]
+    return suffix.lower()
+
+
+def separator(file_path):
+    return '\t' if table_suffix(file_path) == '.tsv' else ','
+
+
+def open_table(file_path):
+    """
+    Binary stream of the decompressed content of a table.
+
+    Compressed tables are decompressed as they are read, never expanded on
+    disk or in memory as a whole. gzip is decompressed in a separate thread
+    by python-isal when it is installed, overlapping with parsing; zstd
+    needs the zstandard package.
+    """
+    codec = compression(file_path)
+    if codec == 'gzip':
+        try:
+            from isal import igzip_threaded
+        except ImportError:
+            return gzip.open(file_path, 'rb')
+        return igzip_threaded.open(file_path, 'rb', threads=1)
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.open(file_path, 'rb')
+    if codec == 'bz2':
+        return bz2.open(file_path, 'rb')
+    if codec == 'xz':
+        return lzma.open(file_path, 'rb')
+    return open(file_path, 'rb')
+
+
+def _parsed_header(file_path):
+    # Column names as the pandas parser gives them: a blank name becomes
+    # 'Unnamed: i' and repeated names 'a.1', 'a.2', ...
+    with open_table(file_path) as f:
+        return list(pd.read_csv(f, sep=separator(file_path), nrows=0).columns)
+
+
+def read_header(file_path):
+    """Column names of a table, stripped of surrounding whitespace."""
+    return [name.strip() for name in _parsed_header(file_path)]
+
+
+def reader_engine(engine=None):
+    """
+    CSV parser used by read_table: 'c' (pandas, single-threaded, the
+    default) or 'pyarrow' (multithreaded). 'auto' picks pyarrow when it is
+    installed.
+    """
+    if engine in (None, 'c'):
+        return 'c'
+    if engine not in ('pyarrow', 'auto'):
+        raise ValueError(f"Unknown reader engine '{engine}', use 'c', 'pyarrow' or 'auto'.")
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        if engine == 'pyarrow':
+            raise
+        return 'c'
+    return 'pyarrow'
+
+
+def header_names(file_path, usecols):
+    """
+    Header names of the requested columns as they are in the file.
+
+    The columns are stripped after loading, so the requested names are
+    matched against the stripped header.
+
+    Parameters:
+        file_path (str): Path of the table.
+        usecols (list): Stripped column names, or None.
+
+    Returns:
+        list: The file's names of usecols, in this order, or None if usecols
+        is None.
+
+    Raises:
+        ValueError: If a column is not in the header.
+    """
+    if usecols is None:
+        return None
+    header = {name.strip(): name for name in _parsed_header(file_path)}
+    missing = [column for column in usecols if column not in header]
+    if missing:
+        raise ValueError(f"Columns not found in {file_path}: {', '.join(missing)}")
+    return list(dict.fromkeys(header[column] for column in usecols))
+
+
+def read_table(file_path, usecols=None, engine=None):
+    """
+    Parse a CSV or TSV table, optionally only some of its columns.
+
+    Parameters:
+        file_path (str): Path of the .csv or .tsv file, optionally compressed
+            (.gz, .bz2, .xz, .zst).
+        usecols (list): Columns to parse, in this order; the others are
+            skipped by the parser. All columns if None.
+        engine (str): 'c', 'pyarrow' or 'auto', see reader_engine.
+
+    Returns:
+        pd.DataFrame: The table, with column names stripped.
+    """
+    sep = separator(file_path)
+    names = header_names(file_path, usecols)
+    if reader_engine(engine) == 'pyarrow':
+        from pyarrow import csv
+
+        # Arrow decompresses gzip, bz2 and zstd itself, from the suffix. The
+        # columns get the pandas names, so that both parsers agree on blank
+        # and repeated names
+        source = open_table(file_path) if compression(file_path) == 'xz' else file_path
+        read_options = csv.ReadOptions(use_threads=True, column_names=_parsed_header(file_path), skip_rows=1)
+        table = csv.read_csv(source, read_options=read_options,
+                             parse_options=csv.ParseOptions(delimiter=sep),
+                             convert_options=csv.ConvertOptions(include_columns=names or [],
+                                                                strings_can_be_null=True))
+        data = table.to_pandas()
+    else:
+        with open_table(file_path) as f:
+            data = pd.read_csv(f, sep=sep, usecols=names)
+    if names is not None:
+        data = data[names]
+    data.columns = data.columns.str.strip()
+    return data
+
+
+def column_types(column_unique_counts):
+    """(column, distinct values, "Continuous" or "Categorical") per column."""
+    return [(col, count, "Continuous" if count > CONTINUOUS_THRESHOLD else "Categorical")
+            for col, count in column_unique_counts.items()]
+
+
+def cache_settings(environ=os.environ):
+    """(cache, cache_dir) arguments of load_table from the METAPRIVBIDS_CACHE variable."""
+    value = environ.get(CACHE_ENV, '').strip()
+    if value in ('', '0'):
+        return False, None
+    return True, None if value == '1' else value
+
+
+def content_hash(file_path, block_size=2 ** 20):
+    """BLAKE2b digest of the file content."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(file_path, cache_dir=None):
+    """
+    Location of the cache file of a table: next to the table, or in
+    cache_dir under a name derived from the table's absolute path.
+    """
+    file_path = os.path.abspath(file_path)
+    name = os.path.basename(file_path)
+    if cache_dir is None:
+        return os.path.join(os.path.dirname(file_path), f'.{name}{CACHE_SUFFIX}')
+    path_digest = hashlib.blake2b(file_path.encode(), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, f'{name}.{path_digest}{CACHE_SUFFIX}')
+
+
+def _decode(codes, uniques, dtype):
+    # Column values from codes and distinct values, -1 codes being missing
+    missing = codes < 0
+    numeric = isinstance(dtype, np.dtype) and dtype != object
+    if not missing.any():
+        values = uniques[codes] if numeric else uniques.astype(object)[codes]
+    else:
+        values = np.full(len(codes), np.nan, dtype=np.float64 if numeric else object)
+        values[~missing] = uniques[codes[~missing]]
+    if isinstance(dtype, np.dtype):
+        return values.astype(dtype, copy=False) if not missing.any() else values
+    return pd.array(values, dtype=dtype)
+
+
+def write_cache(path, data, encoded, fingerprint):
+    """
+    Store the codes and distinct values of every column of data in a
+    compressed .npz file.
+
+    Distinct values are stored as numeric or unicode arrays, so tables with
+    columns holding anything but numbers or strings are not cached.
+
+    Parameters:
+        path (str): Cache file to write.
+        data (pd.DataFrame): The loaded table.
+        encoded (EncodedFrame): The encoding of data.
+        fingerprint (dict): size, mtime_ns and content hash of the table.
+
+    Returns:
+        bool: Whether the cache file was written.
+    """
+    arrays = {}
+    for i, column in enumerate(data.columns):
+        uniques = np.asarray(encoded.uniques(column))
+        if uniques.dtype == object:
+            if not all(isinstance(value, str) for value in uniques):
+                return False
+            uniques = uniques.astype(str)
+        arrays[f'codes_{i}'] = encoded.codes(column)
+        arrays[f'uniques_{i}'] = uniques
+    meta = dict(fingerprint, format=CACHE_FORMAT, columns=list(data.columns),
+                dtypes=[str(data[column].dtype) for column in data.columns])
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez_compressed(temporary, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(temporary, path)
+    return True
+
+
+def read_cache(path, file_path):
+    """
+    Load a table from its cache file if the cache is still valid.
+
+    The cache is valid when the table has the recorded size and
+    modification time, or, if only its modification time changed, the
+    recorded content hash.
+
+    Returns:
+        tuple or None: (data, encoded) or None when there is no valid cache.
+    """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(file_path)
+    try:
+        with np.load(path, allow_pickle=False) as cached:
+            meta = json.loads(str(cached['meta']))
+            if meta.get('format') != CACHE_FORMAT or meta['size'] != stat.st_size:
+                return None
+            if meta['mtime_ns'] != stat.st_mtime_ns and meta['hash'] != content_hash(file_path):
+                return None
+            codes, uniques, columns = {}, {}, {}
+            for i, (column, dtype) in enumerate(zip(meta['columns'], meta['dtypes'])):
+                codes[column] = cached[f'codes_{i}']
+                column_uniques = cached[f'uniques_{i}']
+                dtype = pd.api.types.pandas_dtype(dtype)
+                columns[column] = _decode(codes[column], column_uniques, dtype)
+                uniques[column] = column_uniques.astype(object) if column_uniques.dtype.kind == 'U' else column_uniques
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    data = pd.DataFrame(columns, columns=meta['columns'])
+    return data, EncodedFrame.from_codes(codes, uniques, data)
+
+
+def copy_on_write():
+    """Whether pandas defers copies until a copy is modified."""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except KeyError:
+        return False
+
+
+def snapshot(data):
+    """
+    Copy of a DataFrame or Series to keep as the original values.
+
+    Where pandas supports copy-on-write the copy shares its memory with
+    data, and a column is only duplicated once one of the two is modified.
+    """
+    return data.copy(deep=not copy_on_write())
+
+
+def compact_dtypes(data, category_ratio=0.5):
+    """
+    Store every column in the smallest dtype that holds its values exactly.
+
+    Text columns with at most category_ratio distinct values per row become
+    categorical, integers are downcast and floats become float32 when
+    every value survives the round trip.
+
+    Parameters:
+        data (pd.DataFrame): The loaded table; it is not modified.
+        category_ratio (float): Largest share of distinct values per row of
+            a text column converted to category.
+
+    Returns:
+        pd.DataFrame: The compacted table.
+    """
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        dtype = values.dtype
+        if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+            pass
+        elif pd.api.types.is_integer_dtype(dtype):
+            values = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_float_dtype(dtype) and dtype.itemsize > 4:
+            compact = values.to_numpy().astype(np.float32)
+            if np.array_equal(compact.astype(dtype), values.to_numpy(), equal_nan=True):
+                values = pd.Series(compact, index=values.index, name=column)
+        elif (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)) \
+                and values.nunique() <= category_ratio * len(values):
+            values = values.astype('category')
+        columns[column] = values
+    return pd.DataFrame(columns, index=data.index, columns=data.columns)
+
+
+def load_table(file_path, cache=False, cache_dir=None, compact=False, usecols=None, engine=None, profile=False):
+    """
+    Read a CSV or TSV table, optionally through an on-disk columnar cache.
+
+    Every column is factorized once; the distinct value counts come from
+    the factorization and the codes are handed on as an EncodedFrame, so
+    the metrics do not factorize the columns again. With cache=True the
+    codes and distinct values are written to a compressed .npz file (next
+    to the table, or in cache_dir) keyed by the table's size, modification
+    time and content hash, and reopening an unchanged table only decodes
+    that file.
+
+    Parameters:
+        file_path (str): Path of the .csv or .tsv file, optionally compressed
+            (.gz, .bz2, .xz, .zst).
+        cache (bool): Read and write the on-disk cache.
+        cache_dir (str): Directory of the cache files, next to the table if
+            None.
+        compact (bool): Store the columns in compact dtypes, see
+            compact_dtypes.
+        usecols (list): Only load these columns, see read_table. A cache
+            of the whole table is still used, but none is written.
+        engine (str): CSV parser, 'c', 'pyarrow' or 'auto'.
+        profile (bool): Also count the distinct values of every column of
+            the file with profile_table, e.g. to classify the columns that
+            usecols leaves out.
+
+    Returns:
+        dict: data (pd.DataFrame), encoded (EncodedFrame),
+        column_unique_counts and column_types, and profile if requested.
+    """
+    path = cache_path(file_path, cache_dir) if cache else None
+    loaded = read_cache(path, file_path) if cache else None
+    if loaded is not None:
+        data, encoded = loaded
+        if usecols is not None:
+            data = data[list(dict.fromkeys(usecols))]
+            encoded = EncodedFrame.from_codes({column: encoded.codes(column) for column in data.columns},
+                                              {column: encoded.uniques(column) for column in data.columns}, data)
+    else:
+        data = read_table(file_path, usecols=usecols, engine=engine)
+        encoded = EncodedFrame(data)
+        if cache and usecols is None:
+            stat = os.stat(file_path)
+            fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash(file_path)}
+            try:
+                write_cache(path, data, encoded, fingerprint)
+            except OSError:
+                pass
+    if compact:
+        data = compact_dtypes(data)
+        encoded.rebind(data, list(data.columns))
+    column_unique_counts = {column: encoded.cardinality(column) for column in data.columns}
+    loaded = {"data": data, "encoded": encoded, "column_unique_counts": column_unique_counts,
+              "column_types": column_types(column_unique_counts)}
+    if profile:
+        loaded["profile"] = profile_table(file_path)
+    return loaded
+
+
+class ColumnEncoder:
+    """
+    Factorize a column chunk by chunk.
+
+    Each chunk is factorized on its own and only its distinct values are
+    looked up in a dictionary of the distinct values seen so far, so the
+    codes match a factorization of the whole column (order of first
+    appearance, -1 for missing) at a cost that grows with the chunk rather
+    than with all the distinct values, while only the codes and the
+    distinct values are kept.
+    """
+
+    def __init__(self, uniques=None):
+        # Distinct values in chunks of first appearance, joined on demand
+        self._parts = [] if uniques is None else [np.asarray(uniques)]
+        self._lookup = {value: code for code, value in enumerate(self._parts[0])} if self._parts else {}
+        self._uniques = None
+        self.chunks = []
+
+    def __len__(self):
+        return len(self._lookup)
+
+    @property
+    def uniques(self):
+        """Distinct values in order of first appearance, as a pd.Index."""
+        if self._uniques is None or len(self._uniques) != len(self):
+            self._uniques = pd.Index(self._parts[0]).append([pd.Index(part) for part in self._parts[1:]]) \
+                if self._parts else pd.Index([])
+        return self._uniques
+
+    def encode(self, values):
+        """Codes of a chunk, extending the distinct values without keeping the codes."""
+        codes, uniques = pd.factorize(values)
+        uniques = np.asarray(uniques)
+        # Python scalars hash much faster than numpy ones
+        keys = uniques.tolist() if uniques.dtype.kind in 'biuf' else list(uniques)
+        mapping = np.fromiter(map(self._lookup.get, keys, repeat(-1)), dtype=np.int64, count=len(keys))
+        new = np.flatnonzero(mapping < 0)
+        if len(new):
+            mapping[new] = np.arange(len(self), len(self) + len(new))
+            self._lookup.update(zip([keys[i] for i in new], mapping[new].tolist()))
+            self._parts.append(uniques[new])
+        mapping = np.append(mapping, -1)
+        return mapping[codes].astype(np.int32)
+
+    def add(self, values):
+        self.chunks.append(self.encode(values))
+
+    def finish(self):
+        """(codes, uniques) of the whole column, see encode_column."""
+        codes = np.concatenate(self.chunks) if self.chunks else np.zeros(0, dtype=np.int32)
+        return compact_codes(codes, len(self.uniques)), self.uniques.to_numpy()
+
+
+def _read_chunks(file_path, chunksize, usecols=None):
+    # Values are read as text: a dtype inferred per chunk could make the same
+    # value an int in one chunk and a string in another
+    names = header_names(file_path, usecols)
+    with open_table(file_path) as f:
+        for chunk in pd.read_csv(f, sep=separator(file_path), chunksize=chunksize, usecols=names, dtype=str):
+            if names is not None:
+                chunk = chunk[names]
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+
+
+def parse_uniques(codes, uniques):
+    """
+    Convert the distinct values of a column read as text the way the parser
+    converts a whole column: to booleans or numbers when every value is
+    one. Values that become equal, such as '1' and '1.0', then share a code.
+
+    Returns:
+        tuple: (codes, uniques), unchanged if the values stay text.
+    """
+    text = pd.Series(uniques, dtype=object)
+    if not len(text):
+        return codes, uniques
+    lowered = text.str.lower()
+    if lowered.isin(['true', 'false']).all():
+        parsed = (lowered == 'true').to_numpy()
+    else:
+        try:
+            parsed = pd.to_numeric(text).to_numpy()
+        except (ValueError, TypeError):
+            return codes, uniques
+    remap, parsed_uniques = pd.factorize(parsed)
+    return compact_codes(np.append(remap, -1)[codes], len(parsed_uniques)), parsed_uniques
+
+
+def profile_table(file_path, chunksize=DEFAULT_CHUNKSIZE, exact_limit=1024):
+    """
+    Count the distinct values of every column without loading the table.
+
+    The file is read in chunks and every column feeds a DistinctCounter, so
+    memory stays bounded by the chunk size and exact_limit. Counts above
+    exact_limit are HyperLogLog estimates; the Continuous / Categorical
+    classification is exact. Values are counted as text, so the same number
+    written differently (1 and 1.0) counts twice.
+
+    Parameters:
+        file_path (str): Path of the .csv or .tsv file, optionally compressed
+            (.gz, .bz2, .xz, .zst).
+        chunksize (int): Rows per chunk.
+        exact_limit (int): Largest distinct count kept exact, at least the
+            classification threshold.
+
+    Returns:
+        dict: n_rows, column_unique_counts, column_types and exact (column to
+        whether its count is exact).
+    """
+    exact_limit = max(exact_limit, CONTINUOUS_THRESHOLD)
+    counters = {}
+    n_rows = 0
+    for chunk in _read_chunks(file_path, chunksize):
+        n_rows += len(chunk)
+        for column in chunk.columns:
+            counters.setdefault(column, DistinctCounter(exact_limit)).add(chunk[column].to_numpy())
+    column_unique_counts = {column: counter.count() for column, counter in counters.items()}
+    return {"n_rows": n_rows, "column_unique_counts": column_unique_counts,
+            "column_types": column_types(column_unique_counts),
+            "exact": {column: counter.exact for column, counter in counters.items()}}
+
+
+def stream_table(file_path, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+    """
+    Build the encoded code matrix of a table chunk by chunk.
+
+    Only the codes and distinct values of each column are kept; the parsed
+    chunk is dropped as soon as it is encoded, so the table never has to fit
+    in memory as a DataFrame. The chunks are read as text and the distinct
+    values of every column converted at the end (see parse_uniques), so a
+    column has one dtype even if its first chunks look numeric. The distinct
+    value counts are the sizes of the column dictionaries and therefore
+    exact.
+
+    Parameters:
+        file_path (str): Path of the .csv or .tsv file, optionally compressed
+            (.gz, .bz2, .xz, .zst).
+        chunksize (int): Rows per chunk.
+        usecols (list): Only encode these columns.
+
+    Returns:
+        dict: encoded (EncodedFrame without a DataFrame, see decode_frame),
+        column_unique_counts and column_types.
+    """
+    encoders = {}
+    for chunk in _read_chunks(file_path, chunksize, usecols):
+        for column in chunk.columns:
+            encoders.setdefault(column, ColumnEncoder()).add(chunk[column].to_numpy())
+    codes, uniques = {}, {}
+    for column, encoder in encoders.items():
+        codes[column], uniques[column] = parse_uniques(*encoder.finish())
+    encoded = EncodedFrame.from_codes(codes, uniques)
+    column_unique_counts = {column: len(column_uniques) for column, column_uniques in uniques.items()}
+    return {"encoded": encoded, "column_unique_counts": column_unique_counts,
+            "column_types": column_types(column_unique_counts)}
+
+
+def decode_frame(encoded, columns=None):
+    """DataFrame of the given columns (all if None) rebuilt from their codes."""
+    columns = encoded.columns if columns is None else columns
+    decoded = {}
+    for column in columns:
+        uniques = np.asarray(encoded.uniques(column))
+        dtype = uniques.dtype if uniques.dtype.kind in 'biuf' else np.dtype(object)
+        decoded[column] = _decode(encoded.codes(column), uniques, dtype)
+    return pd.DataFrame(decoded, columns=columns)
@@ -4,135 +4,444 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import seaborn as sns
-from itertools import combinations
 import math
+import weakref
 from piflib.pif_calculator import compute_cigs
 
 
 import io 
-from rpy2 import robjects
-from rpy2.robjects.packages import importr
-from rpy2.robjects import pandas2ri
 
-
-# Activate pandas <-> R DataFrame conversion
-pandas2ri.activate()
-
-# Import the sdcMicro package
-sdcMicro = importr('sdcMicro')
+from .backends import get_backend
+from .cache import UniquenessCache
+from .closeness import t_closeness
+from .diversity import batch_l_diversity, l_diversity
+from .encoding import DEFAULT_K, EncodedFrame
+from .estimate import estimate_combined_column_contribution, estimate_suda2
+from .incremental import IncrementalAssessment
+from .lattice import (combined_column_contribution, iter_combined_column_contribution,
+                      top_combined_column_contribution)
+from .loading import DEFAULT_CHUNKSIZE, load_table, snapshot, stream_table
+from .sampling import DEFAULT_SAMPLE_SIZE, EXACT_MAX_ROWS, SampledEncoding, approximate_summary, exact_summary
 
 
 class metaprivBIDS_core_logic:
     def __init__(self):
         self.original_columns = {}
         self.combined_values_history = {}
+        self._encoding = None
+        self._sampled = None
+        self.cache = UniquenessCache()
+        self._assessments = {}
+
+    def encode(self, data, columns=None):
+        """
+        Return the integer-encoded view of a dataset, reusing the encoding from
+        the previous call when the same DataFrame is passed again. An
+        EncodedFrame, such as the one returned by load_encoded, is used as is.
+
+        Columns of a reused encoding that were modified in place since (see
+        EncodedFrame.modified_columns) are encoded again and their cached
+        results dropped, so edits made without invalidate_encoding are not
+        missed. Only the given columns, the ones a metric is about to read,
+        are checked (all if None); this hashes them without encoding them, so
+        a result cached for unmodified columns is returned without any
+        encoding work.
+        """
+        if isinstance(data, EncodedFrame):
+            return data
+        encoded = None
+        if self._encoding is not None and self._encoding[0]() is data:
+            encoded = self._encoding[1]
+        elif self._sampled is not None and self._sampled[0]() is data:
+            # The rows sampled by approximate_unique_rows are not encoded again
+            encoded = self._sampled[1].exact()
+        if encoded is None or encoded.n_rows != len(data):
+            encoded = EncodedFrame(data)
+        else:
+            modified = encoded.modified_columns(columns)
+            if modified:
+                encoded.refresh(modified)
+                self.cache.invalidate(modified)
+        self._sampled = None
+        self._encoding = (weakref.ref(data), encoded)
+        return encoded
+
+    def invalidate_encoding(self, data, columns=None):
+        """
+        Drop cached results of the given columns after they were modified.
+        Their codes, and the partitions tracked by the encoding, are updated
+        from the changed rows only; all codes are dropped if columns is None.
+        """
+        if self._encoding is not None and self._encoding[0]() is data:
+            if columns is None:
+                self._encoding[1].invalidate()
+            else:
+                self._encoding[1].refresh(columns)
+        if self._sampled is not None and self._sampled[0]() is data:
+            self._sampled = None
+        self.cache.invalidate(columns)
+
+    def carry_encoding(self, data, modified, columns):
+        """
+        Hand the encoding of data over to its modified copy, keeping the codes
+        and cached results of every column except the modified ones.
+        """
+        if self._encoding is not None and self._encoding[0]() is data:
+            encoded = self._encoding[1]
+            encoded.rebind(modified)
+            self._encoding = (weakref.ref(modified), encoded)
+        self.invalidate_encoding(modified, columns)
+
+    def load_data(self, file_path, cache=False, cache_dir=None, compact=False, usecols=None, engine=None,
+                  profile=False):
+        """
+        Load a CSV or TSV file and count the distinct values of its columns.
 
-    def load_data(self, file_path):
-        sep = '\t' if file_path.lower().endswith('.tsv') else ','
-        data = pd.read_csv(file_path, sep=sep)
-        data.columns = data.columns.str.strip()
-        column_unique_counts = {col: data[col].nunique() for col in data.columns}
-        column_types = [(col, count, "Continuous" if count > 45 else "Categorical") for col, count in column_unique_counts.items()]
-        return {"data": data, "original_data": data.copy(), "column_unique_counts": column_unique_counts, "column_types": column_types}
+        Parameters:
+            file_path (str): Path of the .csv or .tsv file, optionally compressed
+                (.gz, .bz2, .xz, .zst).
+            cache (bool): Keep the parsed columns in an on-disk cache so that
+                reopening the unchanged file skips parsing, see load_table.
+            cache_dir (str): Directory of the cache files, next to the file if
+                None.
+            compact (bool): Store the columns in the smallest lossless dtypes
+                (category, downcast integers, float32), see compact_dtypes.
+            usecols (list): Only parse these columns, e.g. the
+                quasi-identifiers and the sensitive attribute.
+            engine (str): CSV parser: 'c' (default), 'pyarrow'
+                (multithreaded) or 'auto' (pyarrow when installed).
+            profile (bool): Also count the distinct values of every column of
+                the file, including those left out by usecols.
+
+        Returns:
+            dict: data, original_data (a copy-on-write snapshot where pandas
+            supports it), column_unique_counts and column_types, and profile
+            (see profile_table) if requested.
+        """
+        loaded = load_table(file_path, cache=cache, cache_dir=cache_dir, compact=compact, usecols=usecols,
+                            engine=engine, profile=profile)
+        data = loaded["data"]
+        self._encoding = (weakref.ref(data), loaded["encoded"])
+        self.cache.clear()
+        result = {"data": data, "original_data": snapshot(data), "column_unique_counts": loaded["column_unique_counts"],
+                  "column_types": loaded["column_types"]}
+        if profile:
+            result["profile"] = loaded["profile"]
+        return result
+
+
+
+
+    def load_encoded(self, file_path, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+        """
+        Load a CSV or TSV file chunk by chunk into an integer-encoded frame.
+
+        The parsed rows are not kept, only the codes and distinct values of
+        every column, so files that do not fit in memory as a DataFrame can
+        still be assessed: the encoded frame can be passed as data to the
+        uniqueness, k-anonymity, l-diversity and combination metrics.
+
+        Parameters:
+            file_path (str): Path of the .csv or .tsv file, optionally compressed
+                (.gz, .bz2, .xz, .zst).
+            chunksize (int): Rows read per chunk.
+            usecols (list): Only load these columns.
+
+        Returns:
+            dict: encoded (EncodedFrame), column_unique_counts and column_types.
+        """
+        loaded = stream_table(file_path, chunksize=chunksize, usecols=usecols)
+        self.cache.clear()
+        return loaded
 
+    def reassess(self, file_path, selected_columns, sensitive_attr=None, state_path=None):
+        """
+        Uniqueness, k-anonymity and l-diversity of a file that grows by
+        appended rows, reading only the rows appended since the previous call.
 
+        Parameters:
+            file_path (str): Path of the .csv or .tsv file.
+            selected_columns (list): Quasi-identifier columns.
+            sensitive_attr (str): Optional sensitive attribute for l-diversity.
+            state_path (str): File keeping the equivalence classes between
+                runs, so that a later process also only reads appended rows.
 
+        Returns:
+            dict: mode ('full', 'append' or 'unchanged'), new_rows,
+            total_rows, num_unique_rows, k_anonymity, k_histogram and
+            l_diversity, see IncrementalAssessment.
+        """
+        key = (file_path, tuple(selected_columns), sensitive_attr, state_path)
+        if key not in self._assessments:
+            self._assessments[key] = IncrementalAssessment(file_path, selected_columns, sensitive_attr,
+                                                           state_path=state_path)
+        return self._assessments[key].update()
 
     def find_lowest_unique_columns(self, data, selected_columns):
+        encoded = self.encode(data, selected_columns)
+        all_unique_count, counts_after_removal = self.cache.leave_one_out(encoded, selected_columns)
         results = {}
-        for column in selected_columns:
-            subset_data = data[selected_columns]
-            value_counts = subset_data.value_counts(dropna=False)
-            unique_rows = value_counts[value_counts == 1].index
-            all_unique_count = len(unique_rows)
-            temp_columns = [col for col in selected_columns if col != column]
-            if temp_columns:
-                subset_data_after_removal = data[temp_columns]
-                value_counts_after_removal = subset_data_after_removal.value_counts(dropna=False)
-                unique_rows_after_removal = value_counts_after_removal[value_counts_after_removal == 1].index
-                unique_count_after_removal = len(unique_rows_after_removal)
-                difference = all_unique_count - unique_count_after_removal
-                unique_values_count = subset_data[column].nunique()
-                normalized_difference = round(difference / unique_values_count, 1)
-                results[column] = {
-                    'unique_count_after_removal': unique_count_after_removal,
-                    'difference': difference,
-                    'normalized_difference': normalized_difference
-                }
+        if len(selected_columns) < 2:
+            return results
+        for column, unique_count_after_removal in zip(selected_columns, counts_after_removal):
+            difference = all_unique_count - unique_count_after_removal
+            unique_values_count = encoded.cardinality(column)
+            normalized_difference = round(difference / unique_values_count, 1)
+            results[column] = {
+                'unique_count_after_removal': unique_count_after_removal,
+                'difference': difference,
+                'normalized_difference': normalized_difference
+            }
         return results
 
 
 
 
     def calculate_k_anonymity(self, data, selected_columns):
-        grouped = data.groupby(selected_columns).size().reset_index(name='counts')
-        return grouped['counts'].min()
+        return self.cache.summary(self.encode(data, selected_columns), selected_columns)["k_anonymity"]
+
+    def calculate_k_distribution(self, data, selected_columns, k=DEFAULT_K):
+        """
+        Class size of every record, the class size histogram and the share of
+        records in classes of fewer than k rows, from one grouping.
+
+        Parameters:
+            data (pd.DataFrame or EncodedFrame): The input data.
+            selected_columns (list): Quasi-identifier columns.
+            k (int): Class size threshold.
+
+        Returns:
+            dict: See EncodedFrame.k_distribution.
+        """
+        encoded = self.encode(data, selected_columns)
+        return self.cache.lookup(encoded, 'k_distribution', selected_columns,
+                                 lambda: encoded.k_distribution(selected_columns, k), params=(k,))
 
 
 
     def calculate_l_diversity(self, data, selected_columns, sensitive_attr):
-        grouped = data.groupby(selected_columns)
-        return grouped[sensitive_attr].nunique().min()
+        return self.cache.summary(self.encode(data, list(selected_columns) + [sensitive_attr]), selected_columns,
+                                  sensitive_attr)["l_diversity"]
+
+
 
+    def calculate_l_diversity_variants(self, data, selected_columns, sensitive_attr, c=2, l=2):
+        """
+        Distinct, entropy and recursive (c, l)-diversity of a sensitive
+        attribute, all from one sparse class x value contingency table.
+
+        Parameters:
+            data (pd.DataFrame or EncodedFrame): The input data.
+            selected_columns (list): Quasi-identifier columns.
+            sensitive_attr (str): Sensitive attribute.
+            c (float): Constant of recursive (c, l)-diversity.
+            l (int): l of recursive (c, l)-diversity.
+
+        Returns:
+            dict: See diversity.l_diversity.
+        """
+        encoded = self.encode(data, list(selected_columns) + [sensitive_attr])
+        return self.cache.lookup(
+            encoded, 'l_diversity', selected_columns,
+            lambda: l_diversity(encoded.partition(selected_columns), encoded.codes(sensitive_attr),
+                                encoded.cardinality(sensitive_attr), c, l),
+            params=(sensitive_attr, c, l), depends=[sensitive_attr])
+
+    def calculate_l_diversity_batch(self, data, selected_columns, sensitive_attrs, c=2, l=2, n_jobs=None):
+        """
+        calculate_l_diversity_variants for many sensitive attributes, grouping
+        the rows by the quasi-identifiers once.
 
+        Parameters:
+            data (pd.DataFrame or EncodedFrame): The input data.
+            selected_columns (list): Quasi-identifier columns.
+            sensitive_attrs (list): Sensitive attributes.
+            c (float): Constant of recursive (c, l)-diversity.
+            l (int): l of recursive (c, l)-diversity.
+            n_jobs (int): Number of worker processes, -1 for one per core.
+
+        Returns:
+            pd.DataFrame: One row per sensitive attribute (the index), with the
+            columns of diversity.l_diversity.
+        """
+        encoded = self.encode(data, list(selected_columns) + list(sensitive_attrs))
+        results = {attr: self.cache.get(encoded, 'l_diversity', selected_columns, params=(attr, c, l), depends=[attr])
+                   for attr in sensitive_attrs}
+        missing = [attr for attr, result in results.items() if result is None]
+        if missing:
+            for attr, result in batch_l_diversity(encoded, selected_columns, missing, c, l, n_jobs).items():
+                self.cache.put(encoded, 'l_diversity', selected_columns, result, params=(attr, c, l), depends=[attr])
+                results[attr] = result
+        return pd.DataFrame.from_dict(results, orient='index')
+
+    def calculate_t_closeness(self, data, selected_columns, sensitive_attr, kind=None, order=None):
+        """
+        t-closeness of a sensitive attribute, the largest distance between the
+        value distribution of an equivalence class and that of the whole
+        table, computed for every class at once from one contingency table.
+
+        Parameters:
+            data (pd.DataFrame or EncodedFrame): The input data.
+            selected_columns (list): Quasi-identifier columns.
+            sensitive_attr (str): Sensitive attribute.
+            kind (str): 'categorical' (variational distance), 'ordered' or
+                'numeric' (Earth Mover's Distance); from the values if None.
+            order (list): Order of the values for 'ordered'.
+
+        Returns:
+            dict: See closeness.t_closeness.
+        """
+        encoded = self.encode(data, list(selected_columns) + [sensitive_attr])
+        return self.cache.lookup(
+            encoded, 't_closeness', selected_columns,
+            lambda: t_closeness(encoded.partition(selected_columns), encoded.codes(sensitive_attr),
+                                encoded.uniques(sensitive_attr), kind, order),
+            params=(sensitive_attr, kind, tuple(order) if order is not None else None), depends=[sensitive_attr])
 
     def calculate_unique_rows(self, data, selected_columns, sensitive_attr=None):
-        value_counts = data[selected_columns].value_counts(dropna=False)
-        num_unique_rows = len(value_counts[value_counts == 1])
-        total_rows = len(data)
-        total_columns = len(data.columns)
-        num_selected_columns = len(selected_columns)
-        k_anonymity = self.calculate_k_anonymity(data, selected_columns)
-        l_diversity = self.calculate_l_diversity(data, selected_columns, sensitive_attr) if sensitive_attr else None
+        """
+        Compute unique rows, k-anonymity and l-diversity of the selected columns.
+
+        All metrics are derived from one grouping of the rows. Missing values in
+        the selected columns are treated as a value of their own; missing
+        values of the sensitive attribute do not count towards l-diversity.
+
+        Parameters:
+            data (pd.DataFrame or EncodedFrame): The input data.
+            selected_columns (list): Quasi-identifier columns.
+            sensitive_attr (str): Optional sensitive attribute for l-diversity.
+
+        Returns:
+            dict: Row and column counts, num_unique_rows, k_anonymity, the
+            k_histogram ({class size: number of classes}) and l_diversity.
+        """
+        encoded = self.encode(data, list(selected_columns) + ([sensitive_attr] if sensitive_attr else []))
+        # The partition is kept up to date across rounding, noise and combining
+        encoded.track(selected_columns)
+        summary = self.cache.summary(encoded, selected_columns, sensitive_attr)
         return {
-            "total_rows": total_rows,
-            "total_columns": total_columns,
-            "num_selected_columns": num_selected_columns,
-            "num_unique_rows": num_unique_rows,
-            "k_anonymity": k_anonymity,
-            "l_diversity": l_diversity
+            "total_rows": encoded.n_rows,
+            "total_columns": len(encoded.columns),
+            "num_selected_columns": len(selected_columns),
+            "num_unique_rows": summary["num_unique_rows"],
+            "k_anonymity": summary["k_anonymity"],
+            "k_histogram": summary["k_histogram"],
+            "l_diversity": summary["l_diversity"]
         }
 
 
 
-    def compute_combined_column_contribution(self, data, selected_columns, min_size=3, max_size=7):
+    def approximate_unique_rows(self, data, selected_columns, sensitive_attr=None, sample_size=DEFAULT_SAMPLE_SIZE,
+                                confidence=0.95, exact_rows=EXACT_MAX_ROWS):
+        """
+        Approximate calculate_unique_rows from a stratified sample of the rows,
+        for a quick preview of large tables.
+
+        The number of unique rows of the whole table is extrapolated from the
+        class sizes of the sample, with a confidence interval; k-anonymity
+        and l-diversity are those of the sample. A DataFrame that was not
+        encoded yet only has the sampled rows encoded, and the next encode
+        (e.g. by calculate_unique_rows) encodes the remaining rows only.
+        Tables of at most exact_rows rows are counted exactly instead, which
+        is as fast.
+
+        Parameters:
+            data (pd.DataFrame or EncodedFrame): The input data.
+            selected_columns (list): Quasi-identifier columns.
+            sensitive_attr (str): Optional sensitive attribute for l-diversity.
+            sample_size (int): Number of sampled rows.
+            confidence (float): Confidence level of the interval.
+            exact_rows (int): Largest table that is counted exactly.
+
+        Returns:
+            dict: See sampling.approximate_summary.
+        """
+        if not selected_columns:
+            raise ValueError("Please select at least one column.")
+        columns = list(selected_columns)
+        if sensitive_attr and sensitive_attr not in columns:
+            columns.append(sensitive_attr)
+        n_rows = data.n_rows if isinstance(data, EncodedFrame) else len(data)
+        if n_rows <= exact_rows:
+            return exact_summary(self.encode(data, columns), selected_columns, sensitive_attr)
+        if isinstance(data, EncodedFrame) or (self._encoding is not None and self._encoding[0]() is data):
+            sampled = SampledEncoding(self.encode(data, columns), columns, sample_size)
+        else:
+            sampled = SampledEncoding(data, columns, sample_size)
+            self._sampled = (weakref.ref(data), sampled)
+        return approximate_summary(sampled, selected_columns, sensitive_attr, confidence)
+
+    def compute_combined_column_contribution(self, data, selected_columns, min_size=3, max_size=7, n_jobs=None,
+                                             top_k=None, min_score=None, progress=None, cancel=None):
         if data is None:
             raise ValueError("No data loaded. Please load a dataset first.")
         if not selected_columns:
             raise ValueError("Please select at least one column.")
-        
-        results = []
-        total_unique_rows = None
-
-        for r in range(min_size, max_size + 1):
-            all_combinations = combinations(selected_columns, r)
-            for comb in all_combinations:
-                selected_cols = list(comb)
-                value_counts = data[selected_cols].value_counts()
-                num_unique_rows = len(value_counts[value_counts == 1])
 
-                remaining_columns = [col for col in selected_columns if col not in selected_cols]
-                if remaining_columns:
-                    value_counts_excluded = data[remaining_columns].value_counts()
-                    num_excluded_unique_rows = len(value_counts_excluded[value_counts_excluded == 1])
-                else:
-                    num_excluded_unique_rows = 0
+        encoded = self.encode(data, selected_columns)
+        params = (tuple(selected_columns), min_size, max_size, top_k, min_score)
+        cached = self.cache.get(encoded, 'combined', selected_columns, params=params)
+        if cached is not None:
+            return cached.copy()
+        if top_k is not None or min_score is not None:
+            result = top_combined_column_contribution(encoded, selected_columns, min_size, max_size,
+                                                      top_k=top_k, min_score=min_score)
+        else:
+            result = combined_column_contribution(encoded, selected_columns, min_size, max_size, n_jobs=n_jobs,
+                                                  progress=progress, cancel=cancel)
+        # Partial results of a cancelled run are returned but not cached
+        if cancel is None or not cancel.is_set():
+            self.cache.put(encoded, 'combined', selected_columns, result, params=params)
+        return result.copy()
+
+    def estimate_combined_column_contribution(self, data, selected_columns, min_size=3, max_size=7, n_jobs=None):
+        """
+        Predict the number of combinations, peak memory and wall time of
+        compute_combined_column_contribution before running it.
 
-                results.append({
-                    'Combination': ', '.join(selected_cols),
-                    'Unique Rows': num_unique_rows,
-                    'Unique Rows Excluding Columns': num_excluded_unique_rows
-                })
+        Returns:
+            CostEstimate: subsets, steps, peak_memory (bytes) and seconds.
+        """
+        encoded = self.encode(data, selected_columns)
+        cardinalities = [encoded.cardinality(column) for column in selected_columns]
+        return estimate_combined_column_contribution(encoded.n_rows, cardinalities, min_size, max_size, n_jobs=n_jobs)
 
-        all_combinations_df = pd.DataFrame(results)
+    def estimate_suda2(self, data, selected_columns):
+        """
+        Predict the number of searched subsets, peak memory and wall time of
+        compute_suda2 before running it (an upper bound).
 
-        if total_unique_rows is None:
-            total_value_counts = data[selected_columns].value_counts()
-            total_unique_rows = len(total_value_counts[total_value_counts == 1])
+        Returns:
+            CostEstimate: subsets, steps, peak_memory (bytes) and seconds.
+        """
+        encoded = self.encode(data, selected_columns)
+        return estimate_suda2(encoded.n_rows, [encoded.cardinality(column) for column in selected_columns])
 
-        all_combinations_df['Score'] = (total_unique_rows - all_combinations_df['Unique Rows Excluding Columns']) / all_combinations_df['Unique Rows']
+    def iter_combined_column_contribution(self, data, selected_columns, min_size=3, max_size=7, n_jobs=None,
+                                          progress=None, cancel=None):
+        """
+        Generator variant of compute_combined_column_contribution.
 
-        return all_combinations_df
+        Parameters:
+            data (pd.DataFrame): The input data.
+            selected_columns (list): Quasi-identifier columns.
+            min_size (int): Smallest combination size.
+            max_size (int): Largest combination size.
+            n_jobs (int): Number of worker processes, -1 for one per core.
+            progress (callable): Called as progress(done, total, eta).
+            cancel (object): Token with an is_set() method, e.g. a
+                threading.Event, that stops the run.
+
+        Yields:
+            ContributionBuffer: Completed combinations; batch.to_frame() gives
+            them as a DataFrame and ContributionBuffer.extend collects them.
+        """
+        if data is None:
+            raise ValueError("No data loaded. Please load a dataset first.")
+        if not selected_columns:
+            raise ValueError("Please select at least one column.")
+        return iter_combined_column_contribution(self.encode(data, selected_columns), selected_columns, min_size, max_size,
+                                                 n_jobs=n_jobs, progress=progress, cancel=cancel)
 
 
 
@@ -143,10 +452,11 @@ class metaprivBIDS_core_logic:
             
             if column_name in data.columns:
                
-                self.original_columns.setdefault(column_name, data[column_name].copy())
+                self.original_columns.setdefault(column_name, snapshot(data[column_name]))
                 
               
                 data[column_name] = data[column_name].apply(lambda x: math.ceil(x / factor) * factor)
+                self.invalidate_encoding(data, [column_name])
                 
                 return data  
             else:
@@ -160,6 +470,7 @@ class metaprivBIDS_core_logic:
     def revert_to_original(self, data, column_name):
         if column_name in self.original_columns:
             data[column_name] = self.original_columns[column_name]
+            self.invalidate_encoding(data, [column_name])
             return data
         else:
             raise ValueError(f"No original data available for column {column_name}.")
@@ -173,32 +484,56 @@ class metaprivBIDS_core_logic:
         if column_name not in data.columns:
             raise ValueError(f"Column {column_name} not found in the data.")
         if column_name not in self.original_columns:
-            self.original_columns[column_name] = data[column_name].copy()
+            self.original_columns[column_name] = snapshot(data[column_name])
         noise = np.random.laplace(loc=0.0, scale=1.0, size=len(data[column_name])) if noise_type == 'laplacian' else np.random.normal(loc=0.0, scale=1.0, size=len(data[column_name]))
         data[column_name] += noise
+        self.invalidate_encoding(data, [column_name])
         return data
 
 
 
 
-    def combine_values(self, data, column_name):
+    def combine_values(self, data, column_name, values_to_combine=None, replacement_value=None):
+        """
+        Replace a group of values of a column by one value, on top of the
+        earlier combinations.
+
+        Parameters:
+            data (pd.DataFrame): The input data.
+            column_name (str): Column whose values are combined.
+            values_to_combine (list): Values to replace; asked for on the
+                console, together with the replacement value, if None.
+            replacement_value (str): Value they are replaced by.
+
+        Returns:
+            pd.DataFrame: A modified copy of data.
+        """
         if column_name not in data.columns:
             raise ValueError(f"Column {column_name} not found in the data.")
-        data_mod = data.copy()
+        data_mod = snapshot(data)
+        # Categorical columns only accept existing categories as replacements
+        for col in set(self.combined_values_history) | {column_name}:
+            if isinstance(data_mod[col].dtype, pd.CategoricalDtype):
+                data_mod[col] = data_mod[col].astype(object)
         for col, history in self.combined_values_history.items():
             for values_to_combine, replacement_value in history:
                 data_mod[col] = data_mod[col].replace(values_to_combine, replacement_value)
         data_mod[column_name] = data_mod[column_name].str.strip()
-        print(f"Unique values in '{column_name}': {data_mod[column_name].unique()}")
-        values_to_combine = input(f"Enter values to combine in '{column_name}' (comma-separated): ").split(",")
-        values_to_combine = [v.strip().strip("'\"") for v in values_to_combine]
-        replacement_value = input("Enter the replacement value: ").strip().strip("'\"")
+        if values_to_combine is None:
+            print(f"Unique values in '{column_name}': {data_mod[column_name].unique()}")
+            values_to_combine = input(f"Enter values to combine in '{column_name}' (comma-separated): ").split(",")
+            values_to_combine = [v.strip().strip("'\"") for v in values_to_combine]
+            replacement_value = input("Enter the replacement value: ").strip().strip("'\"")
+        elif replacement_value is None:
+            raise ValueError("A replacement value is needed to combine values.")
+        values_to_combine = list(values_to_combine)
         if column_name not in self.combined_values_history:
             self.combined_values_history[column_name] = []
         self.combined_values_history[column_name].append((values_to_combine, replacement_value))
         for col, history in self.combined_values_history.items():
             for values_to_combine, replacement_value in history:
                 data_mod[col] = data_mod[col].replace(values_to_combine, replacement_value)
+        self.carry_encoding(data, data_mod, list(self.combined_values_history))
         return data_mod
 
 
@@ -238,14 +573,34 @@ class metaprivBIDS_core_logic:
 
 
 
-    def compute_cig(self, data, selected_columns):
+    def compute_cig(self, data, selected_columns, mask_value=None, percentile=None):
+        """
+        Compute the cell information gains and the PIF of the selected columns.
+
+        Parameters:
+            data (pd.DataFrame): The input data.
+            selected_columns (list): Columns to compute the CIGs of.
+            mask_value: Cells equal to this value (a number, or 'nan' for
+                missing values) get a CIG of 0; no masking if None or ''.
+            percentile (int): Percentile of the row information gains (RIG)
+                reported as PIF. If None, the mask value and the percentile
+                are asked for on the console.
+
+        Returns:
+            tuple: PIF value and the CIG DataFrame sorted by RIG.
+        """
         import piflib.pif_calculator as pif
         df = data[selected_columns]
         if df.empty:
             raise ValueError("Data not available.")
 
         # Input mask value
-        mask_value = input('Enter a mask value (or leave blank to skip):')
+        interactive = percentile is None
+        if interactive:
+            mask_value = input('Enter a mask value (or leave blank to skip):')
+        elif mask_value is None:
+            mask_value = ''
+        mask_value = str(mask_value)  # np.nan becomes 'nan'
         if mask_value.strip().lower() == 'nan':  # Check if user inputs 'nan'
             mask_value = np.nan
             mask = df.isna()  # Create mask for NaN values
@@ -270,7 +625,7 @@ class metaprivBIDS_core_logic:
 
         # Input percentile
         try:
-            percentile = int(input('Enter percentile (0-100): '))
+            percentile = int(input('Enter percentile (0-100): ') if interactive else percentile)
         except ValueError:
             raise ValueError("Invalid input for percentile. Please enter a number between 0 and 100.")
 
@@ -306,7 +661,7 @@ class metaprivBIDS_core_logic:
 
 
     def convert_to_numeric(df):
-        for col in df.select_dtypes(include=['object']).columns:
+        for col in df.select_dtypes(include=['object', 'category']).columns:
             df[col] = df[col].astype('category').cat.codes
         return df
 
@@ -314,7 +669,7 @@ class metaprivBIDS_core_logic:
 
 
     
-    def compute_suda2(self, data, selected_columns, sample_fraction=0.2, missing_value=None):
+    def compute_suda2(self, data, selected_columns, sample_fraction=0.2, missing_value=None, backend='sdcMicro'):
         """
         Compute SUDA2 on selected columns of the dataset.
 
@@ -323,9 +678,13 @@ class metaprivBIDS_core_logic:
             selected_columns (list): List of columns to include in the computation.
             sample_fraction (float): Fraction of the sample to use for SUDA2.
             missing_value: Value to treat as missing. Can be any value, including np.nan.
+            backend (str): Registered SUDA2 backend, see backends.get_backend.
 
         Returns:
             dict: A dictionary containing the results of SUDA2 computation.
+
+        Raises:
+            BackendUnavailable: If the backend (R and sdcMicro) cannot be loaded.
         """
         if not selected_columns:
             raise ValueError("No columns selected for SUDA2 computation.")
@@ -334,37 +693,26 @@ class metaprivBIDS_core_logic:
         df = data[selected_columns].copy()
 
         # Handle categorical encoding
-        for col in df.select_dtypes(include=['object']).columns:
+        for col in df.select_dtypes(include=['object', 'category']).columns:
             df[col] = df[col].astype('category').cat.codes
 
-        # Convert to R DataFrame (missing values are passed unchanged)
-        r_df = robjects.DataFrame({
-            name: robjects.FloatVector(df[name]) for name in df.columns
-        })
-
-        # Call the suda2 function
-        suda_result = sdcMicro.suda2(
-            r_df,
-            missing=missing_value if missing_value is not None else None,
-            DisFraction=sample_fraction
-        )
+        # Call the suda2 function (missing values are passed unchanged); R
+        # and sdcMicro are only loaded on the first call
+        suda_result = get_backend(backend).suda2(df, missing=missing_value, dis_fraction=sample_fraction)
 
         # Extract results
-        dis_score = [round(x, 4) for x in list(suda_result.rx2('disScore'))]
-        score = list(suda_result.rx2('score'))
+        dis_score = [round(x, 4) for x in suda_result['disScore']]
+        score = suda_result['score']
 
         # Attribute contributions
-        attribute_contributions = pd.DataFrame({
-            'variable': list(suda_result.rx2('attribute_contributions').rx2('variable')),
-            'contribution': [round(x, 2) for x in list(suda_result.rx2('attribute_contributions').rx2('contribution'))]
-        }).sort_values(by='contribution', ascending=False)
+        attribute_contributions = suda_result['attribute_contributions']
+        attribute_contributions['contribution'] = attribute_contributions['contribution'].round(2)
+        attribute_contributions = attribute_contributions.sort_values(by='contribution', ascending=False)
 
         # Attribute level contributions
-        attribute_level_contributions = pd.DataFrame({
-            'variable': list(suda_result.rx2('attribute_level_contributions').rx2('variable')),
-            'attribute': list(suda_result.rx2('attribute_level_contributions').rx2('attribute')),
-            'contribution': [round(x, 2) for x in list(suda_result.rx2('attribute_level_contributions').rx2('contribution'))]
-        }).sort_values(by=['variable', 'contribution'], ascending=[True, False])
+        attribute_level_contributions = suda_result['attribute_level_contributions']
+        attribute_level_contributions['contribution'] = attribute_level_contributions['contribution'].round(2)
+        attribute_level_contributions = attribute_level_contributions.sort_values(by=['variable', 'contribution'], ascending=[True, False])
 
         # Add scores to DataFrame
         df['dis-score'] = dis_score
@@ -0,0 +1,370 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from .encoding import EncodedFrame, column_fingerprint, compact_codes
+from .loading import ColumnEncoder
+
+
+# Rows of the sample the approximate metrics are computed on
+DEFAULT_SAMPLE_SIZE = 50_000
+
+# Tables up to this many rows are summarized exactly: the exact count of an
+# encoded table of this size takes no longer than the approximation
+EXACT_MAX_ROWS = 5_000_000
+
+
+def stratified_rows(n_rows, size, strata=None, seed=0):
+    """
+    Row indices of a stratified random sample.
+
+    Every stratum contributes the same share of its rows (proportional
+    allocation, rounded), so every row has about the same probability
+    size / n_rows of being drawn and every value of the strata column is
+    represented according to its frequency.
+
+    Parameters:
+        n_rows (int): Number of rows.
+        size (int): Number of rows to draw.
+        strata (np.ndarray): Stratum code of every row, a simple random
+            sample if None.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        np.ndarray: Sorted row indices.
+    """
+    rng = np.random.default_rng(seed)
+    if size >= n_rows:
+        return np.arange(n_rows)
+    if strata is None:
+        return np.sort(rng.choice(n_rows, size, replace=False))
+    strata = np.asarray(strata, dtype=np.int64)
+    strata = strata - strata.min()
+    stratum_sizes = np.bincount(strata)
+    quota = np.round(stratum_sizes * (size / n_rows)).astype(np.int64)
+    # Rows grouped by stratum; a stable sort of small integers is a radix sort
+    order = np.argsort(compact_codes(strata, len(stratum_sizes)), kind='stable')
+    starts = np.concatenate([[0], np.cumsum(stratum_sizes)[:-1]])
+    rows = [order[start + rng.choice(stratum_size, count, replace=False)]
+            for start, stratum_size, count in zip(starts, stratum_sizes, quota) if count]
+    return np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+
+
+class SampledEncoding:
+    """
+    Encoded stratified sample of a table.
+
+    When data is an EncodedFrame the sample is a slice of its codes. When
+    it is a DataFrame only the sampled rows of the requested columns are
+    encoded, and exact later encodes the remaining rows with the same
+    column dictionaries, so the sampled codes are reused rather than
+    computed again.
+
+    Parameters:
+        data (pd.DataFrame or EncodedFrame): The table.
+        columns (list): Columns to sample, e.g. the quasi-identifiers and the
+            sensitive attribute.
+        size (int): Number of rows to draw.
+        strata (str): Column the sample is stratified by; the column of
+            columns with the fewest distinct values (more than one) if None.
+        seed (int): Seed of the random generator.
+
+    Attributes:
+        rows (np.ndarray): Sorted indices of the sampled rows.
+        fraction (float): Share of the rows in the sample.
+        encoded (EncodedFrame): Encoding of the sampled rows.
+        cardinalities (dict): Distinct values of every column in the whole
+            table, missing values counting as one.
+    """
+
+    def __init__(self, data, columns, size=DEFAULT_SAMPLE_SIZE, strata=None, seed=0):
+        self.data = data
+        self.columns = list(columns)
+        n_rows = data.n_rows if isinstance(data, EncodedFrame) else len(data)
+        self.n_rows = n_rows
+        # Distinct values of every column in the whole table, a missing
+        # value counting as one
+        if isinstance(data, EncodedFrame):
+            self.cardinalities = {column: data.cardinality(column) + data.has_missing(column)
+                                  for column in self.columns}
+        else:
+            self.cardinalities = {column: data[column].nunique(dropna=False) for column in self.columns}
+        if strata is None:
+            candidates = [column for column in self.columns if self.cardinalities[column] > 1]
+            strata = min(candidates, key=self.cardinalities.get) if candidates else None
+        strata_codes = None
+        if strata is not None:
+            strata_codes = data.codes(strata) if isinstance(data, EncodedFrame) \
+                else data[strata].factorize()[0]
+        self.rows = stratified_rows(n_rows, size, strata_codes, seed)
+        self.fraction = len(self.rows) / n_rows if n_rows else 1.0
+
+        codes, uniques = {}, {}
+        self._encoders = {}
+        self._fingerprints = {}
+        for column in self.columns:
+            if isinstance(data, EncodedFrame):
+                codes[column], uniques[column] = data.codes(column)[self.rows], data.uniques(column)
+            else:
+                self._fingerprints[column] = column_fingerprint(data[column])
+                encoder = self._encoders[column] = ColumnEncoder()
+                codes[column] = encoder.encode(data[column].to_numpy()[self.rows])
+                uniques[column] = encoder.uniques.to_numpy()
+        self.encoded = EncodedFrame.from_codes(codes, uniques)
+
+    def exact(self):
+        """
+        Encoding of all rows.
+
+        Returns:
+            EncodedFrame: data itself if it is an EncodedFrame, otherwise an
+            encoding of the DataFrame that reuses the codes of the sampled
+            rows and only encodes the others.
+        """
+        if isinstance(self.data, EncodedFrame):
+            return self.data
+        rest = np.ones(self.n_rows, dtype=bool)
+        rest[self.rows] = False
+        codes, uniques = {}, {}
+        for column, encoder in self._encoders.items():
+            column_codes = np.empty(self.n_rows, dtype=np.int32)
+            column_codes[self.rows] = self.encoded.codes(column)
+            column_codes[rest] = encoder.encode(self.data[column].to_numpy()[rest])
+            codes[column] = compact_codes(column_codes, len(encoder))
+            uniques[column] = encoder.uniques.to_numpy()
+        return EncodedFrame.from_codes(codes, uniques, self.data, self._fingerprints)
+
+
+def _log_shares(partition, cells):
+    # Log probability of every observed value combination of a block, and of
+    # each of the combinations never observed, which share evenly the
+    # Good-Turing mass N1 / n, N1 being the number of combinations seen once
+    n_rows = partition.counts.sum()
+    shares = partition.counts / n_rows
+    unseen = cells - partition.n_groups
+    if unseen < 1:
+        return np.log(shares), None, 0.0
+    mass = max(partition.num_unique(), 1) / n_rows
+    return np.log(shares * (1 - mass)), np.log(mass / unseen), unseen
+
+
+def _entropy(partition):
+    shares = partition.counts / partition.counts.sum()
+    return float(-(shares * np.log(shares)).sum())
+
+
+def associated_blocks(encoded, columns, max_share=0.25):
+    """
+    Group columns into blocks of associated columns.
+
+    Starting from one block per column, the two blocks whose association is
+    the most significant are merged while their likelihood ratio statistic
+    of independence G = 2 n I (I the mutual information) exceeds the BIC
+    penalty df log n, and the merged block has no more observed value
+    combinations than max_share of the rows.
+
+    Returns:
+        list: Blocks as lists of columns.
+    """
+    n_rows = encoded.n_rows
+    blocks = [[column] for column in columns]
+    stats = {}
+
+    def block_stats(block):
+        key = frozenset(block)
+        if key not in stats:
+            partition = encoded.partition(block)
+            stats[key] = (_entropy(partition), partition.n_groups)
+        return stats[key]
+
+    while len(blocks) > 1:
+        best = None
+        for i in range(len(blocks)):
+            for j in range(i + 1, len(blocks)):
+                (h_i, k_i), (h_j, k_j) = block_stats(blocks[i]), block_stats(blocks[j])
+                h_joint, k_joint = block_stats(blocks[i] + blocks[j])
+                score = 2 * n_rows * (h_i + h_j - h_joint) - (k_i - 1) * (k_j - 1) * np.log(n_rows)
+                if score > 0 and k_joint <= max_share * n_rows and (best is None or score > best[0]):
+                    best = (score, i, j)
+        if best is None:
+            break
+        _, i, j = best
+        blocks = [block for k, block in enumerate(blocks) if k not in (i, j)] + [blocks[i] + blocks[j]]
+    return blocks
+
+
+def estimate_population_uniques(encoded, columns, n_rows, cardinalities, width=0.02):
+    """
+    Estimate the number of unique rows of a table from a random sample of it.
+
+    The columns are grouped into associated blocks (see associated_blocks)
+    that are taken as independent, a log-linear model with the interactions
+    inside the blocks. Within a block the probability of a value combination
+    is its share of the sample, and the combinations never observed share
+    the Good-Turing mass. A cell (combination of all columns) with
+    probability p then holds its f sample rows plus a Poisson(p (N - n))
+    number of the other rows, N and n being the table and sample sizes, and
+    is unique in the table with probability exp(-g) if f = 1 and g exp(-g)
+    if f = 0, g = p (N - n).
+
+    The sum over the cells never observed, possibly far too many to list,
+    comes from the distribution of log p over all cells: the convolution of
+    the histograms of log p of every block, in bins of the given width.
+
+    Parameters:
+        encoded (EncodedFrame): Encoding of the sampled rows.
+        columns (list): Quasi-identifier columns.
+        n_rows (int): Number of rows of the whole table.
+        cardinalities (dict): Distinct values of every column in the whole
+            table, missing values counting as one.
+        width (float): Bin width of the log probabilities.
+
+    Returns:
+        float: Estimated number of unique rows.
+    """
+    cells = encoded.partition(columns)
+    if encoded.n_rows >= n_rows or not cells.n_groups:
+        return float(cells.num_unique())
+    rest = n_rows - encoded.n_rows
+
+    histogram, offset = np.ones(1), 0.0
+    log_p = np.zeros(encoded.n_rows)
+    for block in associated_blocks(encoded, columns):
+        partition = encoded.partition(block)
+        observed, unseen_log_p, unseen = _log_shares(
+            partition, float(np.prod([cardinalities[column] for column in block], dtype=float)))
+        log_p += observed[partition.ids]
+        values, weights = observed, np.ones(len(observed))
+        if unseen:
+            values, weights = np.append(values, unseen_log_p), np.append(weights, unseen)
+        low = np.floor(values.min() / width)
+        histogram = np.convolve(histogram, np.bincount((np.floor(values / width) - low).astype(np.int64),
+                                                       weights=weights))
+        offset += low
+    g = rest * np.exp((offset + np.arange(len(histogram)) + 0.5) * width)
+    estimate = np.sum(histogram * g * np.exp(-g))
+
+    # The observed cells are in the histogram as if never observed
+    first = np.empty(cells.n_groups, dtype=np.int64)
+    first[cells.ids[::-1]] = np.arange(encoded.n_rows - 1, -1, -1)
+    cell_log_p = log_p[first]
+    binned = rest * np.exp((np.floor(cell_log_p / width) + 0.5) * width)
+    estimate += np.sum((cells.counts == 1) * np.exp(-rest * np.exp(cell_log_p))) - np.sum(binned * np.exp(-binned))
+    return float(min(max(estimate, 0.0), n_rows))
+
+
+def approximate_summary(sampled, columns, sensitive_attr=None, confidence=0.95, groups=10):
+    """
+    Approximate uniqueness, k-anonymity and l-diversity from a sample.
+
+    The table's unique rows are estimated with estimate_population_uniques.
+    The interval around the estimate covers two sources of error:
+
+    - sampling: the standard error of a delete-a-group jackknife over
+      groups random groups of the sample rows, at the given confidence;
+    - the model: it is fitted to a half and to a quarter of the sample to
+      predict the unique rows of the whole sample, which are known. The
+      larger relative error of the two predictions, scaled up with the log
+      of the ratio of table rows to sample rows when that ratio exceeds 4,
+      widens the interval to estimate * (1 - model_error) below and
+      estimate / (1 - model_error) above.
+
+    The model check measures how well the model extrapolates on this data,
+    it does not bound the error: an interval that still misses the exact
+    count is possible.
+
+    Parameters:
+        sampled (SampledEncoding): The sample, encoding columns and
+            sensitive_attr.
+        columns (list): Quasi-identifier columns.
+        sensitive_attr (str): Optional sensitive attribute.
+        confidence (float): Confidence level of the sampling part of the
+            interval.
+        groups (int): Number of jackknife groups.
+
+    Returns:
+        dict: total_rows, sample_rows, fraction, num_unique_rows (estimate)
+        with num_unique_rows_lower and num_unique_rows_upper, model_error,
+        and the sample's own num_unique_rows, k_anonymity and l_diversity as
+        sample_unique_rows, sample_k_anonymity and sample_l_diversity.
+    """
+    summary = sampled.encoded.summary(columns, sensitive_attr)
+    encoded = sampled.encoded
+    estimate = estimate_population_uniques(encoded, columns, sampled.n_rows, sampled.cardinalities)
+
+    lower = upper = estimate
+    model_error = 0.0
+    n_sample = len(sampled.rows)
+    if sampled.fraction < 1 and n_sample >= 2 * groups:
+        order = np.random.default_rng(0).permutation(n_sample)
+
+        def subsample(rows):
+            return EncodedFrame.from_codes({column: encoded.codes(column)[rows] for column in columns},
+                                           {column: encoded.uniques(column) for column in columns})
+
+        group = np.empty(n_sample, dtype=np.int64)
+        group[order] = np.arange(n_sample) % groups
+        replicates = np.array([
+            estimate_population_uniques(subsample(np.flatnonzero(group != g)), columns, sampled.n_rows,
+                                        sampled.cardinalities)
+            for g in range(groups)])
+        sd = np.sqrt((groups - 1) / groups * np.sum((replicates - replicates.mean()) ** 2))
+
+        sample_cardinalities = {column: encoded.cardinality(column) + encoded.has_missing(column)
+                                for column in columns}
+        if summary["num_unique_rows"]:
+            model_error = max(
+                abs(estimate_population_uniques(subsample(np.sort(order[:n_sample // share])), columns, n_sample,
+                                                sample_cardinalities) / summary["num_unique_rows"] - 1)
+                for share in (2, 4))
+            # The error grows with the extrapolation, taken as proportional to
+            # the log of the ratio of rows
+            model_error *= max(1.0, np.log(1 / sampled.fraction) / np.log(4))
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        # The model error is relative to either count, so the exact count lies
+        # between estimate * (1 - model_error) and estimate / (1 - model_error)
+        lower = max(np.floor(estimate * (1 - model_error) - z * sd), 0.0)
+        upper = sampled.n_rows
+        if model_error < 1:
+            upper = min(np.ceil(estimate / (1 - model_error) + z * sd), upper)
+    return {
+        "total_rows": sampled.n_rows,
+        "sample_rows": n_sample,
+        "fraction": sampled.fraction,
+        "num_unique_rows": estimate,
+        "num_unique_rows_lower": lower,
+        "num_unique_rows_upper": upper,
+        "model_error": model_error,
+        "sample_unique_rows": summary["num_unique_rows"],
+        "sample_k_anonymity": summary["k_anonymity"],
+        "sample_l_diversity": summary["l_diversity"],
+    }
+
+
+def exact_summary(encoded, columns, sensitive_attr=None):
+    """
+    Exact counterpart of approximate_summary, for tables small enough to
+    count exactly.
+
+    Parameters:
+        encoded (EncodedFrame): The table.
+        columns (list): Quasi-identifier columns.
+        sensitive_attr (str): Optional sensitive attribute.
+
+    Returns:
+        dict: The keys of approximate_summary, the sample being the whole
+        table and the interval the exact count.
+    """
+    summary = encoded.summary(columns, sensitive_attr)
+    return {
+        "total_rows": encoded.n_rows,
+        "sample_rows": encoded.n_rows,
+        "fraction": 1.0,
+        "num_unique_rows": summary["num_unique_rows"],
+        "num_unique_rows_lower": summary["num_unique_rows"],
+        "num_unique_rows_upper": summary["num_unique_rows"],
+        "model_error": 0.0,
+        "sample_unique_rows": summary["num_unique_rows"],
+        "sample_k_anonymity": summary["k_anonymity"],
+        "sample_l_diversity": summary["l_diversity"],
+    }
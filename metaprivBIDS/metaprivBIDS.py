@@ -1,38 +1,50 @@
 
+from metaprivBIDS.startup import lazy_import, profile, profile_enabled, warm_up
+
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QSpacerItem, QHBoxLayout,
                                QPushButton, QFileDialog, QMessageBox, QTreeView, QHeaderView, QLabel,
                                QFrame, QTableView, QStackedWidget, QComboBox, QInputDialog, QGridLayout, QSizePolicy,
-                               QStyledItemDelegate, QMenu, QListWidget, QDialog, QTextBrowser,QScrollArea,QSplashScreen,QTableView, QScrollArea, QTableWidget, QTableWidgetItem) 
+                               QStyledItemDelegate, QMenu, QListWidget, QDialog, QTextBrowser,QScrollArea,QSplashScreen,QTableView, QScrollArea, QTableWidget, QTableWidgetItem,
+                               QProgressDialog) 
 
 from PySide6.QtGui import QStandardItemModel, QStandardItem, QFont, QAction, QPixmap,QColor, QIcon,QPainter, QColor, QPixmap,QBrush 
-from PySide6.QtCore import Qt, QDir, QDateTime, QTimer,  QSize
+from PySide6.QtCore import Qt, QDir, QDateTime, QTimer,  QSize, QObject, Signal
 from PySide6.QtSvg import QSvgRenderer
 
 
 import sys
 import json
-from scipy.stats import median_abs_deviation
+import threading
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import networkx as nx
 from itertools import combinations
-import piflib.pif_calculator as pif
-import seaborn as sns
-import matplotlib.colors as mcolors
 import io
 
+# Analysis libraries are imported on first use, or by the warm up thread
+# once the window is shown
+plt = lazy_import('matplotlib.pyplot')
+nx = lazy_import('networkx')
+pif = lazy_import('piflib.pif_calculator')
+sns = lazy_import('seaborn')
+
 
-from rpy2 import robjects
-from rpy2.robjects.packages import importr
-from rpy2.robjects import pandas2ri
+from metaprivBIDS.corelogic.backends import BackendUnavailable, get_backend
+from metaprivBIDS.corelogic.cache import UniquenessCache
+from metaprivBIDS.corelogic.closeness import t_closeness
+from metaprivBIDS.corelogic.diversity import batch_l_diversity, l_diversity
+from metaprivBIDS.corelogic.encoding import DEFAULT_K, records_below
+from metaprivBIDS.corelogic.estimate import estimate_combined_column_contribution, estimate_suda2
+from metaprivBIDS.corelogic.lattice import combined_column_contribution
+from metaprivBIDS.corelogic.loading import cache_settings, load_table, snapshot
+from metaprivBIDS.corelogic.sampling import EXACT_MAX_ROWS, SampledEncoding, approximate_summary
 
+profile.mark('modules imported')
 
-# Activate pandas <-> R DataFrame conversion
-pandas2ri.activate()
 
-# Import the sdcMicro package
-sdcMicro = importr('sdcMicro')
+class ResultRelay(QObject):
+    """Hands results computed in a worker thread over to the GUI thread."""
+    ready = Signal(object)
+
 
 
 
@@ -75,6 +87,13 @@ class metaprivBIDS(QMainWindow):
         self.original_columns = {}  
         self.combined_values = {} 
         self.combined_values_history = {}  
+        self.encoded = None
+        self.cache = UniquenessCache()
+        self.exact_summary_relay = ResultRelay()
+        self.exact_summary_relay.ready.connect(self.show_exact_summary)
+        self.pending_summary = None
+        self.k_threshold = DEFAULT_K
+        self.recursive_cl = (2, 2)
         
         self.initUI()
 
@@ -1004,8 +1023,10 @@ class metaprivBIDS(QMainWindow):
 
         try:
             
+            cardinalities = [self.column_unique_counts.get(column, df[column].nunique()) for column in selected_columns]
+            estimate = estimate_suda2(len(df), cardinalities)
             missing_value, ok = QInputDialog.getText(self, "Input Missing Value", 
-                                                     "Enter missing value (default: -999):", text="-999")
+                                                     f"Enter missing value (default: -999):\n\nEstimated cost (upper bound): {estimate}", text="-999")
             if not ok:  
                 return
             missing_value = float(missing_value)  
@@ -1017,45 +1038,27 @@ class metaprivBIDS(QMainWindow):
                 return
 
             
-            for col in df.select_dtypes(include=['object']).columns:
+            for col in df.select_dtypes(include=['object', 'category']).columns:
                 df[col] = df[col].astype('category').cat.codes
 
            
-            r_df = robjects.DataFrame({
-                name: robjects.FloatVector(df[name].astype(float)) for name in df.columns
-            })
-
-            
-            suda_result = sdcMicro.suda2(r_df, missing=missing_value, DisFraction=dis_fraction)
+            # R and sdcMicro are only started on the first SUDA2 run
+            suda_result = get_backend('sdcMicro').suda2(df, missing=missing_value, dis_fraction=dis_fraction)
 
             
-            contribution_percent = list(suda_result.rx2('contributionPercent'))
-            score = list(suda_result.rx2('score'))
-            dis_score = list(suda_result.rx2('disScore'))
+            contribution_percent = suda_result['contributionPercent']
+            score = suda_result['score']
+            dis_score = suda_result['disScore']
 
             dis_score = [round(x, 4) for x in dis_score]
 
             
 
         
-            attribute_contributions = pd.DataFrame({
-                'variable': list(suda_result.rx2('attribute_contributions').rx2('variable')),
-                'contribution': list(suda_result.rx2('attribute_contributions').rx2('contribution'))
-            })
-
-            # Extract attribute_level_contributions
-            attribute_level_contributions = pd.DataFrame({
-                'variable': list(suda_result.rx2('attribute_level_contributions').rx2('variable')),
-                'attribute': list(suda_result.rx2('attribute_level_contributions').rx2('attribute')),
-                'contribution': list(suda_result.rx2('attribute_level_contributions').rx2('contribution'))
-            })
-
+            attribute_contributions = suda_result['attribute_contributions']
 
             # Extract attribute_level_contributions
-            attribute_contributions = pd.DataFrame({
-                'variable': list(suda_result.rx2('attribute_contributions').rx2('variable')),
-                'contribution': list(suda_result.rx2('attribute_contributions').rx2('contribution'))
-            })
+            attribute_level_contributions = suda_result['attribute_level_contributions']
 
 
 
@@ -1112,6 +1115,8 @@ class metaprivBIDS(QMainWindow):
 
             self.update_frame_with_dataframe(self.indi_frame, attribute_contributions)
 
+        except BackendUnavailable as e:
+            QMessageBox.warning(self, "SUDA2 Unavailable", f"{e}\n\nSUDA2 needs R with the sdcMicro package and rpy2.")
         except Exception as e:
             print(f"Error in SUDA2 computation: {e}")
 
@@ -1829,7 +1834,7 @@ class metaprivBIDS(QMainWindow):
             QMessageBox.warning(self, "Insufficient Selection", "Please select at least two values to combine.")
             return
         if column_name not in self.original_columns:
-            self.original_columns[column_name] = self.data[column_name].copy()
+            self.original_columns[column_name] = snapshot(self.data[column_name])
         replacement_value, ok = QInputDialog.getText(self, "Combine Values", "Enter the new value for the selected items:")
         
         if ok and replacement_value: 
@@ -1843,6 +1848,7 @@ class metaprivBIDS(QMainWindow):
             self.combined_values_history[column_name].append((selected_values, replacement_value))
             self.data[column_name] = self.data[column_name].astype(str)
             self.data[column_name] = self.data[column_name].replace(selected_values, replacement_value)
+            self.invalidate_columns([column_name])
  
             self.show_preview() 
 
@@ -2033,8 +2039,8 @@ class metaprivBIDS(QMainWindow):
 
         This method performs the following steps:
         1. Checks if data is loaded; if not, it displays a warning.
-        2. Prompts the user to input minimum and maximum combination sizes for column combinations.
-        3. Iterates over all column combinations of sizes ranging from 'min_size' to 'max_size'.
+        2. Prompts the user to input minimum and maximum combination sizes for column combinations. The prompts show the estimated number of combinations, peak memory and run time of the candidate sizes.
+        3. Walks all column combinations of sizes ranging from 'min_size' to 'max_size', refining the grouping of each combination from the grouping of its parent combination. The walk is shared out over one worker process per core, reports its progress and estimated time left in a progress dialog, and can be cancelled from it; the combinations scored so far are then shown.
         4. For each combination:
         - Calculates the number of unique rows (rows with unique values) in the dataset for the selected columns.
         - Calculates the number of unique rows excluding the selected columns.
@@ -2065,53 +2071,44 @@ class metaprivBIDS(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please select at least one column.")
             return
 
-        min_size, ok_min = QInputDialog.getInt(self, "Select Minimum Combination Size", "Enter minimum combination size:", 3, 1, len(selected_columns))
+        n_rows = len(self.data)
+        cardinalities = [self.column_unique_counts.get(column, self.data[column].nunique()) for column in selected_columns]
+        default_max = min(7, len(selected_columns))
+        estimate = estimate_combined_column_contribution(n_rows, cardinalities, min(3, default_max), default_max, n_jobs=-1)
+        min_size, ok_min = QInputDialog.getInt(self, "Select Minimum Combination Size", f"Enter minimum combination size:\n\nEstimated cost of sizes {min(3, default_max)} to {default_max}: {estimate}", 3, 1, len(selected_columns))
         if not ok_min:
             return 
         
-        max_size, ok_max = QInputDialog.getInt(self, "Select Maximum Combination Size", "Enter maximum combination size:", 7, min_size, len(selected_columns))
+        estimates = "\n".join(f"up to {size}: {estimate_combined_column_contribution(n_rows, cardinalities, min_size, size, n_jobs=-1)}"
+                              for size in range(min_size, min(min_size + 6, len(selected_columns) + 1)))
+        max_size, ok_max = QInputDialog.getInt(self, "Select Maximum Combination Size", f"Enter maximum combination size:\n\nEstimated cost:\n{estimates}", 7, min_size, len(selected_columns))
         if not ok_max:
             return 
         
-        results = []
-        total_unique_rows = None
-
-        for r in range(min_size, max_size + 1): 
-            print(f"Processing combinations of size {r}...")
-            
-            all_combinations = combinations(selected_columns, r)
-            
-            for comb in all_combinations:
-                selected_cols = list(comb)
-                value_counts = self.data[selected_cols].value_counts()
-                num_unique_rows = len(value_counts[value_counts == 1])
-                        
-                remaining_columns = [col for col in selected_columns if col not in selected_cols]
-                
-       
-                if remaining_columns:
-                    value_counts_excluded = self.data[remaining_columns].value_counts()
-                    num_excluded_unique_rows = len(value_counts_excluded[value_counts_excluded == 1])
-                else:
-                    num_excluded_unique_rows = 0  
-                
-            
-                results.append({
-                    'Combination': ', '.join(selected_cols),
-                    'Unique Rows': num_unique_rows,
-                    'Unique Rows Excluding Columns': num_excluded_unique_rows
-                })
-        
-      
-        all_combinations_df = pd.DataFrame(results)
-        
-      
-        if total_unique_rows is None:
-            total_value_counts = self.data[selected_columns].value_counts()
-            total_unique_rows = len(total_value_counts[total_value_counts == 1])
-        
-    
-        all_combinations_df['Score'] = (total_unique_rows - all_combinations_df['Unique Rows Excluding Columns']) / all_combinations_df['Unique Rows']
+        params = (tuple(selected_columns), min_size, max_size, None, None)
+        all_combinations_df = self.cache.get(self.encoded, 'combined', selected_columns, params=params)
+        if all_combinations_df is None:
+            progress_dialog = QProgressDialog("Scoring column combinations...", "Cancel", 0, 1, self)
+            progress_dialog.setWindowTitle("Combined Column Contribution")
+            progress_dialog.setWindowModality(Qt.WindowModal)
+            progress_dialog.setMinimumDuration(500)
+            cancel = threading.Event()
+
+            def report(done, total, eta):
+                progress_dialog.setMaximum(total)
+                progress_dialog.setValue(done)
+                progress_dialog.setLabelText(f"Scoring column combinations... about {eta:.0f} s left")
+                QApplication.processEvents()
+                if progress_dialog.wasCanceled():
+                    cancel.set()
+
+            all_combinations_df = combined_column_contribution(self.encoded, selected_columns, min_size, max_size,
+                                                               n_jobs=-1, progress=report, cancel=cancel)
+            progress_dialog.close()
+            if cancel.is_set():
+                QMessageBox.information(self, "Cancelled", f"Showing the {len(all_combinations_df)} combinations scored before cancelling.")
+            else:
+                self.cache.put(self.encoded, 'combined', selected_columns, all_combinations_df, params=params)
         
   
         self.show_results_dialog(all_combinations_df)
@@ -2417,12 +2414,13 @@ class metaprivBIDS(QMainWindow):
             try:
                 if column_name in self.data.columns:
                     if column_name not in self.original_columns:
-                        self.original_columns[column_name] = self.data[column_name].copy()  # Store original column data
+                        self.original_columns[column_name] = snapshot(self.data[column_name])  # Store original column data
                     if noise_type == 'laplacian':
                         noise = np.random.laplace(loc=0.0, scale=1.0, size=len(self.data[column_name]))
                     elif noise_type == 'gaussian':
                         noise = np.random.normal(loc=0.0, scale=1.0, size=len(self.data[column_name]))
                     self.data[column_name] += noise
+                    self.invalidate_columns([column_name])
                     self.show_preview()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"An error occurred while adding noise: {e}")
@@ -2464,13 +2462,27 @@ class metaprivBIDS(QMainWindow):
         If a file is selected, it calls `load_data` to load the file's content.
         """
 
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", QDir.homePath(), "CSV files (*.csv);;TSV files (*.tsv);;All files (*)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", QDir.homePath(), "CSV files (*.csv *.csv.gz *.csv.bz2 *.csv.xz *.csv.zst);;TSV files (*.tsv *.tsv.gz *.tsv.bz2 *.tsv.xz *.tsv.zst);;All files (*)")
         if file_path:
             self.load_data(file_path)
 
 
 
 
+    def invalidate_columns(self, columns):
+        """
+        Forgets the cached results of modified columns and encodes them again, re-grouping only the rows whose value changed in the tracked partitions ('EncodedFrame.refresh').
+
+        Parameters:
+        -----------
+        columns : list
+            The columns whose values were changed.
+        """
+        self.encoded.refresh(columns)
+        self.cache.invalidate(columns)
+
+
+
     def load_data(self, file_path):
         """
         Loads data from a specified file into the application's data structure.
@@ -2495,8 +2507,10 @@ class metaprivBIDS(QMainWindow):
         ------
       
         - Column names are stripped of leading and trailing whitespace.
-        - Columns are classified as "Continuous" if they have more than 45 unique values; otherwise, they are classified as "Categorical".
-        - The method stores a copy of the original data and updates the tree view with the column types and options for selecting columns.
+        - Columns are classified as "Continuous" if they have more than 45 unique values; otherwise, they are classified as "Categorical". The unique values are counted from the column codes the metrics reuse.
+        - Setting the METAPRIVBIDS_CACHE environment variable ("1", or a cache directory) keeps the parsed columns in a compressed on-disk cache keyed by the file's size, modification time and content hash, so reopening an unchanged file skips parsing.
+        - Columns are stored in the smallest dtype holding their values exactly: low-cardinality text columns as category, integers downcast and floats as float32 where lossless.
+        - The method stores a copy-on-write snapshot of the original data, so unmodified columns are not duplicated, and updates the tree view with the column types and options for selecting columns.
 
         Returns:
         --------
@@ -2504,13 +2518,14 @@ class metaprivBIDS(QMainWindow):
         """
 
         try:
-            sep = '\t' if file_path.lower().endswith('.tsv') else ','
-            self.data = pd.read_csv(file_path, sep=sep)
-            self.data.columns = self.data.columns.str.strip()
-            self.column_unique_counts = {col: self.data[col].nunique() for col in self.data.columns}
-            sorted_columns = sorted(self.column_unique_counts.items(), key=lambda x: x[1], reverse=True)
-            column_types = [(col, count, "Continuous" if count > 45 else "Categorical") for col, count in sorted_columns]
-            self.original_data = self.data.copy()  # Store the original data
+            cache, cache_dir = cache_settings()
+            loaded = load_table(file_path, cache=cache, cache_dir=cache_dir, compact=True)
+            self.data = loaded["data"]
+            self.column_unique_counts = loaded["column_unique_counts"]
+            column_types = sorted(loaded["column_types"], key=lambda x: x[1], reverse=True)
+            self.original_data = snapshot(self.data)  # Store the original data
+            self.encoded = loaded["encoded"]
+            self.cache.clear()
             self.update_treeview(self.columns_model, column_types, add_checkbox=True)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred: {e}")
@@ -2561,8 +2576,12 @@ class metaprivBIDS(QMainWindow):
         -----
         - 'self.get_selected_columns()': Retrieves the currently selected columns.
         - 'self.get_sensitive_attribute()': Retrieves the currently selected sensitive attribute.
-        - 'self.calculate_k_anonymity(selected_columns)': Calculates the K-Anonymity for the selected columns.
-        - 'self.calculate_l_diversity(selected_columns, sensitive_attr)': Calculates the L-Diversity for the selected columns and sensitive attribute.
+        - 'self.cache.summary(self.encoded, selected_columns, sensitive_attr)': Groups the rows once and derives the unique rows, K-Anonymity and L-Diversity from that grouping. Repeated selections are answered from the cache until one of their columns is modified.
+        - 'self.encoded.track(selected_columns)': Keeps the grouping of the selection up to date when one of its columns is rounded, noised or combined, so that only the rows whose value changed are grouped again.
+
+        Missing values in the selected columns are treated as a value of their own; missing values of the sensitive attribute do not count towards L-Diversity.
+
+        For tables of more than 'EXACT_MAX_ROWS' rows whose selection is not cached, an estimate from a stratified sample ('approximate_summary') is shown at once, and the exact values replace it when 'start_exact_summary' has computed them in the background.
 
         Updates:
         --------
@@ -2579,28 +2598,137 @@ class metaprivBIDS(QMainWindow):
         if selected_columns:
             sensitive_attr = self.get_sensitive_attribute()
             try:
-            
-                value_counts = self.data[selected_columns].value_counts(dropna=False)
-                num_unique_rows = len(value_counts[value_counts == 1])
-            
-                total_rows = len(self.data)
-            
-                total_columns = len(self.data.columns)
-                num_selected_columns = len(selected_columns)
-                k_anonymity = self.calculate_k_anonymity(selected_columns)
-                l_diversity = self.calculate_l_diversity(selected_columns, sensitive_attr) if sensitive_attr else None
-                
-              
-                result_text = (f"Total Rows: {total_rows}\n"
-                               f"Total Columns: {total_columns}\n"
-                               f"Selected Columns: {num_selected_columns}\n"
-                               f"Unique Rows: {num_unique_rows}\n"
-                               f"K-Anonymity: {k_anonymity}\n"
-                               f"L-Diversity: {l_diversity}\n")
-                self.result_label.setText(result_text)
+                depends = [sensitive_attr] if sensitive_attr else []
+                self.encoded.track(selected_columns)
+                summary = self.cache.get(self.encoded, 'summary', selected_columns, params=(sensitive_attr,), depends=depends)
+                if summary is None and len(self.data) > EXACT_MAX_ROWS:
+                    sampled = SampledEncoding(self.encoded, list(dict.fromkeys(selected_columns + depends)))
+                    approximate = approximate_summary(sampled, selected_columns, sensitive_attr)
+                    self.result_label.setText(self.unique_rows_text(selected_columns, approximate, approximate=True))
+                    self.start_exact_summary(selected_columns, sensitive_attr)
+                    return
+                if summary is None:
+                    summary = self.cache.summary(self.encoded, selected_columns, sensitive_attr)
+                sensitive_attrs = self.get_sensitive_attributes()
+                variants = self.calculate_l_diversity_batch(selected_columns, sensitive_attrs) if sensitive_attrs else None
+                closeness = self.calculate_t_closeness(selected_columns, sensitive_attr) if sensitive_attr else None
+                self.result_label.setText(self.unique_rows_text(selected_columns, summary, variants=variants,
+                                                                closeness=closeness))
             except Exception as e:
                 self.result_label.setText(f"An error occurred: {e}")
 
+    def unique_rows_text(self, selected_columns, summary, approximate=False, variants=None, closeness=None):
+        """
+        Text of the result label for an exact summary, or for an approximate
+        summary from 'approximate_summary' while the exact one is computed.
+        'variants' maps every checked sensitive attribute to its L-Diversity variants, see 'calculate_l_diversity_batch', and 'closeness' is the T-Closeness of the first one.
+        """
+        lines = [f"Total Rows: {len(self.data)}",
+                 f"Total Columns: {len(self.data.columns)}",
+                 f"Selected Columns: {len(selected_columns)}"]
+        if approximate:
+            lines += [f"Unique Rows: \u2248 {summary['num_unique_rows']:.0f} "
+                      f"(likely {summary['num_unique_rows_lower']:.0f}\u2013{summary['num_unique_rows_upper']:.0f}, "
+                      f"sampling and model error)",
+                      f"K-Anonymity (sample): {summary['sample_k_anonymity']}",
+                      f"L-Diversity (sample): {summary['sample_l_diversity']}",
+                      f"Estimated from {summary['sample_rows']} sampled rows, computing the exact values..."]
+        else:
+            lines += [f"Unique Rows: {summary['num_unique_rows']}",
+                      f"K-Anonymity: {summary['k_anonymity']}"]
+            lines += self.k_distribution_lines(summary['k_histogram'])
+            lines += [f"L-Diversity: {summary['l_diversity']}"]
+            if variants is not None:
+                c, l = self.recursive_cl
+                attrs = list(variants)
+                first = variants[attrs[0]]
+                lines += [f"Entropy L-Diversity: {first['entropy_l']:.2f}",
+                          f"Recursive ({c}, {l})-Diversity: {'yes' if first['recursive_cl'] else 'no'} "
+                          f"({first['recursive_violations']} classes violate it)"]
+                # Further checked sensitive attributes, one line each
+                lines += [f"L-Diversity of {attr}: {variants[attr]['distinct_l']} "
+                          f"(entropy {variants[attr]['entropy_l']:.2f}, "
+                          f"recursive ({c}, {l}): {'yes' if variants[attr]['recursive_cl'] else 'no'})"
+                          for attr in attrs[1:]]
+            if closeness is not None:
+                distance = "variational distance" if closeness['kind'] == 'categorical' else f"{closeness['kind']} EMD"
+                lines += [f"T-Closeness: {closeness['t_closeness']:.3f} ({distance})"]
+        return "\n".join(lines) + "\n"
+
+    def k_distribution_lines(self, k_histogram):
+        """
+        Describe the class size distribution: the records in classes smaller
+        than 'self.k_threshold' and the number of classes of each size below
+        it. Derived from the summary's histogram, without grouping again.
+        """
+        k = self.k_threshold
+        below = records_below(k_histogram, k)
+        share = below / len(self.data) if len(self.data) else 0.0
+        sizes = [f"{size}: {k_histogram.get(size, 0)}" for size in range(1, k)]
+        sizes.append(f"{k}+: {sum(classes for size, classes in k_histogram.items() if size >= k)}")
+        return [f"Records in Classes Below k={k}: {below} ({share:.1%})",
+                f"Classes by Size: {', '.join(sizes)}"]
+
+    def start_exact_summary(self, selected_columns, sensitive_attr):
+        """
+        Compute the exact summary of the selection, and the L-Diversity
+        variants of every checked sensitive attribute, in a worker thread; the
+        result is delivered to 'show_exact_summary' through
+        'exact_summary_relay'.
+        The worker reads a snapshot of the codes ('EncodedFrame.snapshot') taken in the GUI thread, so 'invalidate_columns' can refresh 'encoded' meanwhile.
+        """
+        encoded = self.encoded
+        sensitive_attrs = self.get_sensitive_attributes()
+        columns = selected_columns + sensitive_attrs
+        request = (encoded, encoded.version(columns), list(selected_columns), sensitive_attrs)
+        self.pending_summary = request
+        kind = self.t_closeness_kind(sensitive_attr) if sensitive_attr else None
+        snapshot = encoded.snapshot(columns + ([sensitive_attr] if sensitive_attr else []))
+
+        def run():
+            try:
+                summary = snapshot.summary(selected_columns, sensitive_attr)
+                variants = batch_l_diversity(snapshot, selected_columns, sensitive_attrs, *self.recursive_cl) \
+                    if sensitive_attrs else None
+                closeness = t_closeness(snapshot.partition(selected_columns), snapshot.codes(sensitive_attr),
+                                        snapshot.uniques(sensitive_attr), kind) if sensitive_attr else None
+                result = (summary, variants, closeness)
+            except Exception as e:
+                result = e
+            self.exact_summary_relay.ready.emit((request, result))
+
+        threading.Thread(target=run, name='metaprivBIDS-exact-summary', daemon=True).start()
+
+    def show_exact_summary(self, result):
+        """
+        Replace the approximate result with the exact one, unless another
+        calculation was started or the columns were modified meanwhile.
+        """
+        request, result = result
+        encoded, version, selected_columns, sensitive_attrs = request
+        if request is not self.pending_summary:
+            return
+        self.pending_summary = None
+        sensitive_attr = sensitive_attrs[0] if sensitive_attrs else None
+        columns = selected_columns + sensitive_attrs
+        if encoded is not self.encoded or encoded.version(columns) != version:
+            return
+        if isinstance(result, Exception):
+            self.result_label.setText(f"An error occurred: {result}")
+            return
+        summary, variants, closeness = result
+        depends = [sensitive_attr] if sensitive_attr else []
+        self.cache.put(encoded, 'summary', selected_columns, summary, params=(sensitive_attr,), depends=depends)
+        self.cache.put(encoded, 'unique', selected_columns, summary['num_unique_rows'])
+        for attr, result in (variants or {}).items():
+            self.cache.put(encoded, 'l_diversity', selected_columns, result,
+                           params=(attr,) + self.recursive_cl, depends=[attr])
+        if closeness is not None:
+            self.cache.put(encoded, 't_closeness', selected_columns, closeness,
+                           params=(sensitive_attr, closeness['kind']), depends=depends)
+        self.result_label.setText(self.unique_rows_text(selected_columns, summary, variants=variants,
+                                                        closeness=closeness))
+
 
 
     def get_selected_columns(self):
@@ -2645,6 +2773,18 @@ class metaprivBIDS(QMainWindow):
                 return self.columns_model.item(row, 0).text()
         return None
 
+    def get_sensitive_attributes(self):
+        """
+        Retrieve the names of all columns checked as sensitive attributes, in table order.
+
+        Returns:
+        --------
+        list of str
+            The checked sensitive attributes; the first one is 'get_sensitive_attribute()'.
+        """
+        return [self.columns_model.item(row, 0).text() for row in range(self.columns_model.rowCount())
+                if self.columns_model.item(row, 3).checkState() == Qt.Checked]
+
 
 
     def calculate_k_anonymity(self, selected_columns):
@@ -2672,8 +2812,26 @@ class metaprivBIDS(QMainWindow):
             If the 'selected_columns' list is empty or contains invalid column names.
         """
 
-        grouped = self.data.groupby(selected_columns).size().reset_index(name='counts')
-        return grouped['counts'].min()
+        return self.cache.summary(self.encoded, selected_columns)["k_anonymity"]
+
+    def calculate_k_distribution(self, selected_columns):
+        """
+        Calculates the class size of every record together with the class size distribution.
+
+        Parameters:
+        -----------
+        selected_columns : list of str
+            The list of column names defining the equivalence classes.
+
+        Returns:
+        --------
+        dict:
+            'record_class_sizes' (class size of every row), 'k_anonymity', 'k_histogram' ({class size: number of classes}), 'records_below_k' and 'share_below_k' for k = 'self.k_threshold'.
+        """
+
+        return self.cache.lookup(self.encoded, 'k_distribution', selected_columns,
+                                 lambda: self.encoded.k_distribution(selected_columns, self.k_threshold),
+                                 params=(self.k_threshold,))
 
 
 
@@ -2707,8 +2865,100 @@ class metaprivBIDS(QMainWindow):
             If the 'selected_columns' list is empty, or if 'sensitive_attr' is not present in the dataset.
         """
 
-        grouped = self.data.groupby(selected_columns)
-        return grouped[sensitive_attr].nunique().min()
+        return self.cache.summary(self.encoded, selected_columns, sensitive_attr)["l_diversity"]
+
+    def calculate_l_diversity_variants(self, selected_columns, sensitive_attr):
+        """
+        Calculates distinct, entropy and recursive (c, l)-diversity of the sensitive attribute.
+
+        All three come from one sparse table of the number of rows of every (equivalence class, sensitive value) pair, see 'diversity.Contingency'; c and l are taken from 'self.recursive_cl'.
+
+        Parameters:
+        -----------
+        selected_columns : list of str
+            The list of column names defining the equivalence classes.
+        sensitive_attr : str
+            The sensitive attribute.
+
+        Returns:
+        --------
+        dict:
+            'distinct_l', 'entropy_l', 'recursive_cl' (whether every class satisfies recursive (c, l)-diversity) and 'recursive_violations'.
+        """
+
+        return self.cache.lookup(
+            self.encoded, 'l_diversity', selected_columns,
+            lambda: l_diversity(self.encoded.partition(selected_columns), self.encoded.codes(sensitive_attr),
+                                self.encoded.cardinality(sensitive_attr), *self.recursive_cl),
+            params=(sensitive_attr,) + self.recursive_cl, depends=[sensitive_attr])
+
+    def calculate_l_diversity_batch(self, selected_columns, sensitive_attrs):
+        """
+        Calculates the L-Diversity variants of several sensitive attributes at once.
+
+        The rows are grouped by the selected columns once and only the contingency table of each sensitive attribute is built, in parallel worker processes for large tables ('diversity.batch_l_diversity'). Attributes whose result is cached are not computed again.
+
+        Parameters:
+        -----------
+        selected_columns : list of str
+            The list of column names defining the equivalence classes.
+        sensitive_attrs : list of str
+            The sensitive attributes.
+
+        Returns:
+        --------
+        dict:
+            Sensitive attribute to its result, as returned by 'calculate_l_diversity_variants'.
+        """
+
+        results = {attr: self.cache.get(self.encoded, 'l_diversity', selected_columns,
+                                        params=(attr,) + self.recursive_cl, depends=[attr])
+                   for attr in sensitive_attrs}
+        missing = [attr for attr, result in results.items() if result is None]
+        if missing:
+            computed = batch_l_diversity(self.encoded, selected_columns, missing, *self.recursive_cl, n_jobs=-1)
+            for attr, result in computed.items():
+                self.cache.put(self.encoded, 'l_diversity', selected_columns, result,
+                               params=(attr,) + self.recursive_cl, depends=[attr])
+                results[attr] = result
+        return results
+
+    def t_closeness_kind(self, sensitive_attr):
+        """
+        Distance used for the T-Closeness of a sensitive attribute, from its type in the columns table: Earth Mover's Distance for "Continuous" columns (with value proportional steps when numeric) and variational distance for "Categorical" ones.
+        """
+        for row in range(self.columns_model.rowCount()):
+            if self.columns_model.item(row, 0).text() == sensitive_attr:
+                if self.columns_model.item(row, 2).text() != "Continuous":
+                    return 'categorical'
+                return 'numeric' if pd.api.types.is_numeric_dtype(self.data[sensitive_attr]) else 'ordered'
+        return None
+
+    def calculate_t_closeness(self, selected_columns, sensitive_attr):
+        """
+        Calculates the T-Closeness of the sensitive attribute: the largest distance between the distribution of its values within an equivalence class and in the whole dataset.
+
+        The distance of every class comes from one contingency table of the sensitive values per class, see 'closeness.t_closeness'; the kind of distance follows 't_closeness_kind'.
+
+        Parameters:
+        -----------
+        selected_columns : list of str
+            The list of column names defining the equivalence classes.
+        sensitive_attr : str
+            The sensitive attribute.
+
+        Returns:
+        --------
+        dict:
+            't_closeness', 'kind' and 'class_distances' (distance of every equivalence class).
+        """
+
+        kind = self.t_closeness_kind(sensitive_attr)
+        return self.cache.lookup(
+            self.encoded, 't_closeness', selected_columns,
+            lambda: t_closeness(self.encoded.partition(selected_columns), self.encoded.codes(sensitive_attr),
+                                self.encoded.uniques(sensitive_attr), kind),
+            params=(sensitive_attr, kind), depends=[sensitive_attr])
 
 
 
@@ -2722,7 +2972,7 @@ class metaprivBIDS(QMainWindow):
         to the uniqueness of rows in the dataset. It performs the following steps:
         1. Retrieves selected columns.
         2. Calculates the number of unique rows using the selected columns.
-        3. Iteratively removes each column to find the impact on the number of unique rows.
+        3. Removes each column in turn to find the impact on the number of unique rows. The selection is encoded once and every leave-one-out grouping is assembled from shared prefix and suffix groupings.
         4. Computes the difference in unique row counts and normalizes this difference based on the number of unique values in the column.
         5. Sorts and displays the results in descending order of normalized difference using `update_treeview`.
 
@@ -2737,21 +2987,13 @@ class metaprivBIDS(QMainWindow):
         selected_columns = self.get_selected_columns()
         if selected_columns:
             try:
-                subset_data = self.data[selected_columns]
-                value_counts = subset_data.value_counts(dropna=False)
-                unique_rows = value_counts[value_counts == 1].index
-                all_unique_count = len(unique_rows)
+                all_unique_count, counts_after_removal = self.cache.leave_one_out(self.encoded, selected_columns)
 
                 results = []
-                for column in selected_columns:
-                    temp_columns = [col for col in selected_columns if col != column]
-                    if temp_columns:
-                        subset_data_after_removal = self.data[temp_columns]
-                        value_counts_after_removal = subset_data_after_removal.value_counts(dropna=False)
-                        unique_rows_after_removal = value_counts_after_removal[value_counts_after_removal == 1].index
-                        unique_count_after_removal = len(unique_rows_after_removal)
+                if len(selected_columns) > 1:
+                    for column, unique_count_after_removal in zip(selected_columns, counts_after_removal):
                         difference = all_unique_count - unique_count_after_removal
-                        unique_values_count = subset_data[column].nunique()
+                        unique_values_count = self.encoded.cardinality(column)
                         normalized_difference = round(difference / unique_values_count, 1)
                         results.append((column, unique_count_after_removal, difference, normalized_difference))
 
@@ -2863,14 +3105,15 @@ class metaprivBIDS(QMainWindow):
                     if precision == "Remove Decimals":
                         # Truncate by converting to integers
                         if column_name in self.data.columns:
-                            self.original_columns.setdefault(column_name, self.data[column_name].copy())  # Store original data if not already
+                            self.original_columns.setdefault(column_name, snapshot(self.data[column_name]))  # Store original data if not already
                             self.data[column_name] = self.data[column_name].astype(int)
                     else:
                         # Round to specified precision
                         factor = 10 ** int(precision.split('^')[1])
                         if column_name in self.data.columns:
-                            self.original_columns.setdefault(column_name, self.data[column_name].copy())  # Store original data if not already
+                            self.original_columns.setdefault(column_name, snapshot(self.data[column_name]))  # Store original data if not already
                             self.data[column_name] = (self.data[column_name] / factor).round() * factor
+                    self.invalidate_columns([column_name])
                     self.show_preview()
                 except Exception as e:
                     QMessageBox.critical(self, "Error", f"An error occurred: {e}")
@@ -2894,6 +3137,7 @@ class metaprivBIDS(QMainWindow):
             try:
                 if column_name in self.original_columns:
                     self.data[column_name] = self.original_columns[column_name]
+                    self.invalidate_columns([column_name])
                     self.show_preview()
                 else:
                     QMessageBox.warning(self, "Warning", f"No original data available for column {column_name}.")
@@ -2926,10 +3170,23 @@ class metaprivBIDS(QMainWindow):
 
 
 def main():
-   
-    app = QApplication(sys.argv)
+    report = profile_enabled()
+    app = QApplication([arg for arg in sys.argv if arg != '--profile-startup'])
+    profile.mark('application created')
     window = metaprivBIDS()  # Assuming FileAnalyzer is your main window
+    profile.mark('window built')
     window.show()
+
+    def finished():
+        profile.mark('warm up finished')
+        if report:
+            print(profile.report(), file=sys.stderr)
+
+    def warm():
+        profile.mark('event loop running')
+        warm_up([plt, sns, nx, pif], done=finished)
+
+    QTimer.singleShot(0, warm)
     sys.exit(app.exec())
 
 
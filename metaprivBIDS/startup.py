@@ -0,0 +1,163 @@
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+
+PROFILE_ENV = 'METAPRIVBIDS_PROFILE_STARTUP'
+
+
+class StartupProfile:
+    """
+    Wall clock timings of the GUI start.
+
+    Stages are marked in seconds since the profile was created, which is
+    when metaprivBIDS.startup is first imported; imports done through
+    LazyModule are recorded with their own duration and the thread that
+    did them.
+    """
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.stages = []
+        self.imports = {}
+        self._lock = threading.Lock()
+
+    def mark(self, stage):
+        with self._lock:
+            self.stages.append((stage, time.perf_counter() - self.started))
+
+    def record_import(self, name, seconds, thread=None):
+        with self._lock:
+            self.imports[name] = (seconds, thread or threading.current_thread().name)
+
+    def report(self):
+        lines = ["Startup profile:"]
+        for stage, seconds in list(self.stages):
+            lines.append(f"  {stage:<28} {seconds * 1000:9.1f} ms")
+        if self.imports:
+            lines.append("Deferred imports:")
+            for name, (seconds, thread) in sorted(self.imports.items(), key=lambda item: -item[1][0]):
+                lines.append(f"  {name:<28} {seconds * 1000:9.1f} ms  ({thread})")
+        return "\n".join(lines)
+
+
+profile = StartupProfile()
+
+
+def profile_enabled(argv=None, environ=None):
+    """
+    Whether the startup profile is printed, from the --profile-startup
+    argument or the METAPRIVBIDS_PROFILE_STARTUP environment variable.
+    """
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    return '--profile-startup' in argv or environ.get(PROFILE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def timed_import(name, profile=profile):
+    """Import a module, recording the time in the profile if it was not loaded yet."""
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    profile.record_import(name, time.perf_counter() - started)
+    return module
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Parameters:
+        name (str): Full module name, e.g. 'matplotlib.pyplot'.
+        profile (StartupProfile): Profile the import time is recorded in.
+    """
+
+    def __init__(self, name, profile=profile):
+        self._name = name
+        self._profile = profile
+        self._module = None
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            self._module = timed_import(self._name, self._profile)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+def lazy_import(name, profile=profile):
+    return LazyModule(name, profile)
+
+
+def warm_up(modules, done=None):
+    """
+    Import lazy modules in a background thread.
+
+    The interpreter's import locks make a module requested from the main
+    thread during the warm up wait for it rather than be imported twice.
+
+    Parameters:
+        modules (list): LazyModule objects, imported in order.
+        done (callable): Called without arguments from the thread when all
+            modules are imported.
+
+    Returns:
+        threading.Thread: The started daemon thread.
+    """
+    def run():
+        for module in modules:
+            try:
+                module.load()
+            except ImportError as e:
+                # Reported again, where it matters, on first use
+                print(f"Could not preload {module._name}: {e}", file=sys.stderr)
+        if done is not None:
+            done()
+
+    thread = threading.Thread(target=run, name='metaprivBIDS-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def measure_import(module='metaprivBIDS.metaprivBIDS', repeats=3):
+    """
+    Time importing a module in fresh interpreters.
+
+    Parameters:
+        module (str): Module to import.
+        repeats (int): Number of interpreters started; the fastest is kept.
+
+    Returns:
+        tuple: Seconds of the fastest import, and the names of the top-level
+        packages that import loaded.
+    """
+    code = ("import sys, time; started = time.perf_counter(); "
+            f"import {module}; elapsed = time.perf_counter() - started; "
+            "print(elapsed); print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))")
+    best, loaded = float('inf'), set()
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        seconds, packages = result.stdout.strip().splitlines()[-2:]
+        if float(seconds) < best:
+            best, loaded = float(seconds), set(packages.split())
+    return best, loaded
+
+
+if __name__ == '__main__':
+    seconds, loaded = measure_import(*sys.argv[1:2])
+    heavy = sorted(loaded & {'matplotlib', 'networkx', 'piflib', 'rpy2', 'scipy', 'seaborn'})
+    print(f"Import time: {seconds * 1000:.1f} ms")
+    print(f"Heavy packages loaded at import: {', '.join(heavy) or 'none'}")
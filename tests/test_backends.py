@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import pytest
+from metaprivBIDS.corelogic import backends
+
+
+def test_importing_corelogic_does_not_start_r():
+    code = ("import sys, metaprivBIDS.corelogic.backends, metaprivBIDS.corelogic.lattice; "
+            "print(any(name.split('.')[0] == 'rpy2' for name in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+
+def test_importing_core_logic_does_not_start_r():
+    # The module needs its other dependencies, which the R-free install has
+    for module in ('networkx', 'matplotlib', 'seaborn', 'piflib'):
+        pytest.importorskip(module)
+    code = ("import sys, metaprivBIDS.corelogic.metapriv_corelogic; "
+            "assert 'rpy2' not in sys.modules, 'rpy2 imported'")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_backends_are_loaded_once_on_first_use():
+    loads = []
+
+    class FakeBackend:
+        def __init__(self):
+            loads.append(1)
+
+    backends.register_backend('fake', FakeBackend)
+    assert 'fake' in backends.available_backends()
+    assert not backends.backend_loaded('fake')
+
+    first = backends.get_backend('fake')
+    assert backends.get_backend('fake') is first
+    assert loads == [1]
+
+
+def test_unavailable_backend_raises():
+    def broken():
+        raise ImportError("No module named 'rpy2'")
+
+    backends.register_backend('broken', broken)
+    with pytest.raises(backends.BackendUnavailable, match='rpy2'):
+        backends.get_backend('broken')
+    with pytest.raises(ValueError):
+        backends.get_backend('missing')
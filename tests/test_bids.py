@@ -0,0 +1,81 @@
+import json
+import pandas as pd
+import pytest
+from metaprivBIDS.corelogic.bids import assess_table, crawl, find_tables
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    root = tmp_path / 'ds001'
+    (root / 'phenotype').mkdir(parents=True)
+    (root / 'sub-01').mkdir()
+    (root / 'derivatives' / 'sub-01').mkdir(parents=True)
+    participants = pd.DataFrame({
+        'participant_id': [f'sub-{i:02d}' for i in range(1, 9)],
+        'age': [21, 21, 34, 34, 34, 58, 58, 71],
+        'sex': ['F', 'F', 'M', 'M', 'M', 'F', 'F', 'n/a'],
+        'diagnosis': ['none', 'mild', 'none', 'mild', 'severe', 'none', 'none', 'mild'],
+    })
+    participants.to_csv(root / 'participants.tsv', sep='\t', index=False)
+    (root / 'participants.json').write_text(json.dumps({'age': {'Description': 'age'}, 'sex': {'Levels': {}}}))
+    pd.DataFrame({'participant_id': ['sub-01', 'sub-02'], 'score': [3, 3]}).to_csv(
+        root / 'phenotype' / 'moca.tsv', sep='\t', index=False)
+    pd.DataFrame({'session_id': ['ses-1', 'ses-2'], 'acq_time': ['2020', '2021']}).to_csv(
+        root / 'sub-01' / 'sub-01_sessions.tsv', sep='\t', index=False)
+    (root / 'sessions.json').write_text('{}')
+    (root / 'derivatives' / 'sub-01' / 'sub-01_sessions.tsv').write_text('session_id\nses-1\n')
+    return root
+
+
+def test_find_tables(dataset):
+    tables = find_tables(dataset)
+    assert [(t['kind'], t['path'].split('ds001/')[1]) for t in tables] == [
+        ('participants', 'participants.tsv'), ('phenotype', 'phenotype/moca.tsv'),
+        ('sessions', 'sub-01/sub-01_sessions.tsv')]
+    assert tables[0]['sidecar'].endswith('participants.json')
+    assert tables[1]['sidecar'] is None
+    assert tables[2]['sidecar'].endswith('sessions.json')
+
+
+def test_assess_table(dataset):
+    result = assess_table(str(dataset / 'participants.tsv'), sensitive_attr='diagnosis', pif=False,
+                          sidecar=str(dataset / 'participants.json'))
+    assert result['quasi_identifiers'] == 'age;sex'
+    assert result['num_unique_rows'] == 1 and result['k_anonymity'] == 1
+    assert result['l_diversity'] == 1
+    assert result['undocumented_columns'] == 'diagnosis'
+    assert 'error' not in result
+
+    missing = assess_table(str(dataset / 'missing.tsv'))
+    assert missing['error'].startswith('load:')
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_crawl_writes_a_consolidated_report(dataset, tmp_path, n_jobs):
+    report = tmp_path / 'report.json'
+    frame = crawl([dataset], quasi_identifiers=['age', 'sex', 'score'], pif=False, n_jobs=n_jobs, report=str(report))
+    assert list(frame['kind']) == ['participants', 'phenotype', 'sessions']
+    assert list(frame['dataset']) == ['ds001'] * 3
+    assert list(frame['k_anonymity'].iloc[:2]) == [1, 2]
+    assert pd.isna(frame['k_anonymity'].iloc[2]) and frame['rows'].iloc[2] == 2
+    assert json.loads(report.read_text())[1]['quasi_identifiers'] == 'score'
+
+
+def test_compressed_tables_are_found(dataset):
+    pd.DataFrame({'participant_id': ['sub-01'], 'bdi': [12]}).to_csv(
+        dataset / 'phenotype' / 'bdi.tsv.gz', sep='\t', index=False)
+    (dataset / 'phenotype' / 'bdi.json').write_text('{"bdi": {}}')
+    table = [t for t in find_tables(dataset) if t['path'].endswith('bdi.tsv.gz')][0]
+    assert table['kind'] == 'phenotype' and table['sidecar'].endswith('bdi.json')
+    assert assess_table(table['path'], pif=False, sidecar=table['sidecar'])['k_anonymity'] == 1
+
+
+def test_empty_table_does_not_stop_the_crawl(dataset):
+    (dataset / 'phenotype' / 'empty.tsv').write_text('participant_id\tage\tsex\n')
+    result = assess_table(str(dataset / 'phenotype' / 'empty.tsv'), pif=False)
+    assert result['rows'] == 0 and result['num_unique_rows'] == 0
+    assert result['k_anonymity'] is None
+    assert 'error' not in result
+
+    frame = crawl([dataset], pif=False)
+    assert len(frame) == 4
@@ -0,0 +1,68 @@
+import pytest
+import pandas as pd
+import numpy as np
+from metaprivBIDS.corelogic.cache import UniquenessCache
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 300
+    return pd.DataFrame({
+        'age': rng.integers(18, 90, n),
+        'sex': rng.choice(['F', 'M'], n),
+        'site': rng.choice(['A', 'B', 'C'], n),
+        'diagnosis': rng.choice(['none', 'mild', 'severe'], n),
+    })
+
+
+def test_overlapping_queries_hit_the_cache(data):
+    encoded = EncodedFrame(data)
+    cache = UniquenessCache()
+    columns = ['age', 'sex', 'site']
+
+    all_unique, after_removal = cache.leave_one_out(encoded, columns)
+    assert (all_unique, after_removal) == encoded.leave_one_out(columns)
+
+    hits = cache.hits
+    assert cache.count_unique(encoded, ['site', 'age']) == encoded.count_unique(['age', 'site'])
+    assert cache.summary(encoded, columns)['num_unique_rows'] == all_unique
+    assert cache.hits == hits + 1
+    assert cache.summary(encoded, ['site', 'sex', 'age']) is cache.summary(encoded, columns)
+
+
+def test_modified_columns_are_recomputed(data):
+    encoded = EncodedFrame(data)
+    cache = UniquenessCache()
+    before = cache.summary(encoded, ['age', 'sex'], 'diagnosis')
+    kept = cache.count_unique(encoded, ['sex', 'site'])
+
+    data['age'] = data['age'] // 10 * 10
+    encoded.invalidate(['age'])
+    cache.invalidate(['age'])
+
+    after = cache.summary(encoded, ['age', 'sex'], 'diagnosis')
+    assert after['num_unique_rows'] == (data[['age', 'sex']].value_counts() == 1).sum()
+    assert after['num_unique_rows'] < before['num_unique_rows']
+    hits = cache.hits
+    assert cache.count_unique(encoded, ['sex', 'site']) == kept
+    assert cache.hits == hits + 1
+
+    # A stale entry is never served, even if it was not dropped explicitly
+    data['diagnosis'] = 'none'
+    encoded.invalidate(['diagnosis'])
+    assert cache.summary(encoded, ['age', 'sex'], 'diagnosis')['l_diversity'] == 1
+
+
+def test_eviction_respects_memory_budget(data):
+    encoded = EncodedFrame(data)
+    frame = pd.DataFrame({'x': np.arange(1000)})
+    cache = UniquenessCache(max_bytes=int(frame.memory_usage(deep=True).sum() * 2.5))
+
+    for column in ('age', 'sex', 'site'):
+        cache.put(encoded, 'combined', [column], frame)
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.get(encoded, 'combined', ['age']) is None
+    assert cache.get(encoded, 'combined', ['site']) is frame
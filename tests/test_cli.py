@@ -0,0 +1,55 @@
+import json
+import pandas as pd
+import pytest
+from metaprivBIDS import cli
+
+
+@pytest.fixture
+def files(tmp_path):
+    data = pd.DataFrame({
+        'age': [21, 21, 34, 34, 58, 71],
+        'sex': ['F', 'F', 'M', 'M', 'F', 'M'],
+        'diagnosis': ['none', 'mild', 'none', 'none', 'mild', 'none'],
+    })
+    (tmp_path / 'site-a').mkdir()
+    (tmp_path / 'site-b').mkdir()
+    data.to_csv(tmp_path / 'site-a' / 'participants.tsv', sep='\t', index=False)
+    data.iloc[:4].to_csv(tmp_path / 'site-b' / 'participants.tsv', sep='\t', index=False)
+    return tmp_path
+
+
+def test_arguments(files):
+    args = cli.build_parser().parse_args(['x.tsv', '-c', 'age, sex', '-s', 'diagnosis', '-m', 'uniques,pif', '-j', '2'])
+    assert args.columns == ['age', 'sex'] and args.sensitive == ['diagnosis']
+    assert args.metrics == ['uniques', 'pif'] and args.jobs == 2
+
+    pattern = str(files / '*' / 'participants.tsv')
+    assert cli.expand_files([pattern, pattern]) == [str(files / 'site-a' / 'participants.tsv'),
+                                                    str(files / 'site-b' / 'participants.tsv')]
+    with pytest.raises(SystemExit):
+        cli.main([str(files / '*.csv')])
+
+
+def test_write_results(tmp_path):
+    results = [{'file': 'a.tsv', 'rows': 6, 'selected_columns': ['age', 'sex'], 'num_unique_rows': 2,
+                'k_anonymity': 1, 'l_diversity': {'diagnosis': 1},
+                'combined_column_contribution': pd.DataFrame({'Score': [0.5]})},
+               {'file': 'b.tsv', 'error': 'ValueError: Columns not found: sex'}]
+    cli.write_results(results, str(tmp_path / 'out.csv'))
+    frame = pd.read_csv(tmp_path / 'out.csv')
+    assert list(frame.columns) == ['file', 'rows', 'selected_columns', 'num_unique_rows', 'k_anonymity', 'error',
+                                   'l_diversity[diagnosis]']
+    cli.write_results(results, str(tmp_path / 'out.json'))
+    assert json.loads((tmp_path / 'out.json').read_text())[0]['combined_column_contribution'] == [{'Score': 0.5}]
+
+
+def test_batch_run(files, tmp_path):
+    pytest.importorskip('piflib')
+    pytest.importorskip('networkx')
+    output = tmp_path / 'results.json'
+    status = cli.main([str(files / '*' / 'participants.tsv'), '-c', 'age,sex', '-s', 'diagnosis',
+                       '-m', 'uniques,lowest', '-j', '2', '-o', str(output)])
+    results = json.loads(output.read_text())
+    assert status == 0
+    assert [result['num_unique_rows'] for result in results] == [2, 0]
+    assert results[0]['l_diversity'] == {'diagnosis': 1}
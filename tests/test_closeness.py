@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from metaprivBIDS.corelogic.closeness import attribute_kind, t_closeness, value_ranks
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 2000
+    data = pd.DataFrame({
+        'age': rng.integers(0, 20, n),
+        'income': rng.choice([1., 2., 5., 10., 11., 40.], n),
+        'diagnosis': rng.choice(['none', 'mild', 'moderate', 'severe'], n),
+    })
+    data.loc[rng.choice(n, 100, replace=False), 'income'] = np.nan
+    return data
+
+
+def class_distances(data, attr, distance):
+    # Reference computed class by class
+    valid = data.dropna(subset=[attr])
+    overall = valid[attr].value_counts(normalize=True)
+    return {age: distance(group.value_counts(normalize=True).reindex(overall.index, fill_value=0), overall)
+            for age, group in valid.groupby('age')[attr]}
+
+
+def by_age(data, partition, distances):
+    ages = data['age'].to_numpy()
+    return {ages[partition.ids == g][0]: distances[g] for g in range(partition.n_groups)}
+
+
+@pytest.mark.parametrize('kind', ['numeric', 'ordered'])
+def test_earth_movers_distance_matches_reference(data, kind):
+    values = np.sort(data['income'].dropna().unique())
+    gaps = np.diff(values) if kind == 'numeric' else np.ones(len(values) - 1)
+    gaps = gaps / gaps.sum()
+
+    def emd(p, q):
+        return (np.abs(np.cumsum((p - q).sort_index().to_numpy()))[:-1] * gaps).sum()
+
+    encoded = EncodedFrame(data)
+    partition = encoded.partition(['age'])
+    result = t_closeness(partition, encoded.codes('income'), encoded.uniques('income'), kind)
+    expected = class_distances(data, 'income', emd)
+    mine = by_age(data, partition, result['class_distances'])
+    for age, distance in expected.items():
+        assert mine[age] == pytest.approx(distance, abs=1e-12)
+    assert result['t_closeness'] == pytest.approx(max(expected.values()))
+    assert result['kind'] == kind
+
+
+def test_variational_distance_matches_reference(data):
+    encoded = EncodedFrame(data)
+    partition = encoded.partition(['age'])
+    result = t_closeness(partition, encoded.codes('diagnosis'), encoded.uniques('diagnosis'))
+    expected = class_distances(data, 'diagnosis', lambda p, q: 0.5 * (p - q).abs().sum())
+    assert result['kind'] == 'categorical'
+    assert result['t_closeness'] == pytest.approx(max(expected.values()))
+
+
+def test_value_order():
+    levels = pd.Categorical(['high', 'low', 'mid', 'low'], categories=['low', 'mid', 'high'], ordered=True)
+    uniques = EncodedFrame(pd.DataFrame({'level': levels})).uniques('level')
+    assert attribute_kind(uniques) == 'ordered'
+    ranks, gaps = value_ranks(uniques, 'ordered')
+    assert [uniques[i] for i in np.argsort(ranks)] == ['low', 'mid', 'high']
+    assert gaps.tolist() == [0.5, 0.5]
+
+    ranks, _ = value_ranks(np.array(['b', 'c', 'a']), 'ordered', order=['c', 'b', 'a'])
+    assert ranks.tolist() == [1, 0, 2]
+    with pytest.raises(ValueError):
+        value_ranks(np.array(['b', 'd']), 'ordered', order=['b'])
+
+
+def test_identical_classes_are_zero():
+    data = pd.DataFrame({'site': np.repeat(['a', 'b'], 6), 'score': np.tile([1, 2, 2, 3, 3, 3], 2)})
+    encoded = EncodedFrame(data)
+    partition = encoded.partition(['site'])
+    for kind in ('categorical', 'ordered', 'numeric'):
+        result = t_closeness(partition, encoded.codes('score'), encoded.uniques('score'), kind)
+        assert result['t_closeness'] == pytest.approx(0)
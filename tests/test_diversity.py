@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from metaprivBIDS.corelogic import diversity
+from metaprivBIDS.corelogic.diversity import Contingency, batch_l_diversity, l_diversity
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(3)
+    n = 3000
+    data = pd.DataFrame({
+        'age': rng.integers(18, 60, n),
+        'sex': rng.choice(['F', 'M'], n),
+        'diagnosis': rng.choice(['none', 'mild', 'moderate', 'severe'], n, p=[0.6, 0.2, 0.15, 0.05]),
+    })
+    data.loc[rng.choice(n, 100, replace=False), 'diagnosis'] = None
+    return data
+
+
+def expected(data, columns, c, l):
+    # Per class reference computed with groupby callbacks
+    groups = data.groupby(columns)['diagnosis']
+
+    def entropy(values):
+        p = values.value_counts(normalize=True).to_numpy()
+        return np.exp(-(p * np.log(p)).sum()) if len(p) else 0.0
+
+    def recursive(values):
+        r = values.value_counts().to_numpy()
+        return len(r) >= l and r[0] < c * r[l - 1:].sum()
+
+    return groups.nunique().min(), groups.apply(entropy).min(), groups.apply(recursive)
+
+
+@pytest.mark.parametrize('c, l', [(2, 2), (1, 2), (3, 3)])
+def test_variants_match_groupby(data, c, l):
+    encoded = EncodedFrame(data)
+    columns = ['age', 'sex']
+    result = l_diversity(encoded.partition(columns), encoded.codes('diagnosis'), encoded.cardinality('diagnosis'), c, l)
+    distinct, entropy, recursive = expected(data, columns, c, l)
+
+    assert result['distinct_l'] == distinct == encoded.summary(columns, 'diagnosis')['l_diversity']
+    assert result['entropy_l'] == pytest.approx(entropy)
+    assert result['recursive_cl'] == recursive.all()
+    assert result['recursive_violations'] == (~recursive.astype(bool)).sum()
+
+
+def test_contingency_is_sparse_and_sorted(data):
+    encoded = EncodedFrame(data)
+    partition = encoded.partition(['age', 'sex'])
+    table = Contingency.from_partition(partition, encoded.codes('diagnosis'), encoded.cardinality('diagnosis'))
+    assert (table.counts > 0).all()
+    assert table.counts.sum() == data['diagnosis'].notna().sum()
+    assert np.all(np.diff(table.classes * table.n_values + table.values) > 0)
+    np.testing.assert_array_equal(table.class_totals() + np.bincount(
+        partition.ids[data['diagnosis'].isna().to_numpy()], minlength=partition.n_groups), partition.counts)
+
+    classes, counts, rank = table.ranked_counts()
+    same_class = classes[1:] == classes[:-1]
+    assert np.all(counts[1:][same_class] <= counts[:-1][same_class])
+    assert np.all(rank[1:][~same_class] == 0)
+
+
+def test_wide_key_space_is_hashed():
+    rng = np.random.default_rng(0)
+    n = 20_000
+    data = pd.DataFrame({'id': np.arange(n) // 2, 'value': rng.integers(0, n, n)})
+    encoded = EncodedFrame(data)
+    result = l_diversity(encoded.partition(['id']), encoded.codes('value'), encoded.cardinality('value'))
+    assert result['distinct_l'] == data.groupby('id')['value'].nunique().min()
+
+
+@pytest.mark.parametrize('n_jobs', [None, 2])
+def test_batch_matches_single_attributes(data, monkeypatch, n_jobs):
+    monkeypatch.setattr(diversity, 'PARALLEL_MIN_ROWS', 0)
+    rng = np.random.default_rng(4)
+    data = data.assign(medication=rng.choice(['a', 'b', 'c'], len(data)), score=rng.integers(0, 5, len(data)))
+    encoded = EncodedFrame(data)
+    columns = ['age', 'sex']
+    attrs = ['diagnosis', 'medication', 'score']
+    results = batch_l_diversity(encoded, columns, attrs, c=2, l=2, n_jobs=n_jobs)
+
+    assert list(results) == attrs
+    partition = encoded.partition(columns)
+    for attr in attrs:
+        assert results[attr] == l_diversity(partition, encoded.codes(attr), encoded.cardinality(attr), 2, 2)
@@ -0,0 +1,193 @@
+import pytest
+import pandas as pd
+import numpy as np
+from metaprivBIDS.corelogic import encoding
+from metaprivBIDS.corelogic.encoding import EncodedFrame, densify, records_below
+
+
+@pytest.fixture
+def mixed_data():
+    rng = np.random.default_rng(0)
+    n = 500
+    data = pd.DataFrame({
+        'age': rng.integers(18, 90, n).astype(float),
+        'sex': rng.choice(['F', 'M'], n),
+        'site': rng.choice(['A', 'B', 'C', 'D'], n),
+        'diagnosis': rng.choice(['none', 'mild', 'severe'], n),
+    })
+    data.loc[rng.choice(n, 40, replace=False), 'age'] = np.nan
+    data.loc[rng.choice(n, 25, replace=False), 'site'] = None
+    return data
+
+
+def test_count_unique_matches_value_counts(mixed_data):
+    encoded = EncodedFrame(mixed_data)
+    for columns in (['age'], ['sex', 'site'], ['age', 'sex', 'site', 'diagnosis']):
+        for dropna in (False, True):
+            value_counts = mixed_data[columns].value_counts(dropna=dropna)
+            assert encoded.count_unique(columns, dropna=dropna) == (value_counts == 1).sum()
+
+
+def test_partition_matches_groupby(mixed_data):
+    encoded = EncodedFrame(mixed_data)
+    columns = ['age', 'site']
+    partition = encoded.partition(columns, dropna=True)
+    grouped = mixed_data.groupby(columns)
+
+    assert partition.k_anonymity() == grouped.size().min()
+    distinct = partition.distinct_values(encoded.codes('diagnosis'), encoded.cardinality('diagnosis'))
+    assert distinct.min() == grouped['diagnosis'].nunique().min()
+    assert (partition.ids[mixed_data[columns].isna().any(axis=1).to_numpy()] == -1).all()
+
+
+def test_wide_keys_are_rehashed():
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({f'c{i}': rng.integers(0, 5000, 2000) for i in range(8)})
+    encoded = EncodedFrame(data)
+
+    assert encoded.count_unique(list(data.columns)) == (data.value_counts() == 1).sum()
+
+
+def test_densify_counts_rows_per_key():
+    ids, counts = densify(np.array([7, 3, 7, 9], dtype=np.int64), 10)
+
+    assert ids[0] == ids[2]
+    assert sorted(counts) == [1, 1, 2]
+
+
+def test_summary_uses_one_missing_value_policy(mixed_data):
+    encoded = EncodedFrame(mixed_data)
+    columns = ['age', 'site']
+    summary = encoded.summary(columns, 'diagnosis')
+    sizes = mixed_data[columns].value_counts(dropna=False)
+    filled = mixed_data.fillna({'age': -1, 'site': 'missing'})
+
+    assert summary['num_unique_rows'] == (sizes == 1).sum()
+    assert summary['k_anonymity'] == sizes.min()
+    assert summary['k_histogram'] == sizes.value_counts().to_dict()
+    assert summary['l_diversity'] == filled.groupby(columns)['diagnosis'].nunique().min()
+
+
+def test_leave_one_out_matches_full_recount(mixed_data):
+    encoded = EncodedFrame(mixed_data)
+    columns = list(mixed_data.columns)
+    all_unique, after_removal = encoded.leave_one_out(columns)
+
+    assert all_unique == encoded.count_unique(columns)
+    for column, count in zip(columns, after_removal):
+        assert count == encoded.count_unique([c for c in columns if c != column])
+
+
+def test_k_distribution_matches_transform(mixed_data):
+    encoded = EncodedFrame(mixed_data)
+    columns = ['age', 'site']
+    distribution = encoded.k_distribution(columns, k=3)
+    filled = mixed_data.fillna({'age': -1, 'site': 'missing'})
+    sizes = filled.groupby(columns)['sex'].transform('size').to_numpy()
+
+    np.testing.assert_array_equal(distribution['record_class_sizes'], sizes)
+    assert distribution['k_histogram'] == encoded.summary(columns)['k_histogram']
+    assert distribution['records_below_k'] == (sizes < 3).sum()
+    assert distribution['records_below_k'] == records_below(distribution['k_histogram'], 3)
+    assert distribution['share_below_k'] == pytest.approx((sizes < 3).mean())
+
+    dropped = encoded.k_distribution(columns, k=3, dropna=True)['record_class_sizes']
+    assert (dropped[mixed_data[columns].isna().any(axis=1).to_numpy()] == 0).all()
+
+
+@pytest.mark.parametrize('share', [1.0, encoding.REKEY_MAX_SHARE])
+def test_refresh_matches_new_encoding(mixed_data, monkeypatch, share):
+    monkeypatch.setattr(encoding, 'REKEY_MAX_SHARE', share)
+    monkeypatch.setattr(encoding, 'direct_address_limit', lambda n_rows: 0)
+    rng = np.random.default_rng(2)
+    data = mixed_data.copy()
+    encoded = EncodedFrame(data)
+    columns = ['age', 'sex', 'site']
+    encoded.track(columns)
+    encoded.summary(columns)
+
+    steps = [
+        {'age': lambda age: (age / 5).round() * 5},
+        {'site': lambda site: site.replace(['A', 'B'], 'AB')},
+        {'age': lambda age: age + rng.choice([0, 1], len(age), p=[0.9, 0.1]),
+         'site': lambda site: site.where(rng.random(len(site)) > 0.05, 'E')},
+        {'sex': lambda sex: sex.replace('F', 'M')},
+    ]
+    for step in steps:
+        before = {column: data[column].copy() for column in step}
+        for column, transform in step.items():
+            data[column] = transform(data[column])
+        changed = encoded.refresh(list(step))
+        fresh = EncodedFrame(data.copy())
+
+        for column in step:
+            moved = ~((data[column] == before[column]) | (data[column].isna() & before[column].isna()))
+            np.testing.assert_array_equal(changed[column], np.flatnonzero(moved.to_numpy()))
+        assert encoded.summary(columns, 'diagnosis') == fresh.summary(columns, 'diagnosis')
+        same = pd.crosstab(encoded.partition(columns).ids, fresh.partition(columns).ids)
+        assert ((same > 0).sum(axis=0) == 1).all() and ((same > 0).sum(axis=1) == 1).all()
+
+
+def test_direct_addressable_sets_are_regrouped(mixed_data, monkeypatch):
+    data = mixed_data.copy()
+    encoded = EncodedFrame(data)
+    columns = ['age', 'sex', 'site']
+    encoded.track(columns)
+    encoded.summary(columns)
+    assert encoded._tracked[frozenset(columns)] is None
+
+    monkeypatch.setattr(encoding, 'direct_address_limit', lambda n_rows: 0)
+    encoded.summary(columns)
+    assert encoded._tracked[frozenset(columns)] is not None
+    monkeypatch.undo()
+    data['age'] = (data['age'] / 5).round() * 5
+    encoded.refresh(['age'])
+    assert encoded._tracked[frozenset(columns)] is None
+    assert encoded.summary(columns) == EncodedFrame(data.copy()).summary(columns)
+
+
+def test_invalidate_drops_tracked_partitions(mixed_data, monkeypatch):
+    monkeypatch.setattr(encoding, 'direct_address_limit', lambda n_rows: 0)
+    encoded = EncodedFrame(mixed_data)
+    encoded.track(['age', 'site'])
+    encoded.track(['sex'])
+    first = encoded.partition(['age', 'site'])
+    encoded.partition(['sex'])
+
+    encoded.invalidate(['site'])
+    assert encoded._tracked[frozenset(['age', 'site'])] is None
+    assert encoded._tracked[frozenset(['sex'])] is not None
+    np.testing.assert_array_equal(np.sort(encoded.partition(['site', 'age']).counts), np.sort(first.counts))
+    encoded.invalidate()
+    assert encoded._tracked[frozenset(['sex'])] is None
+
+
+def test_modified_columns_catch_in_place_edits(mixed_data):
+    data = mixed_data.copy()
+    encoded = EncodedFrame(data)
+    columns = ['age', 'sex', 'site']
+    encoded.summary(columns)
+    assert encoded.modified_columns() == []
+
+    data.loc[0, 'age'] = 1000.0
+    data.loc[1, 'sex'] = 'X'
+    modified = encoded.modified_columns()
+    assert modified == ['age', 'sex']
+
+    encoded.refresh(modified)
+    assert encoded.summary(columns) == EncodedFrame(data.copy()).summary(columns)
+    data.pop('site')
+    assert 'site' in encoded.modified_columns()
+
+
+def test_snapshot_is_unaffected_by_refresh(mixed_data):
+    data = mixed_data.copy()
+    encoded = EncodedFrame(data)
+    columns = ['age', 'sex']
+    encoded.track(columns)
+    snapshot = encoded.snapshot(columns)
+    before = snapshot.summary(columns)
+    data.loc[0, 'age'] = 1000.0
+    encoded.refresh(['age'])
+    assert snapshot.summary(columns) == before
+    assert encoded.summary(columns) == EncodedFrame(data.copy()).summary(columns)
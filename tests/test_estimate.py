@@ -0,0 +1,38 @@
+import pandas as pd
+import numpy as np
+from math import comb
+from metaprivBIDS.corelogic import lattice
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+from metaprivBIDS.corelogic.estimate import calibrate, estimate_combined_column_contribution, estimate_suda2
+
+
+def test_estimated_steps_match_the_walk(monkeypatch):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({f'c{i}': rng.integers(0, 2, 2000) for i in range(6)})
+    steps = []
+    for name in ('densify', 'count_singletons'):
+        original = getattr(lattice, name)
+        monkeypatch.setattr(lattice, name, lambda *args, original=original: steps.append(1) or original(*args))
+
+    lattice.combined_column_contribution(EncodedFrame(data), list(data.columns), 2, 3)
+    estimate = estimate_combined_column_contribution(len(data), [2] * 6, 2, 3)
+
+    assert estimate.subsets == comb(6, 2) + comb(6, 3)
+    assert estimate.steps == len(steps)
+
+
+def test_estimates_grow_with_the_workload():
+    calibration = calibrate(1000)
+    assert calibration['direct'] > 0 and calibration['hashed'] > 0
+
+    cardinalities = [5] * 20
+    small = estimate_combined_column_contribution(1000, cardinalities, 3, 4)
+    large = estimate_combined_column_contribution(1000, cardinalities, 3, 7)
+    assert small.subsets < large.subsets
+    assert small.seconds < large.seconds
+    assert small.peak_memory < large.peak_memory
+    assert estimate_combined_column_contribution(10_000, cardinalities, 3, 4).seconds > small.seconds
+
+    suda2 = estimate_suda2(1000, [5] * 10)
+    assert suda2.subsets == 2 ** 10 - 1
+    assert 'subsets' in str(suda2)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+from metaprivBIDS.corelogic.incremental import IncrementalAssessment
+
+
+def participants(rng, n, start=0):
+    return pd.DataFrame({
+        'participant_id': [f'sub-{i:04d}' for i in range(start, start + n)],
+        'age': rng.integers(18, 30, n),
+        'sex': rng.choice(['F', 'M', None], n, p=[0.45, 0.45, 0.1]),
+        'diagnosis': rng.choice(['none', 'mild', 'severe', None], n),
+    })
+
+
+def expected(path):
+    data = pd.read_csv(path, sep='\t', dtype=str)
+    summary = EncodedFrame(data).summary(['age', 'sex'], 'diagnosis')
+    return summary, len(data)
+
+
+def check(result, path):
+    summary, n_rows = expected(path)
+    assert result['total_rows'] == n_rows
+    assert result['num_unique_rows'] == summary['num_unique_rows']
+    assert result['k_anonymity'] == summary['k_anonymity']
+    assert result['k_histogram'] == summary['k_histogram']
+    assert result['l_diversity'] == summary['l_diversity']
+
+
+def test_appended_rows_only_are_read(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'participants.tsv'
+    participants(rng, 300).to_csv(path, sep='\t', index=False)
+    state = str(tmp_path / 'state.npz')
+    assessment = IncrementalAssessment(str(path), ['age', 'sex'], 'diagnosis', chunksize=64, state_path=state)
+
+    result = assessment.update()
+    assert (result['mode'], result['new_rows']) == ('full', 300)
+    check(result, path)
+    assert assessment.update()['mode'] == 'unchanged'
+
+    for start in (300, 340):
+        participants(rng, 40, start).to_csv(path, sep='\t', index=False, header=False, mode='a')
+        result = assessment.update()
+        assert (result['mode'], result['new_rows']) == ('append', 40)
+        check(result, path)
+
+    # A new process picks the state up and still only reads what was appended
+    participants(rng, 5, 380).to_csv(path, sep='\t', index=False, header=False, mode='a')
+    result = IncrementalAssessment(str(path), ['age', 'sex'], 'diagnosis', state_path=state).update()
+    assert (result['mode'], result['new_rows']) == ('append', 5)
+    check(result, path)
+
+
+def test_edited_rows_are_read_again(tmp_path):
+    rng = np.random.default_rng(1)
+    path = tmp_path / 'participants.tsv'
+    data = participants(rng, 100)
+    data.to_csv(path, sep='\t', index=False)
+    assessment = IncrementalAssessment(str(path), ['age', 'sex'], 'diagnosis')
+    assessment.update()
+
+    data.loc[0, 'age'] = 99
+    data.to_csv(path, sep='\t', index=False)
+    result = assessment.update()
+    assert (result['mode'], result['new_rows']) == ('full', 100)
+    check(result, path)
+
+    with pytest.raises(ValueError):
+        IncrementalAssessment(str(path), ['height'], 'diagnosis').update()
+
+
+def test_unterminated_last_line_is_read_again(tmp_path):
+    rng = np.random.default_rng(2)
+    path = tmp_path / 'participants.tsv'
+    text = participants(rng, 50).to_csv(sep='\t', index=False)
+    path.write_text(text[:-3])
+    assessment = IncrementalAssessment(str(path), ['age', 'sex'], 'diagnosis')
+    assessment.update()
+
+    # The last row is completed rather than followed by a new one
+    with open(path, 'a') as f:
+        f.write(text[-3:])
+    result = assessment.update()
+    assert (result['mode'], result['new_rows']) == ('full', 50)
+    check(result, path)
+
+
+def test_wide_keys_are_grouped(tmp_path):
+    rng = np.random.default_rng(3)
+    path = tmp_path / 'wide.tsv'
+    columns = [f'q{i}' for i in range(8)]
+    # Repeated rows of about 600 distinct values per column, 10 bits each
+    rows = rng.integers(0, 600, (700, len(columns)))
+    data = pd.DataFrame(rows[rng.integers(0, len(rows), 2000)], columns=columns)
+    data.iloc[:1500].to_csv(path, sep='\t', index=False)
+    assessment = IncrementalAssessment(str(path), columns, chunksize=256)
+    assessment.update()
+    data.iloc[1500:].to_csv(path, sep='\t', index=False, header=False, mode='a')
+    result = assessment.update()
+
+    summary = EncodedFrame(pd.read_csv(path, sep='\t', dtype=str)).summary(columns)
+    assert result['mode'] == 'append'
+    assert sum(assessment._key_bits) > 62
+    assert result['num_unique_rows'] == summary['num_unique_rows']
+    assert result['k_histogram'] == summary['k_histogram']
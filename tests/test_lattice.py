@@ -0,0 +1,115 @@
+import pytest
+import pandas as pd
+import numpy as np
+from itertools import combinations
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+import threading
+from metaprivBIDS.corelogic.lattice import (combined_column_contribution, iter_combined_column_contribution,
+                                           subset_unique_counts, top_combined_column_contribution)
+
+
+@pytest.fixture
+def survey_data():
+    rng = np.random.default_rng(3)
+    n = 400
+    data = pd.DataFrame({f'q{i}': rng.integers(0, 3 + i % 3, n).astype(float) for i in range(7)})
+    data.loc[rng.choice(n, 30, replace=False), 'q2'] = np.nan
+    return data
+
+
+def unique_rows(data, columns):
+    value_counts = data[list(columns)].value_counts()
+    return (value_counts == 1).sum()
+
+
+def test_subset_unique_counts_match_value_counts(survey_data):
+    columns = list(survey_data.columns)
+    counts = subset_unique_counts(EncodedFrame(survey_data), columns, [2, 5])
+
+    assert len(counts) == 21 + 21
+    for size in (2, 5):
+        for comb in combinations(range(len(columns)), size):
+            mask = sum(1 << i for i in comb)
+            assert counts[mask] == unique_rows(survey_data, [columns[i] for i in comb])
+
+
+def test_combined_column_contribution_matches_brute_force(survey_data):
+    columns = list(survey_data.columns)
+    result = combined_column_contribution(EncodedFrame(survey_data), columns, min_size=2, max_size=4)
+
+    assert list(result.columns) == ['Combination', 'Unique Rows', 'Unique Rows Excluding Columns', 'Score']
+    total = unique_rows(survey_data, columns)
+    expected = [(', '.join(comb), unique_rows(survey_data, comb),
+                 unique_rows(survey_data, [c for c in columns if c not in comb]))
+                for r in range(2, 5) for comb in combinations(columns, r)]
+    assert result[['Combination', 'Unique Rows', 'Unique Rows Excluding Columns']].values.tolist() == [list(e) for e in expected]
+    expected_score = (total - pd.Series([e[2] for e in expected])) / pd.Series([e[1] for e in expected])
+    np.testing.assert_allclose(result['Score'], expected_score)
+
+
+def test_parallel_walk_matches_serial(survey_data):
+    encoded = EncodedFrame(survey_data)
+    columns = list(survey_data.columns) * 2
+    encoded_wide = EncodedFrame(pd.DataFrame({f'{c}_{i}': survey_data[c] for i, c in enumerate(columns)}))
+    wide_columns = encoded_wide.columns
+
+    serial = subset_unique_counts(encoded_wide, wide_columns, [1, 3, 11])
+    parallel = subset_unique_counts(encoded_wide, wide_columns, [1, 3, 11], n_jobs=2)
+    assert parallel == serial
+
+    result = combined_column_contribution(encoded, list(survey_data.columns), 2, 3, n_jobs=2)
+    pd.testing.assert_frame_equal(result, combined_column_contribution(encoded, list(survey_data.columns), 2, 3))
+
+
+@pytest.mark.parametrize('fill', [False, True])
+def test_top_k_matches_full_enumeration(survey_data, fill):
+    if fill:
+        survey_data = survey_data.fillna(-1)
+    encoded = EncodedFrame(survey_data)
+    columns = list(survey_data.columns)
+    full = combined_column_contribution(encoded, columns, 2, 5)
+    full = full[full['Unique Rows'] > 0]
+    full = full.assign(size=full['Combination'].str.count(',')).sort_values(
+        ['Score', 'size'], ascending=[False, True], kind='stable')
+
+    top = top_combined_column_contribution(encoded, columns, 2, 5, top_k=10)
+    assert top['Combination'].tolist() == full['Combination'].head(10).tolist()
+    np.testing.assert_allclose(top['Score'], full['Score'].head(10))
+
+    cut = full['Score'].iloc[20]
+    above = top_combined_column_contribution(encoded, columns, 2, 5, min_score=cut)
+    assert sorted(above['Combination']) == sorted(full.loc[full['Score'] >= cut, 'Combination'])
+
+
+def test_streamed_batches_cover_every_combination(survey_data):
+    encoded = EncodedFrame(survey_data)
+    columns = list(survey_data.columns)
+    calls = []
+    batches = list(iter_combined_column_contribution(encoded, columns, 2, 4,
+                                                     progress=lambda *args: calls.append(args)))
+
+    assert len(batches) > 1
+    streamed = pd.concat([batch.to_frame(ordered=False) for batch in batches])
+    full = combined_column_contribution(encoded, columns, 2, 4)
+    pd.testing.assert_frame_equal(streamed.sort_values('Combination').reset_index(drop=True),
+                                  full.sort_values('Combination').reset_index(drop=True))
+    assert [done for done, _, _ in calls] == list(range(1, len(calls) + 1))
+    assert calls[-1][0] == calls[-1][1] and calls[-1][2] == 0
+
+
+def test_cancel_stops_the_walk(survey_data):
+    encoded = EncodedFrame(survey_data)
+    columns = list(survey_data.columns)
+    cancel = threading.Event()
+    calls = []
+
+    def progress(done, total, eta):
+        calls.append(done)
+        if done == 2:
+            cancel.set()
+
+    partial = combined_column_contribution(encoded, columns, 2, 4, progress=progress, cancel=cancel)
+    full = combined_column_contribution(encoded, columns, 2, 4)
+    assert calls == [1, 2]
+    assert len(partial) < len(full)
+    assert set(partial['Combination']) <= set(full['Combination'])
@@ -0,0 +1,212 @@
+import os
+import pytest
+import pandas as pd
+import numpy as np
+from metaprivBIDS.corelogic import loading
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+from metaprivBIDS.corelogic.loading import cache_path, load_table
+
+
+@pytest.fixture
+def table(tmpdir):
+    rng = np.random.default_rng(0)
+    n = 200
+    data = pd.DataFrame({
+        'participant_id': [f'sub-{i:03d}' for i in range(n)],
+        'age': rng.integers(18, 90, n),
+        'bmi': rng.normal(25, 3, n).round(1),
+        'sex': rng.choice(['F', 'M'], n),
+        'handed': rng.choice([True, False], n),
+    })
+    data.loc[3, 'bmi'] = np.nan
+    data.loc[5, 'sex'] = np.nan
+    path = str(tmpdir.join('participants.tsv'))
+    data.to_csv(path, sep='\t', index=False)
+    return path
+
+
+def test_cached_load_matches_parsing(table):
+    parsed = load_table(table)
+    first = load_table(table, cache=True)
+    assert os.path.exists(cache_path(table))
+
+    cached = load_table(table, cache=True)
+    pd.testing.assert_frame_equal(cached['data'], parsed['data'])
+    assert cached['column_unique_counts'] == {col: parsed['data'][col].nunique() for col in parsed['data'].columns}
+    assert cached['column_types'] == first['column_types']
+    assert cached['encoded'].summary(['age', 'sex']) == parsed['encoded'].summary(['age', 'sex'])
+
+
+def test_cache_is_keyed_by_content(table, tmpdir, monkeypatch):
+    cache_dir = str(tmpdir.join('cache'))
+    load_table(table, cache=True, cache_dir=cache_dir)
+    assert os.listdir(cache_dir)
+
+    # Touching the file keeps the cache valid: the content hash still matches
+    os.utime(table, ns=(0, 0))
+    monkeypatch.setattr(loading.pd, 'read_csv', None)
+    load_table(table, cache=True, cache_dir=cache_dir)
+    monkeypatch.undo()
+
+    data = pd.read_csv(table, sep='\t')
+    data.loc[0, 'age'] = 99
+    data.to_csv(table, sep='\t', index=False)
+    assert load_table(table, cache=True, cache_dir=cache_dir)['data'].loc[0, 'age'] == 99
+
+
+def test_cache_settings():
+    assert loading.cache_settings({}) == (False, None)
+    assert loading.cache_settings({'METAPRIVBIDS_CACHE': '1'}) == (True, None)
+    assert loading.cache_settings({'METAPRIVBIDS_CACHE': '/tmp/cache'}) == (True, '/tmp/cache')
+
+
+def test_streamed_codes_match_full_load(table):
+    parsed = load_table(table)
+    streamed = loading.stream_table(table, chunksize=37)
+
+    assert streamed['column_unique_counts'] == parsed['column_unique_counts']
+    for column in parsed['data'].columns:
+        np.testing.assert_array_equal(streamed['encoded'].codes(column), parsed['encoded'].codes(column))
+    assert streamed['encoded'].summary(['age', 'sex']) == parsed['encoded'].summary(['age', 'sex'])
+    decoded = loading.decode_frame(streamed['encoded'], ['bmi', 'sex'])
+    assert decoded['bmi'].equals(parsed['data']['bmi'])
+    assert decoded['sex'].isna().sum() == 1
+
+
+def test_column_encoder_matches_factorize():
+    rng = np.random.default_rng(3)
+    values = rng.integers(0, 5000, 20_000).astype(float)
+    values[rng.random(len(values)) < 0.1] = np.nan
+    encoder = loading.ColumnEncoder()
+    for start in range(0, len(values), 999):
+        encoder.add(values[start:start + 999])
+    codes, uniques = encoder.finish()
+    expected_codes, expected_uniques = pd.factorize(values)
+    np.testing.assert_array_equal(codes, expected_codes)
+    np.testing.assert_array_equal(uniques, expected_uniques)
+    assert len(encoder) == len(expected_uniques)
+
+
+def test_streamed_mixed_column_matches_full_load(tmpdir):
+    # The first chunks of age look numeric, a later one holds text
+    path = str(tmpdir.join('mixed.tsv'))
+    rows = ['20\tF', '30\tM', '20\tF', '30\tM', 'unknown\tF', '20\tF', '30\tM', '20\tF', '30.0\tM']
+    with open(path, 'w') as f:
+        f.write('age\tsex\n' + '\n'.join(rows) + '\n')
+    parsed = load_table(path)
+    streamed = loading.stream_table(path, chunksize=4)
+    assert streamed['column_unique_counts'] == parsed['column_unique_counts']
+    assert streamed['encoded'].summary(['age', 'sex']) == parsed['encoded'].summary(['age', 'sex'])
+    assert loading.profile_table(path, chunksize=4)['column_unique_counts'] == parsed['column_unique_counts']
+
+    # Numbers are converted once the whole column is read
+    path = str(tmpdir.join('numeric.tsv'))
+    with open(path, 'w') as f:
+        f.write('x\n1\n2\n\n1.0\n2\n')
+    streamed = loading.stream_table(path, chunksize=2)
+    assert streamed['column_unique_counts'] == load_table(path)['column_unique_counts'] == {'x': 2}
+    assert loading.decode_frame(streamed['encoded'])['x'].equals(load_table(path)['data']['x'])
+
+
+def test_streamed_columns_match_stripped_header(tmpdir):
+    path = str(tmpdir.join('padded.csv'))
+    with open(path, 'w') as f:
+        f.write(' a ,b\n1,x\n2,y\n1,y\n')
+    streamed = loading.stream_table(path, chunksize=2, usecols=['b', 'a'])
+    assert streamed['encoded'].columns == ['b', 'a']
+    np.testing.assert_array_equal(streamed['encoded'].codes('a'), [0, 1, 0])
+    with pytest.raises(ValueError, match='c'):
+        loading.stream_table(path, usecols=['c'])
+
+
+def test_profile_classifies_without_loading(table):
+    profile = loading.profile_table(table, chunksize=50, exact_limit=100)
+    counts = load_table(table)['column_unique_counts']
+
+    assert profile['n_rows'] == 200
+    assert not profile['exact']['participant_id'] and profile['exact']['sex']
+    assert profile['column_unique_counts']['sex'] == counts['sex']
+    assert profile['column_unique_counts']['participant_id'] == pytest.approx(200, rel=0.1)
+    assert [kind for _, _, kind in profile['column_types']] == [kind for _, _, kind in loading.column_types(counts)]
+
+
+def test_compaction_keeps_values(table):
+    parsed = load_table(table)['data']
+    compact = load_table(table, compact=True)
+
+    data = compact['data']
+    assert data['age'].dtype == np.int8
+    assert isinstance(data['sex'].dtype, pd.CategoricalDtype)
+    assert data['participant_id'].dtype == parsed['participant_id'].dtype
+    assert data.memory_usage(deep=True).sum() < parsed.memory_usage(deep=True).sum()
+    for column in parsed.columns:
+        assert (data[column].astype(object).fillna(-1) == parsed[column].astype(object).fillna(-1)).all()
+    assert compact['encoded'].summary(['age', 'sex']) == load_table(table)['encoded'].summary(['age', 'sex'])
+    assert compact['encoded'].modified_columns() == []
+    load_table(table, cache=True)
+    assert load_table(table, cache=True, compact=True)['encoded'].modified_columns() == []
+
+
+def test_float32_only_when_lossless():
+    data = pd.DataFrame({'exact': [0.5, 1.25, np.nan], 'inexact': [0.1, 0.2, 0.3]})
+    compact = loading.compact_dtypes(data)
+    assert compact['exact'].dtype == np.float32
+    assert compact['inexact'].dtype == np.float64
+
+
+def test_snapshot_keeps_original_values():
+    data = pd.DataFrame({'a': np.arange(5), 'b': np.arange(5.0)})
+    original = loading.snapshot(data)
+    data['b'] += 1
+    data.loc[0, 'a'] = 100
+    assert original['a'].tolist() == [0, 1, 2, 3, 4]
+    assert original['b'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_projected_load(table):
+    full = load_table(table)['data']
+    projected = load_table(table, usecols=['sex', 'age'], engine='auto', profile=True)
+    pd.testing.assert_frame_equal(projected['data'], full[['sex', 'age']])
+    assert set(projected['profile']['column_unique_counts']) == set(full.columns)
+    with pytest.raises(ValueError, match='weight'):
+        loading.read_table(table, usecols=['age', 'weight'])
+
+    # A cache of the whole table serves projected loads, which write none
+    load_table(table, cache=True)
+    cached = load_table(table, cache=True, usecols=['sex', 'age'])
+    pd.testing.assert_frame_equal(cached['data'], full[['sex', 'age']])
+    assert cached['encoded'].summary(['age', 'sex']) == projected['encoded'].summary(['age', 'sex'])
+
+
+def test_pyarrow_engine_matches_c_parser(table):
+    pytest.importorskip('pyarrow')
+    arrow = loading.read_table(table, usecols=['age', 'bmi', 'sex'], engine='pyarrow')
+    pd.testing.assert_frame_equal(arrow, loading.read_table(table, usecols=['age', 'bmi', 'sex']), check_dtype=False)
+
+
+def test_pyarrow_engine_names_columns_like_c_parser(tmpdir):
+    pytest.importorskip('pyarrow')
+    # A blank first header and a repeated header
+    noise = os.path.join(os.path.dirname(__file__), '..', 'Use_Case_Data', 'data_mod_noise.csv')
+    repeated = str(tmpdir.join('repeated.csv'))
+    with open(repeated, 'w') as f:
+        f.write('a,a,b\n1,2,x\n3,4,y\n')
+    for path, usecols in [(noise, None), (noise, ['Unnamed: 0', 'age']), (repeated, None), (repeated, ['a.1', 'b'])]:
+        arrow = loading.read_table(path, usecols=usecols, engine='pyarrow')
+        pd.testing.assert_frame_equal(arrow, loading.read_table(path, usecols=usecols), check_dtype=False)
+        EncodedFrame(arrow).summary(list(arrow.columns)[:2])
+
+
+@pytest.mark.parametrize('suffix', ['.tsv.gz', '.tsv.bz2', '.tsv.xz', '.tsv.zst'])
+def test_compressed_tables(table, tmpdir, suffix):
+    if suffix.endswith('.zst'):
+        pytest.importorskip('zstandard')
+    data = pd.read_csv(table, sep='\t')
+    path = str(tmpdir.join('participants' + suffix))
+    data.to_csv(path, sep='\t', index=False)
+    assert loading.separator(path) == '\t' and loading.table_suffix(path) == '.tsv'
+
+    loaded = load_table(path, usecols=['age', 'sex'])
+    pd.testing.assert_frame_equal(loaded['data'], data[['age', 'sex']])
+    streamed = loading.stream_table(path, chunksize=64)
+    assert streamed['column_unique_counts'] == load_table(path)['column_unique_counts']
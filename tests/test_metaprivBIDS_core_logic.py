@@ -19,7 +19,7 @@ def mock_data():
 @pytest.fixture
 def mp():
     # Return an instance of the metaprivBIDS_core_logic class
-    return metaprivBIDS_core_logic()
+    return metapriv_corelogic.metaprivBIDS_core_logic()
 
 
 def test_load_data(mp, tmpdir, mock_data):
@@ -53,6 +53,33 @@ def test_calculate_unique_rows(mp, mock_data):
     assert 'l_diversity' in unique_rows_stats, "l-diversity should be in the result"
 
 
+def test_in_place_edits_are_not_missed(mp, mock_data):
+    selected_columns = ['salary', 'city', 'department']
+    mp.calculate_unique_rows(mock_data, selected_columns)
+    mp.find_lowest_unique_columns(mock_data, selected_columns)
+
+    mock_data.loc[0, 'city'] = 'Boston'
+    mock_data['salary'] = [50000, 60000, 70000, 80000, 60000]
+    fresh = metapriv_corelogic.metaprivBIDS_core_logic()
+
+    assert mp.calculate_unique_rows(mock_data, selected_columns) == \
+        fresh.calculate_unique_rows(mock_data.copy(), selected_columns)
+    assert mp.find_lowest_unique_columns(mock_data, selected_columns) == \
+        fresh.find_lowest_unique_columns(mock_data.copy(), selected_columns)
+
+
+def test_cache_hits_do_not_encode(mp, mock_data):
+    selected_columns = ['salary', 'city', 'department']
+    first = mp.calculate_unique_rows(mock_data, selected_columns)
+    mp.calculate_k_anonymity(mock_data, ['age'])
+
+    # An edit outside the selection leaves its cached results as they are
+    mock_data.loc[0, 'age'] = 99
+    with patch('metaprivBIDS.corelogic.encoding.encode_column') as encode_column:
+        assert mp.calculate_unique_rows(mock_data, selected_columns) == first
+    encode_column.assert_not_called()
+
+
 def test_compute_combined_column_contribution(mp, mock_data):
     selected_columns = ['salary', 'city', 'department']
     result_df = mp.compute_combined_column_contribution(mock_data, selected_columns, min_size=1, max_size=2)
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+from metaprivBIDS.corelogic.encoding import EncodedFrame
+from metaprivBIDS.corelogic.sampling import (SampledEncoding, approximate_summary, associated_blocks,
+                                             estimate_population_uniques, exact_summary, stratified_rows)
+
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(0)
+    n = 200_000
+    return pd.DataFrame({
+        'site': rng.choice(['a', 'b', 'c'], n, p=[0.7, 0.2, 0.1]),
+        'age': rng.integers(18, 90, n),
+        'zip': rng.zipf(1.6, n) % 20_000,
+        'diagnosis': rng.choice(['none', 'mild', None], n),
+    })
+
+
+@pytest.fixture
+def skewed():
+    rng = np.random.default_rng(1)
+    n = 300_000
+
+    def zipf(cardinality, a):
+        p = 1 / np.arange(1, cardinality + 1) ** a
+        return rng.choice(cardinality, n, p=p / p.sum())
+
+    data = pd.DataFrame({'zip': zipf(1000, 1.1), 'age': zipf(80, 0.8), 'site': zipf(20, 1.3),
+                         'sex': rng.choice(['F', 'M'], n)})
+    linked = rng.random(n) < 0.3
+    data.loc[linked, 'site'] = data.loc[linked, 'age'] % 20
+    return data
+
+
+def test_stratified_rows_are_proportional():
+    strata = np.repeat([0, 1, 2], [7000, 2000, 1000])
+    rows = stratified_rows(len(strata), 1000, strata)
+    assert np.all(np.diff(rows) > 0)
+    assert np.bincount(strata[rows]).tolist() == [700, 200, 100]
+    assert len(stratified_rows(10, 20)) == 10
+
+
+def test_exact_reuses_sample_codes(table):
+    columns = ['site', 'age', 'zip', 'diagnosis']
+    sampled = SampledEncoding(table, columns, size=5000)
+    assert sampled.encoded.n_rows == len(sampled.rows)
+    exact = sampled.exact()
+    full = EncodedFrame(table)
+    for column in columns:
+        assert exact.cardinality(column) == full.cardinality(column)
+        np.testing.assert_array_equal(exact.uniques(column)[exact.codes(column)][exact.codes(column) >= 0],
+                                      full.uniques(column)[full.codes(column)][full.codes(column) >= 0])
+    assert exact.summary(['site', 'age', 'zip'], 'diagnosis') == full.summary(['site', 'age', 'zip'], 'diagnosis')
+
+
+def test_sample_of_encoded_frame(table):
+    encoded = EncodedFrame(table)
+    sampled = SampledEncoding(encoded, ['age', 'zip'], size=1000)
+    np.testing.assert_array_equal(sampled.encoded.codes('zip'), encoded.codes('zip')[sampled.rows])
+    assert sampled.exact() is encoded
+
+
+@pytest.mark.parametrize('columns', [['zip', 'age'], ['age', 'site', 'sex'], ['zip', 'age', 'site', 'sex']])
+def test_interval_covers_exact_count(skewed, columns):
+    exact = EncodedFrame(skewed).summary(columns)['num_unique_rows']
+    result = approximate_summary(SampledEncoding(skewed, columns, size=30_000), columns)
+    assert result['total_rows'] == len(skewed)
+    assert result['num_unique_rows_lower'] <= exact <= result['num_unique_rows_upper']
+    assert result['num_unique_rows_lower'] <= result['num_unique_rows'] <= result['num_unique_rows_upper']
+
+
+def test_associated_columns_share_a_block(skewed):
+    blocks = associated_blocks(EncodedFrame(skewed), ['zip', 'age', 'site', 'sex'])
+    assert sorted(map(sorted, blocks)) == [['age', 'site'], ['sex'], ['zip']]
+
+
+def test_full_sample_is_exact(table):
+    encoded = EncodedFrame(table)
+    columns = ['age', 'zip']
+    cardinalities = {column: encoded.cardinality(column) + encoded.has_missing(column) for column in columns}
+    assert estimate_population_uniques(encoded, columns, len(table), cardinalities) == \
+        encoded.summary(columns)['num_unique_rows']
+
+
+def test_exact_summary_has_the_approximate_keys(table):
+    encoded = EncodedFrame(table)
+    exact = exact_summary(encoded, ['age', 'zip'], 'diagnosis')
+    approximate = approximate_summary(SampledEncoding(encoded, ['age', 'zip', 'diagnosis'], size=20_000),
+                                      ['age', 'zip'], 'diagnosis')
+    assert exact.keys() == approximate.keys()
+    assert exact['num_unique_rows_lower'] == exact['num_unique_rows'] == exact['num_unique_rows_upper'] == \
+        encoded.summary(['age', 'zip'])['num_unique_rows']
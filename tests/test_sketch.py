@@ -0,0 +1,33 @@
+import pytest
+import numpy as np
+from metaprivBIDS.corelogic.sketch import DistinctCounter, HyperLogLog
+
+
+def test_hyperloglog_estimate_is_close():
+    sketch = HyperLogLog(precision=12)
+    for start in range(0, 200_000, 50_000):
+        sketch.add(np.arange(start, start + 60_000))
+    assert sketch.estimate() == pytest.approx(210_000, rel=0.05)
+
+    small = HyperLogLog()
+    small.add(['a', 'b', 'c', 'a'])
+    assert round(small.estimate()) == 3
+
+
+def test_hyperloglog_merge_and_dtypes():
+    left, right = HyperLogLog(), HyperLogLog()
+    left.add(np.arange(1000))
+    right.add(np.arange(500, 1500).astype(float))
+    left.merge(right)
+    assert left.estimate() == pytest.approx(1500, rel=0.05)
+
+
+def test_distinct_counter_is_exact_up_to_the_limit():
+    counter = DistinctCounter(exact_limit=50)
+    counter.add(np.array([1.0, 2.0, np.nan, 2.0]))
+    counter.add(np.arange(40))
+    assert counter.exact and counter.count() == 40
+
+    counter.add(np.arange(5000))
+    assert not counter.exact
+    assert counter.count() == pytest.approx(5000, rel=0.05)
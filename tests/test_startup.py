@@ -0,0 +1,51 @@
+import sys
+import pytest
+from metaprivBIDS import startup
+
+# Packages the GUI must not import before its window is shown
+HEAVY = {'matplotlib', 'networkx', 'piflib', 'rpy2', 'scipy', 'seaborn'}
+
+# Generous budget for importing the GUI module in a fresh interpreter
+STARTUP_BUDGET = 3.0
+
+
+def test_lazy_module_imports_on_first_use():
+    sys.modules.pop('fractions', None)
+    profile = startup.StartupProfile()
+    fractions = startup.lazy_import('fractions', profile)
+    assert not fractions.loaded and 'fractions' not in sys.modules
+
+    assert fractions.Fraction(1, 2) * 2 == 1
+    assert fractions.loaded and 'fractions' in profile.imports
+    assert 'fractions' in profile.report()
+
+
+def test_warm_up_imports_in_the_background():
+    sys.modules.pop('decimal', None)
+    profile = startup.StartupProfile()
+    modules = [startup.lazy_import('decimal', profile), startup.lazy_import('not_a_module_metapriv', profile)]
+    startup.warm_up(modules, done=lambda: profile.mark('done')).join(timeout=30)
+
+    assert modules[0].loaded and not modules[1].loaded
+    assert profile.imports['decimal'][1] == 'metaprivBIDS-warm-up'
+    assert [stage for stage, _ in profile.stages] == ['done']
+
+
+def test_profile_enabled():
+    assert startup.profile_enabled(['metaprivBIDS', '--profile-startup'], {})
+    assert startup.profile_enabled([], {startup.PROFILE_ENV: '1'})
+    assert not startup.profile_enabled([], {})
+
+
+def test_corelogic_modules_used_by_the_gui_stay_light():
+    for module in ('metaprivBIDS.corelogic.backends', 'metaprivBIDS.corelogic.estimate',
+                   'metaprivBIDS.corelogic.loading', 'metaprivBIDS.corelogic.cache'):
+        _, loaded = startup.measure_import(module, repeats=1)
+        assert not loaded & HEAVY, module
+
+
+def test_gui_startup_benchmark():
+    pytest.importorskip('PySide6')
+    seconds, loaded = startup.measure_import('metaprivBIDS.metaprivBIDS')
+    assert not loaded & HEAVY
+    assert seconds < STARTUP_BUDGET